@@ -0,0 +1,52 @@
+# Frame time of the exhaust flame (emit + update + draw) at full thrust
+#
+#   python benchmarks/exhaust_flame.py --frames 300 --particles 700
+#
+# Draws on an off-screen surface, no window is opened.
+import argparse
+import os
+import sys
+from time import perf_counter
+
+import numpy as np
+import pygame
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from exhaust_flame import ExhaustFlame  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exhaust flame frame time")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--particles", type=int, default=700,
+                        help="particles emitted per frame")
+    parser.add_argument("--thrust", type=float, default=600)
+    args = parser.parse_args()
+
+    screen = pygame.Surface((800, 1000))
+    flame = ExhaustFlame(ground=990, position=(400, 900), angle=0.0,
+                         thrust_force=args.thrust,
+                         number_of_particles=args.particles, seed=0)
+
+    times, live = [], []
+    for _ in range(args.frames):
+        screen.fill((0, 0, 0))
+        start = perf_counter()
+        flame.emit()
+        flame.update()
+        flame.draw(screen)
+        times.append(perf_counter() - start)
+        live.append(len(flame))
+
+    # skip the ramp-up until the particle count is steady
+    steady = np.array(times[len(times) // 2:]) * 1e3
+    print(f"live particles: mean {np.mean(live[len(live) // 2:]):.0f}, "
+          f"max {max(live)}")
+    print(f"frame time (ms): median {np.median(steady):.2f}, "
+          f"p95 {np.percentile(steady, 95):.2f}, max {steady.max():.2f}")
+    print(f"budget at 50 fps: 20 ms")
+
+
+if __name__ == "__main__":
+    main()
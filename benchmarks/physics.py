@@ -0,0 +1,76 @@
+# Time of one physics step for B rockets: one RigidBodies batch against one
+# pymunk space per rocket (what B Physics_Simulator instances cost)
+#
+#   python benchmarks/physics.py --rockets 1 10 100 1000 10000
+import argparse
+import os
+import sys
+from time import perf_counter
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from numpy_physics import RigidBodies  # noqa: E402
+from physics_simulator import Physics_Simulator  # noqa: E402
+from rocket import Rocket  # noqa: E402
+from state_vector import State_Vector  # noqa: E402
+
+
+def initial_states(B, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.column_stack((rng.uniform(100, 700, B),
+                            rng.uniform(100, 500, B),
+                            rng.uniform(-0.5, 0.5, B),
+                            np.zeros((B, 3))))
+
+
+def time_numpy(states, controls, steps, dt):
+    bodies = RigidBodies(states, mass=30, ground_level=1000)
+    start = perf_counter()
+    for _ in range(steps):
+        bodies.apply_thrust(controls[:, 0], controls[:, 1])
+        bodies.step(dt)
+    return (perf_counter() - start) / steps
+
+
+def time_pymunk(states, controls, steps, dt):
+    simulators = []
+    for x, y, alpha, *_ in states:
+        rocket = Rocket(State_Vector(x=x, y=y, alpha=alpha), mass=30,
+                        position=(x, y))
+        simulators.append(Physics_Simulator(rocket=rocket, ground_height=1000))
+    start = perf_counter()
+    for _ in range(steps):
+        for ps, (thrust, nozzle_angle) in zip(simulators, controls):
+            ps.rocket.apply_force(force=thrust, nozzle_angle=nozzle_angle)
+            ps.update_rocket_state(dt)
+    return (perf_counter() - start) / steps
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Physics step time")
+    parser.add_argument("--rockets", type=int, nargs="+",
+                        default=[1, 10, 100, 1000, 10000])
+    parser.add_argument("--steps", type=int, default=50)
+    parser.add_argument("--pymunk-max", type=int, default=1000,
+                        help="skip pymunk above this many rockets")
+    args = parser.parse_args()
+
+    dt = 1 / 50
+    print(f"{'rockets':>8} {'numpy (ms)':>12} {'pymunk (ms)':>12} "
+          f"{'speedup':>8}")
+    for B in args.rockets:
+        states = initial_states(B)
+        controls = np.column_stack((np.full(B, -294.0), np.zeros(B)))
+        numpy_time = time_numpy(states, controls, args.steps, dt) * 1e3
+        if B <= args.pymunk_max:
+            pymunk_time = time_pymunk(states, controls, args.steps, dt) * 1e3
+            print(f"{B:>8} {numpy_time:>12.3f} {pymunk_time:>12.3f} "
+                  f"{pymunk_time / numpy_time:>7.1f}x")
+        else:
+            print(f"{B:>8} {numpy_time:>12.3f} {'-':>12}")
+
+
+if __name__ == "__main__":
+    main()
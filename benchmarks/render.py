@@ -0,0 +1,76 @@
+# Frame time of Visualize.update with dirty rects against full redraws, for
+# a few window sizes. The scene is a rocket-sized sprite that swings and
+# its exhaust flame at hover thrust
+#
+#   python benchmarks/render.py --frames 300 --sizes 400x500 800x1000 1600x2000
+#
+# Renders with SDL's dummy video driver, no window is opened.
+import argparse
+import os
+import sys
+from math import sin
+from time import perf_counter
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import numpy as np  # noqa: E402
+import pygame  # noqa: E402
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from assets import RotationCache  # noqa: E402
+from elements import Elements  # noqa: E402
+from exhaust_flame import ExhaustFlame  # noqa: E402
+from visualize import Visualize  # noqa: E402
+
+
+class Scene(Elements):
+    def __init__(self, width, height):
+        sprite = pygame.Surface((95, 105), pygame.SRCALPHA)
+        sprite.fill((200, 200, 200, 255))
+        self.sprites = RotationCache(sprite)
+        self.center = (width / 2, height - 200)
+        self.frame = 0
+        self.flame = ExhaustFlame(ground=height - 10,
+                                  position=(width / 2, height - 150),
+                                  angle=0.0, thrust_force=300,
+                                  number_of_particles=300, seed=0)
+
+    def draw(self, screen):
+        self.frame += 1
+        sprite = self.sprites.get(20 * sin(self.frame / 20))
+        rect = screen.blit(sprite, sprite.get_rect(center=self.center))
+        self.flame.emit()
+        self.flame.update()
+        return [rect] + self.flame.draw(screen)
+
+
+def frame_time(width, height, dirty_rects, frames):
+    vis = Visualize(width=width, height=height, dirty_rects=dirty_rects)
+    vis.add_object(Scene(width, height))
+    times = []
+    for _ in range(frames):
+        start = perf_counter()
+        vis.update(wait=False)
+        times.append(perf_counter() - start)
+    # skip the ramp-up of the flame
+    return np.median(times[frames // 2:]) * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Frame time per window size")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--sizes", nargs="+",
+                        default=["400x500", "800x1000", "1600x2000"])
+    args = parser.parse_args()
+
+    print(f"{'window':>10} {'full':>9} {'dirty':>9}  (ms per frame, median)")
+    for size in args.sizes:
+        width, height = map(int, size.split("x"))
+        full = frame_time(width, height, False, args.frames)
+        dirty = frame_time(width, height, True, args.frames)
+        print(f"{size:>10} {full:>9.3f} {dirty:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# Time to draw the rocket sprite at a new angle every frame: a fresh
+# pygame.transform.rotate against assets.RotationCache lookups
+#
+#   python benchmarks/sprites.py --frames 2000 --rockets 1 10
+#
+# Draws on an off-screen surface, no window is opened.
+import argparse
+import os
+import sys
+from time import perf_counter
+
+import numpy as np
+import pygame
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from assets import RotationCache  # noqa: E402
+from rocket import Rocket  # noqa: E402
+from state_vector import State_Vector  # noqa: E402
+
+
+def frame_time(draw, angles, rockets, screen):
+    start = perf_counter()
+    for angle in angles:
+        for i in range(rockets):
+            sprite = draw(angle + i)
+            screen.blit(sprite, sprite.get_rect(center=(400, 500)))
+    return (perf_counter() - start) / len(angles) * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rotated sprite draw time")
+    parser.add_argument("--frames", type=int, default=2000)
+    parser.add_argument("--rockets", type=int, nargs="+", default=[1, 10])
+    parser.add_argument("--resolution", type=float, default=0.5)
+    args = parser.parse_args()
+
+    screen = pygame.Surface((800, 1000))
+    rocket = Rocket(State_Vector(), mass=30)
+    try:
+        image = rocket.image
+    except (FileNotFoundError, pygame.error):
+        # same size as the rocket model
+        image = pygame.Surface(tuple(rocket.size), pygame.SRCALPHA)
+        image.fill((200, 200, 200, 255))
+
+    # a swinging rocket, like a landing that corrects its attitude
+    angles = 40 * np.sin(np.linspace(0, 20 * np.pi, args.frames))
+
+    print(f"{'rockets':>8} {'rotate':>10} {'cached':>10} {'smooth':>10}"
+          f"  (ms per frame)")
+    for rockets in args.rockets:
+        rotate = frame_time(lambda a: pygame.transform.rotate(image, a),
+                            angles, rockets, screen)
+        cached = RotationCache(image, args.resolution)
+        cached_ms = frame_time(cached.get, angles, rockets, screen)
+        smooth = RotationCache(image, args.resolution, smooth=True)
+        smooth_ms = frame_time(smooth.get, angles, rockets, screen)
+        print(f"{rockets:>8} {rotate:>10.3f} {cached_ms:>10.3f} "
+              f"{smooth_ms:>10.3f}")
+    print(f"cached sprites: {len(cached)} of at most {cached.max_size}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# Cold start of a fresh interpreter: wall time until each scenario is done
+# and the heavy packages it imported on the way
+#
+#   python benchmarks/startup.py --runs 10
+#
+# Every run is a new process, like a campaign worker or a CI job, so the
+# numbers include the interpreter start (see the "python" row).
+import argparse
+import json
+import os
+import subprocess
+import sys
+from time import perf_counter
+
+import numpy as np
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+HEAVY = ["numpy", "casadi", "pymunk", "pygame", "matplotlib"]
+
+SCENARIOS = {
+    "python": "pass",
+    "import simulation": "import simulation",
+    "import campaign": "import campaign",
+    "headless tick": """
+from simulation import Simulation
+from state_vector import State_Vector
+sim = Simulation(State_Vector(x=350, y=600), physics="numpy")
+sim.step()
+""",
+    "pymunk tick": """
+from simulation import Simulation
+from state_vector import State_Vector
+sim = Simulation(State_Vector(x=350, y=600))
+sim.step()
+""",
+    "renderer": """
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+from visualize import Visualize
+Visualize(width=800, height=1000)
+""",
+}
+
+REPORT = """
+import json, sys
+print(json.dumps([m for m in {heavy!r} if m in sys.modules]))
+"""
+
+
+def run(code):
+    # wall time of the whole process, the modules it imported
+    start = perf_counter()
+    out = subprocess.run(
+        [sys.executable, "-c", code + REPORT.format(heavy=HEAVY)],
+        cwd=SRC, capture_output=True, text=True)
+    elapsed = perf_counter() - start
+    if out.returncode:
+        raise RuntimeError(out.stderr.strip().splitlines()[-1])
+    return elapsed, json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold start time")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--scenario", nargs="+", default=list(SCENARIOS),
+                        choices=list(SCENARIOS))
+    args = parser.parse_args()
+
+    print(f"{'scenario':<18} {'median':>8} {'min':>8} (ms)  imported")
+    for name in args.scenario:
+        try:
+            # one run to warm the file system cache
+            run(SCENARIOS[name])
+            times, modules = [], []
+            for _ in range(args.runs):
+                elapsed, modules = run(SCENARIOS[name])
+                times.append(elapsed)
+        except RuntimeError as e:
+            print(f"{name:<18} failed: {e}")
+            continue
+        times = np.array(times) * 1e3
+        print(f"{name:<18} {np.median(times):>8.1f} {times.min():>8.1f}"
+              f"       {' '.join(modules) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# Accuracy against CPU cost of the physics for a coarse control rate:
+# random thrust / nozzle commands held over each control tick (10 Hz by
+# default) with wind, final state compared with a very fine reference run
+#
+#   python benchmarks/substeps.py --rate 10 --seconds 3
+import argparse
+import os
+import sys
+from math import degrees, radians
+from time import perf_counter
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from numpy_physics import NumpyPhysicsSimulator, NumpyRocket  # noqa: E402
+from physics_simulator import Physics_Simulator  # noqa: E402
+from rocket import Rocket  # noqa: E402
+from state_vector import State_Vector  # noqa: E402
+
+
+def fly(controls, dt, physics="pymunk", **kwargs):
+    rocket_type, simulator_type = (Rocket, Physics_Simulator) \
+        if physics == "pymunk" else (NumpyRocket, NumpyPhysicsSimulator)
+    rocket = rocket_type(
+        State_Vector(x=400, y=300, alpha=radians(10), y_dot=20), mass=30,
+        position=(400, 300))
+    ps = simulator_type(rocket=rocket, ground_height=1000, **kwargs)
+    start = perf_counter()
+    for thrust, nozzle_angle in controls:
+        rocket.apply_force(force=thrust, nozzle_angle=nozzle_angle)
+        ps.apply_external_force((500, 0))
+        ps.update_rocket_state(dt)
+    elapsed = perf_counter() - start
+    s = rocket.state_vector
+    return np.array((s.x, s.y, s.alpha)), elapsed, ps.steps
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Physics accuracy against CPU cost per control tick")
+    parser.add_argument("--rate", type=float, default=10,
+                        help="control rate in Hz")
+    parser.add_argument("--seconds", type=float, default=3)
+    parser.add_argument("--substeps", type=int, nargs="+",
+                        default=[1, 2, 5, 10, 20, 50])
+    parser.add_argument("--tolerances", type=float, nargs="+",
+                        default=[10, 1, 0.1, 0.01])
+    args = parser.parse_args()
+
+    dt = 1 / args.rate
+    ticks = round(args.seconds * args.rate)
+    rng = np.random.default_rng(0)
+    controls = np.column_stack((rng.uniform(-600, -200, ticks),
+                                rng.uniform(-0.2, 0.2, ticks)))
+    reference, _, _ = fly(controls, dt, physics="numpy", tolerance=1e-3)
+
+    print(f"{ticks} ticks at {args.rate:g} Hz, error of the final state")
+    print(f"{'physics':>22} {'steps/tick':>10} {'ms/tick':>8} "
+          f"{'pos (px)':>9} {'angle (deg)':>11}")
+    runs = [(f"pymunk substeps={n}", {"physics": "pymunk", "substeps": n})
+            for n in args.substeps]
+    runs += [(f"numpy substeps={n}", {"physics": "numpy", "substeps": n})
+             for n in args.substeps]
+    runs += [(f"numpy tolerance={tol:g}",
+              {"physics": "numpy", "tolerance": tol})
+             for tol in args.tolerances]
+    for name, kwargs in runs:
+        final, elapsed, steps = fly(controls, dt, **kwargs)
+        print(f"{name:>22} {steps / ticks:>10.1f} "
+              f"{elapsed / ticks * 1e3:>8.3f} "
+              f"{np.hypot(*(final[:2] - reference[:2])):>9.3f} "
+              f"{degrees(abs(final[2] - reference[2])):>11.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+# Benchmark suite of the controller and the simulator, with a regression
+# check against a saved run
+#
+#   python benchmarks/suite.py run --output baseline.json
+#   python benchmarks/suite.py run --output current.json
+#   python benchmarks/suite.py compare baseline.json current.json --threshold 0.2
+#
+# run times every benchmark below and writes its metrics as JSON, compare
+# exits with status 1 when a metric got worse than the baseline by more than
+# the threshold (a fraction, 0.2 => 20 %), signed metrics like the drift
+# slope by more than their own tolerance. Both runs should be made on the
+# same machine. --quick runs fewer ticks / steps, for a smoke test.
+#
+#   mpc.N<n>          setup + solve latency of MPCController, horizon n
+#   mpc.drift         latency over consecutive ticks of one controller,
+#                     last ticks against the first ones (a problem that
+#                     grows every tick shows up as a ratio above 1)
+#   model.predict     predicted_next_state calls per second
+#   physics.pymunk    Physics_Simulator steps per second
+#   physics.numpy     NumpyPhysicsSimulator steps per second
+#   flame             ExhaustFlame update and draw time at full thrust
+#
+# Rendering goes to SDL's dummy video driver, no window is opened.
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+from math import radians
+from time import perf_counter
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import numpy as np  # noqa: E402
+import pygame  # noqa: E402
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from exhaust_flame import ExhaustFlame  # noqa: E402
+from mpc_controller import MPCController  # noqa: E402
+from numpy_physics import NumpyPhysicsSimulator, NumpyRocket  # noqa: E402
+from physics_simulator import Physics_Simulator  # noqa: E402
+from rocket import Rocket  # noqa: E402
+from state_vector import State_Vector  # noqa: E402
+
+STATE = State_Vector(x=350, y=600, alpha=radians(-20), y_dot=30)
+TARGET = State_Vector(x=400, y=937.5)
+DT = 1 / 50
+
+
+def metric(value, unit, better="lower", tolerance=None):
+    # better => lower / higher: compared as a fraction of the baseline.
+    # abs => signed or near zero values, compared by the absolute increase,
+    # a regression beyond tolerance (in unit)
+    entry = {"value": float(value), "unit": unit, "better": better}
+    if better == "abs":
+        entry["tolerance"] = float(tolerance)
+    return entry
+
+
+def mpc_ticks(N, ticks, closed_loop=True):
+    # closed loop on the controller's own model, otherwise the same state
+    # every tick. Wall time of every tick
+    mpc = MPCController(mass=30, N=N)
+    state = STATE
+    times = []
+    failures = 0
+    for _ in range(ticks):
+        start = perf_counter()
+        try:
+            U = mpc.setup_mpc(current_state=state, target_state=TARGET, dt=DT)
+            _, predicted = mpc.solve(U)
+        except RuntimeError:
+            failures += 1
+            mpc.reset()
+            state = STATE
+            continue
+        times.append(perf_counter() - start)
+        if closed_loop:
+            state = State_Vector(*predicted)
+    return np.array(times) * 1e3, failures
+
+
+def bench_mpc(N, ticks):
+    times, failures = mpc_ticks(N, ticks)
+    # the first tick builds the problem
+    steady = times[1:]
+    return {
+        "first_ms": metric(times[0], "ms"),
+        "median_ms": metric(np.median(steady), "ms"),
+        "p95_ms": metric(np.percentile(steady, 95), "ms"),
+        "failures": metric(failures, "solves"),
+    }
+
+
+def bench_drift(ticks, window):
+    # the same problem every tick, only what the controller accumulates
+    # can make the last ticks slower
+    times, failures = mpc_ticks(5, ticks, closed_loop=False)
+    steady = times[1:]
+    first = np.median(steady[:window])
+    last = np.median(steady[-window:])
+    slope = np.polyfit(np.arange(len(steady)), steady, 1)[0]
+    return {
+        "first_median_ms": metric(first, "ms"),
+        "last_median_ms": metric(last, "ms"),
+        "ratio": metric(last / first, "last/first"),
+        # about 0 and of either sign, the ratio to the baseline is noise
+        "slope_ms_per_1000_ticks": metric(slope * 1000, "ms", better="abs",
+                                          tolerance=1.0),
+        "failures": metric(failures, "solves"),
+    }
+
+
+def bench_predict(calls):
+    mpc = MPCController(mass=30)
+    u = np.array([-300.0, 0.05])
+    state = STATE
+    start = perf_counter()
+    for _ in range(calls):
+        mpc.predicted_next_state(current_state=state, optimal_u=u, dt=DT)
+    elapsed = perf_counter() - start
+    return {"calls_per_s": metric(calls / elapsed, "1/s", "higher")}
+
+
+def bench_physics(simulator, rocket_class, steps, substeps):
+    rocket = rocket_class(
+        State_Vector(x=STATE.x, y=STATE.y, alpha=STATE.alpha), mass=30,
+        position=(STATE.x, STATE.y))
+    ps = simulator(rocket=rocket, ground_height=1000, substeps=substeps)
+    start = perf_counter()
+    for _ in range(steps):
+        rocket.apply_force(force=-300, nozzle_angle=0.05)
+        ps.update_rocket_state(DT)
+    elapsed = perf_counter() - start
+    return {"steps_per_s": metric(ps.steps / elapsed, "1/s", "higher")}
+
+
+def bench_flame(frames):
+    pygame.display.init()
+    screen = pygame.display.set_mode((800, 1000))
+    flame = ExhaustFlame(ground=990, position=(400, 900), angle=0.0,
+                         thrust_force=600, number_of_particles=700, seed=0)
+    update, draw = [], []
+    for _ in range(frames):
+        screen.fill((0, 0, 0))
+        flame.emit()
+        start = perf_counter()
+        flame.update()
+        update.append(perf_counter() - start)
+        start = perf_counter()
+        flame.draw(screen)
+        draw.append(perf_counter() - start)
+    pygame.display.quit()
+    # skip the ramp-up until the particle count is steady
+    update = np.array(update[frames // 2:]) * 1e3
+    draw = np.array(draw[frames // 2:]) * 1e3
+    return {"update_median_ms": metric(np.median(update), "ms"),
+            "update_p95_ms": metric(np.percentile(update, 95), "ms"),
+            "draw_median_ms": metric(np.median(draw), "ms"),
+            "draw_p95_ms": metric(np.percentile(draw, 95), "ms")}
+
+
+def benchmarks(quick):
+    ticks = 20 if quick else 100
+    steps = 500 if quick else 5000
+    yield from ((f"mpc.N{N}", lambda N=N: bench_mpc(N, ticks))
+                for N in (5, 10, 20, 50))
+    yield "mpc.drift", lambda: bench_drift(200 if quick else 1000,
+                                           20 if quick else 100)
+    yield "model.predict", lambda: bench_predict(steps)
+    yield "physics.pymunk", lambda: bench_physics(
+        Physics_Simulator, Rocket, steps, 10)
+    yield "physics.numpy", lambda: bench_physics(
+        NumpyPhysicsSimulator, NumpyRocket, steps, 10)
+    yield "flame", lambda: bench_flame(60 if quick else 300)
+
+
+def machine():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                                capture_output=True, text=True,
+                                cwd=os.path.dirname(__file__)).stdout.strip()
+    except OSError:
+        commit = ""
+    import casadi
+    import pymunk
+    return {"date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": commit,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "cpus": os.cpu_count(),
+            "numpy": np.__version__,
+            "casadi": casadi.__version__,
+            "pymunk": pymunk.version,
+            "pygame": pygame.version.ver}
+
+
+def run(args):
+    results = {}
+    for name, bench in benchmarks(args.quick):
+        if args.only and not any(name.startswith(p) for p in args.only):
+            continue
+        start = perf_counter()
+        results[name] = bench()
+        print(f"{name:<16} {perf_counter() - start:6.1f} s  " + ", ".join(
+            f"{key} {m['value']:.4g}" for key, m in results[name].items()),
+            flush=True)
+    with open(args.output, "w") as f:
+        json.dump({"machine": machine(), "quick": args.quick,
+                   "results": results}, f, indent=2)
+    print(f"written to {args.output}")
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list:
+    # (benchmark, metric, baseline, current, change, regressed) for every
+    # metric in both runs, change > 0 is always worse: a fraction of the
+    # baseline, or for better == abs the increase in the metric's unit
+    rows = []
+    for name, metrics in baseline["results"].items():
+        for key, base in metrics.items():
+            now = current["results"].get(name, {}).get(key)
+            if now is None:
+                continue
+            b, c = base["value"], now["value"]
+            if base["better"] == "abs":
+                change = c - b
+                rows.append((name, key, b, c, change,
+                             change > base["tolerance"]))
+                continue
+            if b == 0:
+                # failure counts: any new failure is a regression
+                change = np.inf if c > 0 else 0.0
+            elif base["better"] == "higher":
+                change = b / c - 1 if c > 0 else np.inf
+            else:
+                change = c / b - 1
+            rows.append((name, key, b, c, change, change > threshold))
+    return rows
+
+
+def run_compare(args):
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    rows = compare(baseline, current, args.threshold)
+    print(f"{'benchmark':<16} {'metric':<24} {'baseline':>11} "
+          f"{'current':>11} {'change':>8}")
+    for name, key, b, c, change, regressed in rows:
+        absolute = baseline["results"][name][key]["better"] == "abs"
+        print(f"{name:<16} {key:<24} {b:>11.4g} {c:>11.4g} "
+              + (f"{change:>+8.3g}" if absolute else f"{change:>+8.1%}")
+              + ("  REGRESSION" if regressed else ""))
+    regressions = sum(row[-1] for row in rows)
+    print(f"{regressions} regression(s) beyond {args.threshold:.0%} "
+          "(or a metric's own tolerance)")
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark suite")
+    commands = parser.add_subparsers(dest="command", required=True)
+    p = commands.add_parser("run", help="run the benchmarks")
+    p.add_argument("--output", default="benchmarks.json")
+    p.add_argument("--quick", action="store_true",
+                   help="fewer ticks and steps")
+    p.add_argument("--only", nargs="+", default=None, metavar="PREFIX",
+                   help="only the benchmarks whose name starts with PREFIX")
+    p = commands.add_parser("compare", help="fail on regressions")
+    p.add_argument("baseline")
+    p.add_argument("current")
+    p.add_argument("--threshold", type=float, default=0.2,
+                   help="allowed slowdown as a fraction of the baseline")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        run(args)
+    else:
+        sys.exit(run_compare(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# Cost per tick of the status output: the old print calls against the
+# event log disabled, sampled, and written as JSON lines
+#
+#   python benchmarks/tick_logging.py --ticks 20000
+import argparse
+import os
+import sys
+import tempfile
+from math import degrees, radians
+from time import perf_counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from event_log import Logger, JsonLinesSink, DEBUG, INFO  # noqa: E402
+from state_vector import State_Vector  # noqa: E402
+
+
+def print_status(out, s, thrust, nozzle_angle, t):
+    # what main printed every tick
+    print(f"Thrust => {'{:.2f}'.format(-thrust)}, "
+          f"Nozzle Angle => {'{:.2f}'.format(degrees(nozzle_angle))}",
+          file=out)
+    print(f"vector: {s}", file=out)
+    print(f"Distance to the ground: {937.5 - s.y:.2f}, "
+          f"Velocity: {s.y_dot:.2f}, Time: {t:.2f}", file=out)
+
+
+def log_status(log, s, thrust, nozzle_angle, t):
+    if log.enabled(DEBUG):
+        log.debug("tick", t=t, x=s.x, y=s.y, alpha=s.alpha, x_dot=s.x_dot,
+                  y_dot=s.y_dot, alpha_dot=s.alpha_dot, thrust=thrust,
+                  nozzle_angle=nozzle_angle)
+
+
+def timed(ticks, status, *args):
+    s = State_Vector(x=400, y=500, alpha=radians(5), y_dot=20)
+    start = perf_counter()
+    for tick in range(ticks):
+        s.y += 0.1
+        status(*args, s, -300.0, 0.01, tick / 50)
+    return (perf_counter() - start) / ticks * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Status output per tick")
+    parser.add_argument("--ticks", type=int, default=20000)
+    parser.add_argument("--stdout", action="store_true",
+                        help="print to the terminal instead of /dev/null")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(os.devnull, "w") as devnull:
+            out = sys.stdout if args.stdout else devnull
+            rows = [("print x3", timed(args.ticks, print_status, out))]
+            rows.append(("log disabled", timed(
+                args.ticks, log_status, Logger("sim", level=INFO,
+                                               sink=print))))
+            sampled = Logger("sim", level=DEBUG,
+                             sink=JsonLinesSink(os.path.join(tmp, "a.jsonl")))
+            sampled.limit("tick", every=50)
+            rows.append(("log 1 in 50 JSON", timed(args.ticks, log_status,
+                                                   sampled)))
+            every = Logger("sim", level=DEBUG,
+                           sink=JsonLinesSink(os.path.join(tmp, "b.jsonl")))
+            rows.append(("log all JSON", timed(args.ticks, log_status,
+                                               every)))
+            sampled.sink.close()
+            every.sink.close()
+
+    for name, us in rows:
+        print(f"{name:>18}: {us:8.2f} us/tick")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# Solve time versus horizon length for every MPC transcription
+#
+#   python benchmarks/transcription.py --N 5 10 30 50 100 --ticks 100
+#
+# The plant is the controller's own RK4 model (predicted_next_state), so the
+# numbers only measure the optimizer and not pymunk or rendering.
+import argparse
+import os
+import sys
+from math import radians
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from mpc_controller import MPCController  # noqa: E402
+from state_vector import State_Vector  # noqa: E402
+
+TRANSCRIPTIONS = ["single_shooting", "multiple_shooting", "collocation"]
+
+
+def run(transcription, N, ticks, dt, backend):
+    mpc = MPCController(mass=30, N=N, transcription=transcription,
+                        backend=backend)
+    state = State_Vector(x=350, y=600, alpha=radians(-20), y_dot=30)
+    target = State_Vector(x=400, y=937.5)
+
+    solve_times = []
+    failures = 0
+    for _ in range(ticks):
+        try:
+            U = mpc.setup_mpc(current_state=state, target_state=target, dt=dt)
+            U_opt, predicted = mpc.solve(U)
+        except RuntimeError:
+            # Count it and start over from a cold solver
+            failures += 1
+            mpc.reset()
+            continue
+        solve_times.append(mpc.last_build_time + mpc.last_solve_time)
+        state = State_Vector(*predicted)
+
+    # the first tick builds the problem, keep it apart
+    first = solve_times[0] if solve_times else float("nan")
+    steady = np.array(solve_times[1:] or [float("nan")]) * 1e3
+    return {
+        "transcription": transcription,
+        "N": N,
+        "first_ms": first * 1e3,
+        "median_ms": np.median(steady),
+        "p95_ms": np.percentile(steady, 95),
+        "max_ms": steady.max(),
+        "failures": failures,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="MPC solve time versus horizon length")
+    parser.add_argument("--N", type=int, nargs="+", default=[5, 10, 30, 50, 100])
+    parser.add_argument("--ticks", type=int, default=100)
+    parser.add_argument("--dt", type=float, default=1 / 50)
+    parser.add_argument("--backend", default="opti",
+                        choices=["opti", "function", "codegen"])
+    parser.add_argument("--transcription", nargs="+", default=TRANSCRIPTIONS,
+                        choices=TRANSCRIPTIONS)
+    args = parser.parse_args()
+
+    print(f"{'transcription':<18} {'N':>4} {'first':>9} {'median':>9} "
+          f"{'p95':>9} {'max':>9} {'fails':>6}  (ms)")
+    for transcription in args.transcription:
+        for N in args.N:
+            r = run(transcription, N, args.ticks, args.dt, args.backend)
+            print(f"{r['transcription']:<18} {r['N']:>4} {r['first_ms']:>9.2f} "
+                  f"{r['median_ms']:>9.2f} {r['p95_ms']:>9.2f} "
+                  f"{r['max_ms']:>9.2f} {r['failures']:>6}")
+
+
+if __name__ == "__main__":
+    main()
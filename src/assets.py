@@ -0,0 +1,118 @@
+import os
+from collections import OrderedDict
+
+
+# Images of src/img, loaded and scaled once per process and shared by every
+# Rocket and Visualize. pygame is only imported by the first load, a
+# headless run never pays for it. The surfaces are shared, draw on copies.
+
+IMG = os.path.join(os.path.dirname(__file__), "img")
+
+_images = {}
+_rotations = {}
+
+
+def image(name: str, size=None):
+    # name in src/img, size => (width, height) in pixels, None => as loaded
+    key = (name, None if size is None else tuple(int(s) for s in size))
+    if key not in _images:
+        if key[1] is None:
+            _images[key] = _load(name)
+        else:
+            import pygame
+            _images[key] = pygame.transform.scale(image(name), key[1])
+    return _images[key]
+
+
+def _load(name):
+    import pygame
+    return _convert(pygame.image.load(os.path.join(IMG, name)))
+
+
+def _convert(surface):
+    # to the display's pixel format once there is a display, a converted
+    # surface blits several times faster
+    import pygame
+    if pygame.display.get_surface() is None:
+        return surface
+    if surface.get_flags() & pygame.SRCALPHA:
+        return surface.convert_alpha()
+    return surface.convert()
+
+
+def display_opened():
+    # converts what was loaded before the display existed, the rotations
+    # are made again from the converted images
+    for key, surface in _images.items():
+        _images[key] = _convert(surface)
+    _rotations.clear()
+
+
+class RotationCache:
+    def __init__(self, source, resolution: float = 0.5, smooth: bool = False,
+                 max_size: int = 256) -> None:
+        # Rotated copies of source, the angles rounded to resolution
+        # degrees. Made on first use (or by prefill), at most max_size of
+        # them, the least recently used is dropped first
+        # smooth => rotozoom, filtered but slower to make
+        self.source = source
+        self.resolution = resolution
+        self.smooth = smooth
+        self.max_size = max_size
+        self.steps = round(360 / resolution)
+        self._sprites = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._sprites)
+
+    def get(self, angle: float):
+        # angle in degrees, counterclockwise like pygame.transform.rotate
+        step = round(angle / self.resolution) % self.steps
+        sprite = self._sprites.get(step)
+        if sprite is not None:
+            self._sprites.move_to_end(step)
+            self.hits += 1
+            return sprite
+        self.misses += 1
+        sprite = self._sprites[step] = self._rotate(step * self.resolution)
+        if len(self._sprites) > self.max_size:
+            self._sprites.popitem(last=False)
+        return sprite
+
+    def _rotate(self, angle):
+        import pygame
+        if self.smooth:
+            return pygame.transform.rotozoom(self.source, angle, 1)
+        return pygame.transform.rotate(self.source, angle)
+
+    def prefill(self, start: float = -180, stop: float = 180):
+        # every angle of [start, stop) up front, up to max_size of them
+        for step in range(round(start / self.resolution),
+                          round(stop / self.resolution)):
+            if len(self._sprites) >= self.max_size:
+                break
+            self.get(step * self.resolution)
+
+
+def rotations(name: str, size=None, resolution: float = 0.5,
+              smooth: bool = False, max_size: int = 256) -> RotationCache:
+    # The RotationCache of image(name, size), shared like the image
+    key = (name, None if size is None else tuple(int(s) for s in size),
+           resolution, smooth)
+    if key not in _rotations:
+        _rotations[key] = RotationCache(image(name, size), resolution,
+                                        smooth, max_size)
+    return _rotations[key]
+
+
+def preload(*images):
+    # (name, size) pairs, e.g. in a worker before the first frame
+    for name, size in images:
+        image(name, size)
+
+
+def clear():
+    _images.clear()
+    _rotations.clear()
@@ -0,0 +1,208 @@
+import threading
+from copy import copy
+from time import perf_counter
+
+import numpy as np
+
+from event_log import get_logger
+from state_vector import State_Vector
+from utils import shift_plan
+
+
+log = get_logger("async_controller")
+log.limit("solve_failed", rate=1)
+
+
+class AsyncController:
+    def __init__(self, controller, wait_first: bool = True,
+                 max_staleness: int = 0) -> None:
+        # Runs controller (an MPCController) on a worker thread. Every tick
+        # solve returns at once with the newest plan the worker has
+        # published and hands the worker the state predicted for the next
+        # tick, flying the control returned now: the plan it solves is
+        # applied one tick later, from the state it was solved for. A plan
+        # that arrives late is shifted by the ticks it missed, a snapshot
+        # the worker had no time for is replaced by the next one.
+        #
+        # wait_first => block on the very first plan instead of flying the
+        # first ticks with the engine off
+        # max_staleness => applying a plan more than this many ticks after
+        # the tick it was solved for counts as a deadline miss
+        self.controller = controller
+        self.wait_first = wait_first
+        self.max_staleness = max_staleness
+
+        self._cond = threading.Condition()
+        self._snapshot = None
+        self._result = None
+        self._busy = False
+        self._closed = False
+
+        self.plan = None
+        self.plan_tick = 0
+        self.tick = 0
+        self.reset_metrics()
+
+        self._worker = threading.Thread(target=self._work, daemon=True,
+                                        name="mpc-worker")
+        self._worker.start()
+
+    def reset_metrics(self):
+        # staleness => ticks between the tick each applied plan was solved
+        # for and the tick it is applied at
+        # latencies => wall time from snapshot to published plan
+        self.staleness = []
+        self.latencies = []
+        self.deadline_misses = 0
+        self.solves = 0
+        self.failures = 0
+
+    def __getattr__(self, name):
+        # timings, last_solve_time, mass, N, ... of the wrapped controller
+        if name == "controller":
+            raise AttributeError(name)
+        return getattr(self.controller, name)
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while self._snapshot is None and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                (state, target, dt, tick, posted), self._snapshot = \
+                    self._snapshot, None
+                self._busy = True
+
+            error = plan = None
+            try:
+                U = self.controller.setup_mpc(current_state=state,
+                                              target_state=target, dt=dt)
+                plan, _ = self.controller.solve(U)
+                plan = np.array(plan)
+            except Exception as e:
+                error = e
+
+            with self._cond:
+                self._result = (plan, tick, error, perf_counter() - posted)
+                self._busy = False
+                self._cond.notify_all()
+
+    def setup_mpc(self, current_state, target_state, dt):
+        # the snapshot is posted by solve, once the control of this tick is
+        # known
+        self.tick += 1
+        self.dt = dt
+        self.current_state = copy(current_state)
+        self.target_state = copy(target_state)
+        return None
+
+    def _post(self, state, tick):
+        with self._cond:
+            self._snapshot = (state, copy(self.target_state), self.dt, tick,
+                              perf_counter())
+            self._cond.notify_all()
+
+    def solve(self, U=None):
+        if self.wait_first and self.plan is None:
+            # the first plan is solved for the current state
+            self._post(copy(self.current_state), self.tick)
+        with self._cond:
+            if self.wait_first and self.plan is None:
+                while self._result is None:
+                    self._cond.wait()
+            result, self._result = self._result, None
+
+        if result is not None:
+            plan, tick, error, latency = result
+            if error is not None:
+                # keep flying the old plan, the next snapshot is solved anyway
+                self.failures += 1
+                log.warning("solve_failed", tick=tick, error=error)
+                if self.plan is None:
+                    raise error
+            else:
+                self.plan, self.plan_tick = plan, tick
+                self.solves += 1
+                self.latencies.append(latency)
+
+        if self.plan is None:
+            # engine off until the first plan arrives
+            U_opt = np.zeros((self.controller.N, 2))
+            staleness = self.tick
+        else:
+            staleness = self.tick - self.plan_tick
+            U_opt = shift_plan(self.plan, staleness) if staleness \
+                else self.plan
+        self.staleness.append(staleness)
+        if staleness > self.max_staleness:
+            self.deadline_misses += 1
+
+        predicted_state = self.controller.predicted_next_state(
+            current_state=self.current_state, optimal_u=U_opt[0], dt=self.dt)
+        self._post(State_Vector(*predicted_state), self.tick + 1)
+        return U_opt, predicted_state
+
+    def wait(self):
+        # Until the worker has nothing left to do
+        with self._cond:
+            while self._busy or self._snapshot is not None:
+                self._cond.wait()
+
+    def stats(self) -> dict:
+        staleness = np.array(self.staleness or [0])
+        latencies = np.array(self.latencies or [np.nan])
+        return {
+            "ticks": len(self.staleness),
+            "solves": self.solves,
+            "failures": self.failures,
+            "deadline_misses": self.deadline_misses,
+            "staleness_mean": staleness.mean(),
+            "staleness_max": int(staleness.max()),
+            "latency_p95_ms": np.percentile(latencies, 95) * 1e3,
+        }
+
+    def reset(self):
+        with self._cond:
+            self._snapshot = None
+        self.wait()
+        self._result = None
+        self.plan = None
+        self.plan_tick = 0
+        self.tick = 0
+        self.reset_metrics()
+        self.controller.reset()
+
+    def warm_start(self) -> dict:
+        # The wrapped controller's warm start once the worker is idle, plus
+        # the plans it published
+        self.wait()
+        data = self.controller.warm_start()
+        result = self._result
+        if result is not None and result[2] is not None:
+            # a failed solve is not worth keeping
+            result = None
+        data["async"] = {"plan": copy(self.plan), "plan_tick": self.plan_tick,
+                         "tick": self.tick, "result": copy(result)}
+        return data
+
+    def set_warm_start(self, data: dict):
+        if "async" not in data:
+            raise ValueError("Warm start of a synchronous controller, "
+                             "restore it into an MPCController")
+        with self._cond:
+            self._snapshot = None
+        self.wait()
+        state = data["async"]
+        self.controller.set_warm_start(
+            {name: value for name, value in data.items() if name != "async"})
+        self.plan = copy(state["plan"])
+        self.plan_tick = state["plan_tick"]
+        self.tick = state["tick"]
+        self._result = copy(state["result"])
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._worker.join()
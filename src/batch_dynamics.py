@@ -0,0 +1,58 @@
+import numpy as np
+
+
+class BatchDynamics:
+    def __init__(self, gravity=9.81, mass=20, rocket_height=10) -> None:
+        # Same model as MPCController.dot_s_n / predicted_next_state, for B
+        # rockets at once: states are [B x 6], controls [B x 2].
+        # mass may be a scalar or one value per rocket ([B])
+        self.gravity = gravity
+        self.mass = np.asarray(mass, dtype=float)
+        self.rocket_height = rocket_height
+        # r / I with I = m h^2 / 12
+        self.r_over_I = (rocket_height * 0.5) / \
+            ((1 / 12) * self.mass * rocket_height**2)
+
+    @classmethod
+    def from_controller(cls, controller):
+        return cls(gravity=controller.gravity, mass=controller.mass,
+                   rocket_height=controller.rocket_height)
+
+    def dot_s(self, states: np.ndarray, controls: np.ndarray,
+              out: np.ndarray = None) -> np.ndarray:
+        if out is None:
+            out = np.empty_like(states, dtype=float)
+        F_t = controls[:, 0]
+        theta = controls[:, 1]
+        phi = states[:, 2] + theta
+
+        out[:, :3] = states[:, 3:]
+        out[:, 3] = -(F_t / self.mass) * np.sin(phi)
+        out[:, 4] = (F_t / self.mass) * np.cos(phi) + self.gravity
+        out[:, 5] = self.r_over_I * F_t * np.sin(theta)
+        return out
+
+    def step(self, states: np.ndarray, controls: np.ndarray,
+             dt: float) -> np.ndarray:
+        # One RK4 step with the controls held over dt
+        states = np.asarray(states, dtype=float)
+        controls = np.asarray(controls, dtype=float)
+        k1 = self.dot_s(states, controls)
+        k2 = self.dot_s(states + 0.5 * dt * k1, controls)
+        k3 = self.dot_s(states + 0.5 * dt * k2, controls)
+        k4 = self.dot_s(states + dt * k3, controls)
+        return states + (dt / 6.0) * (k1 + 2 * k2 + 2 * k3 + k4)
+
+    def rollout(self, states: np.ndarray, controls: np.ndarray,
+                dt: float) -> np.ndarray:
+        # controls [B x N x 2] => trajectories [B x (N + 1) x 6], the first
+        # sample being the initial state
+        states = np.asarray(states, dtype=float)
+        controls = np.asarray(controls, dtype=float)
+        B, N = controls.shape[:2]
+        trajectory = np.empty((B, N + 1, 6))
+        trajectory[:, 0] = states
+        for i in range(N):
+            trajectory[:, i + 1] = self.step(trajectory[:, i], controls[:, i],
+                                             dt)
+        return trajectory
@@ -0,0 +1,270 @@
+import argparse
+import csv
+import os
+from concurrent.futures import ProcessPoolExecutor
+from math import radians, degrees
+from time import perf_counter
+
+import numpy as np
+
+from event_log import get_logger
+from external_forces import Wind
+from mpc_controller import MPCController, SHIFTED, LQR
+from simulation import Simulation
+from state_vector import State_Vector
+from telemetry import TelemetryRecorder
+from video import VideoRecorder
+
+
+log = get_logger("campaign")
+
+
+# One controller per worker process, built by _init_worker and reused for
+# every landing the worker runs
+_controller = None
+_settings = None
+
+
+def sample_cases(n: int, seed: int = 0,
+                 x_range=(300, 500),
+                 y_range=(150, 300),
+                 alpha_max: float = 50,
+                 mass_range=(25, 35),
+                 wind_max: float = 20,
+                 gravity_spread: float = 0.05):
+    # Initial conditions inside the documented safe envelope
+    # (|alpha| <= 50 deg, 300 < x < 500) plus plant perturbations
+    rng = np.random.default_rng(seed)
+    cases = []
+    for i in range(n):
+        cases.append({
+            "case": i,
+            "x": rng.uniform(*x_range),
+            "y": rng.uniform(*y_range),
+            "alpha": rng.uniform(-alpha_max, alpha_max),  # deg
+            "mass": rng.uniform(*mass_range),
+            "wind_x": rng.uniform(-wind_max, wind_max),  # N
+            "gravity_y": 981 * (1 + rng.uniform(-gravity_spread, gravity_spread)),
+        })
+    return cases
+
+
+def _init_worker(controller_kwargs, settings):
+    global _controller, _settings
+    _controller = MPCController(**controller_kwargs)
+    _settings = settings
+
+
+def run_case(case, video: str = None):
+    # Runs on a worker, the controller keeps its nominal mass so the sampled
+    # mass and gravity act as model mismatch
+    # video => also render the landing offscreen to this file or directory
+    _controller.reset()
+    sim = Simulation(
+        initial_state=State_Vector(x=case["x"], y=case["y"],
+                                   alpha=radians(case["alpha"])),
+        mass=case["mass"],
+        controller=_controller,
+        dt=_settings["dt"],
+        gravity_y=case["gravity_y"],
+        wind=Wind([case["wind_x"], 0]),
+        physics=_settings.get("physics", "pymunk"),
+        substeps=_settings.get("substeps", 1),
+        tolerance=_settings.get("tolerance"),
+    )
+
+    # every tick of every landing streamed to telemetry_dir/case-XXXX
+    recorder = None
+    if _settings.get("telemetry_dir"):
+        recorder = TelemetryRecorder(path=os.path.join(
+            _settings["telemetry_dir"], f"case-{case['case']:04d}"))
+
+    start = perf_counter()
+    error = ""
+    fuel = 0.0
+    recording = None
+    try:
+        if video:
+            # every frame is kept, the landing waits for the writer
+            recording = sim.attach_video(VideoRecorder(
+                video, fps=_settings.get("video_fps", 30), block=True))
+        while sim.time < _settings["t_final"]:
+            sim.step()
+            if recorder is not None:
+                recorder.record(sim)
+            # no Isp in the model, total impulse stands in for fuel
+            fuel += abs(sim.thrust) * sim.dt
+            if sim.touched_down():
+                break
+    except Exception as e:
+        # One bad landing must not take the whole campaign down with it
+        lines = str(e).strip().splitlines()
+        error = type(e).__name__
+        if lines:
+            error += ": " + lines[-1][:200]
+    finally:
+        if recorder is not None:
+            recorder.close()
+        if recording is not None:
+            recording.close()
+    wall_time = perf_counter() - start
+
+    solve_times = np.array(
+        [build + solve for build, solve in _controller.timings] or [np.nan])
+    state = sim.state
+    return dict(
+        case,
+        touched_down=sim.touched_down(),
+        t_final=sim.time,
+        ticks=sim.tick,
+        touchdown_x_dot=state.x_dot,
+        touchdown_y_dot=state.y_dot,
+        attitude_error=abs(degrees(state.alpha - sim.target_state.alpha)),
+        x_error=state.x - sim.target_state.x,
+        fuel_used=fuel,
+        solve_mean_ms=np.mean(solve_times) * 1e3,
+        solve_p95_ms=np.percentile(solve_times, 95) * 1e3,
+        solve_max_ms=np.max(solve_times) * 1e3,
+        fallback_shifted=_controller.fallbacks[SHIFTED],
+        fallback_lqr=_controller.fallbacks[LQR],
+        wall_time=wall_time,
+        error=error,
+        video=recording.path if recording is not None else "",
+    )
+
+
+def failed(result) -> bool:
+    return not result["touched_down"] or bool(result["error"])
+
+
+def run_campaign(cases, workers: int = None, controller_kwargs=None,
+                 dt: float = 1 / 50, t_final: float = 245, chunksize: int = 1,
+                 progress=None, telemetry_dir: str = None,
+                 physics: str = "pymunk", substeps: int = 1,
+                 tolerance: float = None, video_dir: str = None,
+                 video_format: str = "mp4", video_fps: float = 30):
+    # dt is the control period, substeps / tolerance set the physics steps
+    # inside it (see Simulation)
+    # video_dir => the failed landings are flown again, rendered offscreen
+    # to video_dir/case-XXXX.<video_format> (png => a directory of frames)
+    controller_kwargs = controller_kwargs or {"mass": 30}
+    settings = {"dt": dt, "t_final": t_final, "telemetry_dir": telemetry_dir,
+                "physics": physics, "substeps": substeps,
+                "tolerance": tolerance, "video_fps": video_fps}
+    results = []
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count(),
+                             initializer=_init_worker,
+                             initargs=(controller_kwargs, settings)) as executor:
+        for result in executor.map(run_case, cases, chunksize=chunksize):
+            results.append(result)
+            if progress is not None:
+                progress(result, len(results), len(cases))
+
+        if video_dir:
+            # rendering every landing would cost more than flying the
+            # failed ones a second time
+            redo = [i for i, result in enumerate(results) if failed(result)]
+            paths = [os.path.join(video_dir, f"case-{cases[i]['case']:04d}"
+                                  + ("" if video_format == "png"
+                                     else f".{video_format}"))
+                     for i in redo]
+            os.makedirs(video_dir, exist_ok=True)
+            for i, again in zip(redo, executor.map(
+                    run_case, [cases[i] for i in redo], paths)):
+                results[i]["video"] = again["video"]
+                if again["error"]:
+                    log.warning("video_failed", case=cases[i]["case"],
+                                error=again["error"])
+    return results
+
+
+def write_results(results, path):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(results[0].keys()))
+        writer.writeheader()
+        writer.writerows(results)
+
+
+def summary(results):
+    landed = [r for r in results if r["touched_down"]]
+    failed = [r for r in results if r["error"]]
+    lines = [f"landings: {len(results)}, touched down: {len(landed)}, "
+             f"solver errors: {len(failed)}"]
+    if landed:
+        y_dot = np.array([r["touchdown_y_dot"] for r in landed])
+        attitude = np.array([r["attitude_error"] for r in landed])
+        fuel = np.array([r["fuel_used"] for r in landed])
+        lines.append(f"touchdown y_dot: mean {y_dot.mean():.2f}, "
+                     f"max {y_dot.max():.2f}")
+        lines.append(f"attitude error (deg): mean {attitude.mean():.2f}, "
+                     f"max {attitude.max():.2f}")
+        lines.append(f"fuel used (N s): mean {fuel.mean():.1f}")
+    p95 = np.array([r["solve_p95_ms"] for r in results])
+    lines.append(f"solve p95 (ms): median {np.nanmedian(p95):.2f}, "
+                 f"worst {np.nanmax(p95):.2f}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Monte Carlo landing campaign over initial conditions")
+    parser.add_argument("--landings", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes, defaults to all cores")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--t-final", type=float, default=245,
+                        help="simulated seconds before a landing is given up")
+    parser.add_argument("--dt", type=float, default=1 / 50,
+                        help="control period in seconds")
+    parser.add_argument("--physics", default="pymunk",
+                        choices=["pymunk", "numpy"])
+    parser.add_argument("--substeps", type=int, default=1,
+                        help="physics steps per control tick")
+    parser.add_argument("--tolerance", type=float, default=None,
+                        help="adaptive physics steps with this error in "
+                             "pixels per tick (numpy only)")
+    parser.add_argument("--mode", default="ipopt", choices=["ipopt", "rti"])
+    parser.add_argument("--N", type=int, default=5)
+    parser.add_argument("--time-budget", type=float, default=None,
+                        help="wall clock limit of one IPOPT solve in seconds")
+    parser.add_argument("--fallback", action="store_true",
+                        help="fly the shifted plan, then LQR, when a solve "
+                             "fails instead of ending the landing")
+    parser.add_argument("--chunksize", type=int, default=1)
+    parser.add_argument("--out", default="campaign.csv")
+    parser.add_argument("--telemetry", default=None,
+                        help="directory to record every tick of every landing")
+    parser.add_argument("--video", default=None, metavar="DIR",
+                        help="record the failed landings to this directory")
+    parser.add_argument("--video-format", default="mp4",
+                        help="file extension for ffmpeg, png => frames")
+    parser.add_argument("--video-fps", type=float, default=30)
+    args = parser.parse_args()
+
+    cases = sample_cases(args.landings, seed=args.seed)
+
+    def progress(result, done, total):
+        print(f"[{done}/{total}] case {result['case']}: "
+              f"touched_down={result['touched_down']} "
+              f"t={result['t_final']:.1f}s {result['error']}")
+
+    start = perf_counter()
+    results = run_campaign(cases, workers=args.workers,
+                           controller_kwargs={"mass": 30, "N": args.N,
+                                              "mode": args.mode,
+                                              "time_budget": args.time_budget,
+                                              "fallback": args.fallback},
+                           dt=args.dt, t_final=args.t_final,
+                           chunksize=args.chunksize, progress=progress,
+                           telemetry_dir=args.telemetry,
+                           physics=args.physics, substeps=args.substeps,
+                           tolerance=args.tolerance, video_dir=args.video,
+                           video_format=args.video_format,
+                           video_fps=args.video_fps)
+    write_results(results, args.out)
+    print(summary(results))
+    print(f"wrote {args.out} in {perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
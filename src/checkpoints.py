@@ -0,0 +1,89 @@
+import pickle
+from math import floor
+
+from simulation import Simulation
+
+
+# Snapshots of a Simulation (see Simulation.snapshot) taken every `every`
+# simulated seconds of a long run. A later run resumes from the last one
+# before the moment of interest instead of flying the whole prefix again,
+# with or without changes:
+#
+#   checkpoints = Checkpoints(every=5)
+#   sim.run(t_final=245, checkpoints=checkpoints)
+#   checkpoints.save("landing.ckpt")
+#
+#   what_if = Checkpoints.load("landing.ckpt").resume(120, wind=Wind([15, 0]))
+#   what_if.run(t_final=245)
+
+
+def save(snapshot, path: str):
+    with open(path, "wb") as f:
+        pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def load(path: str):
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+class Checkpoints:
+    def __init__(self, every: float, keep: int = None,
+                 particles: bool = False) -> None:
+        # every => simulated seconds between snapshots, a multiple of the
+        # control period so a resumed run ticks at the same instants
+        # keep => only the last `keep` snapshots, None => all of them
+        # particles => also the flame particles (see Simulation.snapshot)
+        self.every = every
+        self.keep = keep
+        self.particles = particles
+        self.snapshots = []
+        self._next = None
+
+    def __len__(self):
+        return len(self.snapshots)
+
+    def __repr__(self) -> str:
+        return f"Checkpoints(every={self.every:g} s, taken={len(self)})"
+
+    @property
+    def times(self) -> list:
+        return [snapshot["tick"] * snapshot["config"]["dt"]
+                for snapshot in self.snapshots]
+
+    def record(self, sim) -> bool:
+        # Called every tick, before the tick is flown; takes a snapshot
+        # once `every` seconds have passed since the last one
+        t = sim.time
+        if self._next is not None and t < self._next - 1e-9:
+            return False
+        self._next = (floor(t / self.every + 1e-9) + 1) * self.every
+        self.snapshots.append(sim.snapshot(self.particles))
+        if self.keep is not None and len(self.snapshots) > self.keep:
+            del self.snapshots[0]
+        return True
+
+    def latest(self, t: float) -> dict:
+        # the last snapshot at or before simulated time t
+        for time, snapshot in zip(reversed(self.times),
+                                  reversed(self.snapshots)):
+            if time <= t + 1e-9:
+                return snapshot
+        raise ValueError(f"No checkpoint at or before t={t:g}")
+
+    def resume(self, t: float, controller=None, **changes):
+        # A new Simulation at the last checkpoint at or before t, see
+        # Simulation.from_snapshot for the what-if changes
+        return Simulation.from_snapshot(self.latest(t), controller=controller,
+                                        **changes)
+
+    def save(self, path: str):
+        save({"every": self.every, "keep": self.keep,
+              "particles": self.particles, "snapshots": self.snapshots}, path)
+
+    @classmethod
+    def load(cls, path: str) -> "Checkpoints":
+        data = load(path)
+        checkpoints = cls(data["every"], data["keep"], data["particles"])
+        checkpoints.snapshots = data["snapshots"]
+        return checkpoints
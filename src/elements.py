@@ -1,3 +1,5 @@
 class Elements:
     def draw(self, space):
+        # returns the rects of the screen it drew on, for Visualize to
+        # update only those. None => unknown, the whole screen is redrawn
         pass
@@ -0,0 +1,159 @@
+import json
+import sys
+import threading
+from time import perf_counter, time
+
+import numpy as np
+
+
+# Structured events for the simulation loop, the controllers and the
+# physics. An event is a name plus raw field values, nothing is formatted
+# unless a sink writes it. Below the level of its logger a call is one
+# comparison; hot paths guard anything costly to gather with enabled().
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+OFF = 100
+LEVELS = {"debug": DEBUG, "info": INFO, "warning": WARNING, "error": ERROR,
+          "off": OFF}
+NAMES = {level: name for name, level in LEVELS.items()}
+
+
+def _level(level) -> int:
+    return LEVELS[level.lower()] if isinstance(level, str) else level
+
+
+class Logger:
+    def __init__(self, name: str, level=WARNING, sink=None,
+                 clock=perf_counter) -> None:
+        # sink(record) gets one dict per event, None => nothing is logged
+        self.name = name
+        self.level = _level(level)
+        self.sink = sink
+        self.clock = clock
+        # event => (max events per second, keep one call in `every`)
+        self.limits = {}
+        self.calls = {}
+        self.last = {}
+        # event => calls dropped by its limit
+        self.dropped = {}
+
+    def enabled(self, level=DEBUG) -> bool:
+        return level >= self.level and self.sink is not None
+
+    def limit(self, event: str, rate: float = None, every: int = None):
+        # rate => at most `rate` events per second (wall clock)
+        # every => only every `every`-th call, a deterministic sample
+        self.limits[event] = (rate, every)
+
+    def log(self, level, event: str, **fields) -> bool:
+        if level < self.level or self.sink is None:
+            return False
+        limit = self.limits.get(event)
+        if limit is not None:
+            rate, every = limit
+            calls = self.calls[event] = self.calls.get(event, 0) + 1
+            if every and (calls - 1) % every:
+                self.dropped[event] = self.dropped.get(event, 0) + 1
+                return False
+            if rate:
+                now = self.clock()
+                if event in self.last and now - self.last[event] < 1 / rate:
+                    self.dropped[event] = self.dropped.get(event, 0) + 1
+                    return False
+                self.last[event] = now
+        record = {"time": time(), "level": level, "logger": self.name,
+                  "event": event}
+        record.update(fields)
+        self.sink(record)
+        return True
+
+    def debug(self, event: str, **fields) -> bool:
+        return self.log(DEBUG, event, **fields)
+
+    def info(self, event: str, **fields) -> bool:
+        return self.log(INFO, event, **fields)
+
+    def warning(self, event: str, **fields) -> bool:
+        return self.log(WARNING, event, **fields)
+
+    def error(self, event: str, **fields) -> bool:
+        return self.log(ERROR, event, **fields)
+
+
+def _plain(value):
+    # numpy values and anything else json does not know
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    return str(value)
+
+
+class ConsoleSink:
+    def __init__(self, stream=None) -> None:
+        # one line per event: level logger event key=value ...
+        self.stream = stream
+
+    def __call__(self, record):
+        fields = " ".join(
+            f"{key}={value:.4g}" if isinstance(value, (float, np.floating))
+            else f"{key}={value}"
+            for key, value in record.items()
+            if key not in ("time", "level", "logger", "event"))
+        level = NAMES.get(record["level"], record["level"])
+        print(f"{level:<7} {record['logger']} {record['event']} {fields}",
+              file=self.stream or sys.stderr)
+
+
+class JsonLinesSink:
+    def __init__(self, path: str) -> None:
+        # one JSON object per line, buffered, flushed on close. The MPC
+        # worker thread logs too
+        self.path = path
+        self.file = open(path, "w")
+        self._lock = threading.Lock()
+
+    def __call__(self, record):
+        line = json.dumps(record, default=_plain) + "\n"
+        with self._lock:
+            self.file.write(line)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def flush(self):
+        with self._lock:
+            self.file.flush()
+
+    def close(self):
+        with self._lock:
+            if not self.file.closed:
+                self.file.close()
+
+
+# Loggers are shared by name, configure() changes all of them
+_loggers = {}
+_config = {"level": WARNING, "sink": ConsoleSink()}
+
+
+def get_logger(name: str) -> Logger:
+    if name not in _loggers:
+        _loggers[name] = Logger(name, **_config)
+    return _loggers[name]
+
+
+def configure(level=None, sink=None):
+    # level as a number or "debug" ... "error", sink any callable
+    if level is not None:
+        _config["level"] = _level(level)
+    if sink is not None:
+        _config["sink"] = sink
+    for logger in _loggers.values():
+        logger.level = _config["level"]
+        logger.sink = _config["sink"]
@@ -1,97 +1,53 @@
-import pygame
-import random
-from math import sin, cos, pi
-
-
-class Particle:
-    def __init__(self, position, velocity, lifetime, ground_level=885):
-        self.position = list(position)
-        self.initial_position = list(position)
-        self.velocity = list(velocity)
-
-        lifetime_range = (max(0, (lifetime - 20)), (lifetime + 20))
-        self.lifetime = random.randint(*lifetime_range)
-        self.initial_lifetime = self.lifetime
-
-        self.radius = 3
-        self.dust = False
-        # Define colors for transition
-        self.start_color = (255, 0, 0)  # Red
-        self.middle_color = (255, 255, 0)  # Yellow
-        self.end_color = (255, 255, 255)  # White
-
-        # Ground level for collision
-        self.ground_level = ground_level
-
-    def interpolate_color(self):
-        fraction = self.lifetime / self.initial_lifetime
-
-        if fraction > 0.5:
-            t = (fraction - 0.5) * 2
-            color = (
-                int(self.middle_color[0] * (1 - t) + self.start_color[0] * t),
-                int(self.middle_color[1] * (1 - t) + self.start_color[1] * t),
-                int(self.middle_color[2] * (1 - t) + self.start_color[2] * t),
-            )
-        else:
-            t = fraction * 2
-            color = (
-                int(self.end_color[0] * (1 - t) + self.middle_color[0] * t),
-                int(self.end_color[1] * (1 - t) + self.middle_color[1] * t),
-                int(self.end_color[2] * (1 - t) + self.middle_color[2] * t),
-            )
-
-        return color
-
-    def update(self, src_position: tuple):
-        # Update position based on velocity
-        self.position[0] += self.velocity[0]
-        self.position[1] += self.velocity[1]
-
-        # Detect collision with ground
-        if self.position[1] >= self.ground_level - self.radius:
-            bounce_factor = random.uniform(0.1, 0.5)
-
-            self.velocity[1] = -self.velocity[1] * bounce_factor
-            self.velocity[0] += random.uniform(-2, 2)
-            self.position[1] = self.ground_level - self.radius
-            # self.lifetime -= 2
-            self.dust = True
-
-        self.lifetime -= 1
-
-        # Ensure particles are not on the body of the rocket
-        if (src_position[1] - self.position[1]) > 0:
-            self.lifetime -= 3
-
-        # Shrink particle as it ages
-        self.radius = max(1, self.radius - 0.1)
-
-    def is_alive(self):
-        return self.lifetime > 0
-
-    def draw(self, screen):
-
-        current_color = (
-            int(135),
-            int(35),
-            int(0),
-        )
-
-        r = self.radius
-
-        if self.dust:
-            self.radius+=0.1
-            r = self.radius
-
-        if not self.dust:
-            current_color = self.interpolate_color()
-
-
-
-
-        pygame.draw.circle(screen, current_color, (int(
-            self.position[0]), int(self.position[1])), int(r))
+import numpy as np
+from math import pi
+
+
+# Colors for the transition of a flame particle over its life
+START_COLOR = np.array([255, 0, 0])  # Red
+MIDDLE_COLOR = np.array([255, 255, 0])  # Yellow
+END_COLOR = np.array([255, 255, 255])  # White
+# Particles that hit the ground turn into dust
+DUST_COLOR = np.array([135, 35, 0])
+
+
+def circle_offsets(radius: int):
+    # Pixels that pygame.draw.circle fills for this radius, relative to the
+    # centre, so the vectorized draw looks exactly like the old one
+    import pygame
+
+    size = 2 * radius + 3
+    surface = pygame.Surface((size, size))
+    pygame.draw.circle(surface, (255, 255, 255), (size // 2, size // 2), radius)
+    dx, dy = np.nonzero(pygame.surfarray.array2d(surface))
+    return dx - size // 2, dy - size // 2
+
+
+def covering_tiles(x, y, margin: int, size, tile: int = 32):
+    # Rects of the tile x tile squares of a size (width, height) screen
+    # that pixels within margin of the points (x, y) fall in, the tiles of
+    # a row merged into runs. A sparse spray of particles covers far less
+    # of the screen than its bounding box
+    import pygame
+
+    width, height = size
+    rows, cols = -(-height // tile), -(-width // tile)
+    covered = np.zeros((rows, cols), dtype=bool)
+    for px in (x - margin, x + margin):
+        for py in (y - margin, y + margin):
+            inside = (px >= 0) & (px < width) & (py >= 0) & (py < height)
+            covered[py[inside] // tile, px[inside] // tile] = True
+
+    rects = []
+    for row in np.flatnonzero(covered.any(axis=1)):
+        # starts and ends of the runs of covered tiles
+        edges = np.diff(np.concatenate(([0], covered[row].astype(np.int8),
+                                        [0])))
+        for start, end in zip(np.flatnonzero(edges == 1),
+                              np.flatnonzero(edges == -1)):
+            rects.append(pygame.Rect(
+                int(start) * tile, int(row) * tile,
+                int(end - start) * tile, tile).clip((0, 0, width, height)))
+    return rects
 
 
 class ExhaustFlame:
@@ -101,7 +57,9 @@ class ExhaustFlame:
                  position: tuple,
                  angle: float,
                  thrust_force: float,
-                 number_of_particles: int):
+                 number_of_particles: int,
+                 capacity: int = 50000,
+                 seed: int = None):
         # Origin of the flame
         self.ground = ground
         self.position = position
@@ -109,39 +67,170 @@ class ExhaustFlame:
         self.number_of_particles = number_of_particles
         self.angle = angle
 
-        # List to hold active particles
-        self.particles = []
+        # Structure of arrays, the live particles are always packed in
+        # [0, count). New particles are dropped once capacity is reached
+        self.capacity = capacity
+        self.count = 0
+        self.pos = np.zeros((capacity, 2))
+        self.vel = np.zeros((capacity, 2))
+        self.lifetime = np.zeros(capacity, dtype=np.int64)
+        self.initial_lifetime = np.ones(capacity, dtype=np.int64)
+        self.radius = np.zeros(capacity)
+        self.dust = np.zeros(capacity, dtype=bool)
+        self.dropped = 0
+
+        self.rng = np.random.default_rng(seed)
+        self._offsets = {}
+
+    def __len__(self):
+        return self.count
+
+    # per particle arrays, the first `count` rows are live
+    PARTICLES = ("pos", "vel", "lifetime", "initial_lifetime", "radius", "dust")
+
+    def snapshot(self, particles: bool = False) -> dict:
+        # The random generator and, with particles, the live particles
+        data = {"rng": self.rng.bit_generator.state, "dropped": self.dropped}
+        if particles:
+            data["particles"] = {name: getattr(self, name)[:self.count].copy()
+                                 for name in self.PARTICLES}
+        return data
+
+    def restore(self, data: dict):
+        # without particles in data the flame starts over empty
+        self.rng.bit_generator.state = data["rng"]
+        self.dropped = data["dropped"]
+        self.count = 0
+        if "particles" in data:
+            self.count = len(data["particles"]["pos"])
+            for name in self.PARTICLES:
+                getattr(self, name)[:self.count] = data["particles"][name]
 
     def emit(self):
         force_magnitude = abs(self.thrust_force) / 10
         if force_magnitude < 5:
             return
-        for _ in range(self.number_of_particles):
-            # The angle of rocket body in radians
-            angle = self.angle
-            # ±30 degrees random deviation
-            deviation = random.normalvariate(0, pi / 30)
-            # Random speed
-            speed = random.uniform(2, force_magnitude)
-
-            # Calculate velocity with deviation
-            vx = sin(angle + deviation) * speed
-            vy = cos(angle + deviation) * speed
-
-            # Create a particle
-            particle = Particle(position=self.position, velocity=(
-                vx, vy), lifetime=random.randint(30, 50),
-                ground_level=self.ground,)
-            self.particles.append(particle)
+        n = min(self.number_of_particles, self.capacity - self.count)
+        self.dropped += self.number_of_particles - n
+        if n <= 0:
+            return
+        rng = self.rng
+        new = slice(self.count, self.count + n)
+
+        # The angle of rocket body in radians, ±30 degrees random deviation
+        angle = self.angle + rng.normal(0, pi / 30, n)
+        # Random speed
+        speed = rng.uniform(2, force_magnitude, n)
+
+        self.pos[new] = self.position
+        self.vel[new, 0] = np.sin(angle) * speed
+        self.vel[new, 1] = np.cos(angle) * speed
+        # lifetime in [30, 50] frames, then ±20 per particle
+        lifetime = rng.integers(30, 51, n)
+        lifetime += rng.integers(-20, 21, n)
+        self.lifetime[new] = lifetime
+        self.initial_lifetime[new] = lifetime
+        self.radius[new] = 3
+        self.dust[new] = False
+        self.count += n
 
     def update(self):
-        # Update all particles
-        for particle in self.particles:
-            particle.update(self.position)
+        n = self.count
+        pos = self.pos[:n]
+        vel = self.vel[:n]
+        radius = self.radius[:n]
 
-        # Remove dead particles
-        self.particles = [p for p in self.particles if p.is_alive()]
+        # Update position based on velocity
+        pos += vel
+
+        # Detect collision with ground
+        ground = self.ground - radius
+        hit = pos[:, 1] >= ground
+        k = np.count_nonzero(hit)
+        if k:
+            bounce_factor = self.rng.uniform(0.1, 0.5, k)
+            vel[hit, 1] *= -bounce_factor
+            vel[hit, 0] += self.rng.uniform(-2, 2, k)
+            pos[hit, 1] = ground[hit]
+            self.dust[:n] |= hit
+
+        self.lifetime[:n] -= 1
+        # Ensure particles are not on the body of the rocket
+        self.lifetime[:n][self.position[1] - pos[:, 1] > 0] -= 3
+
+        # Shrink particle as it ages
+        np.maximum(radius - 0.1, 1, out=radius)
+
+        # Remove dead particles, keeping the order of the rest
+        alive = self.lifetime[:n] > 0
+        m = np.count_nonzero(alive)
+        if m < n:
+            for column in (self.pos, self.vel, self.lifetime,
+                           self.initial_lifetime, self.radius, self.dust):
+                column[:m] = column[:n][alive]
+            self.count = m
+
+    def colors(self):
+        # [count x 3] colors of the live particles
+        n = self.count
+        fraction = self.lifetime[:n] / self.initial_lifetime[:n]
+        young = fraction > 0.5
+        t = np.where(young, (fraction - 0.5) * 2, fraction * 2)[:, None]
+        colors = np.where(
+            young[:, None],
+            MIDDLE_COLOR * (1 - t) + START_COLOR * t,
+            END_COLOR * (1 - t) + MIDDLE_COLOR * t,
+        ).astype(np.uint8)
+        colors[self.dust[:n]] = DUST_COLOR
+        return colors
 
     def draw(self, screen):
-        for particle in self.particles:
-            particle.draw(screen)
+        # returns the rects of the screen the particles were drawn in
+        n = self.count
+        # dust grows while it settles
+        self.radius[:n][self.dust[:n]] += 0.1
+        if n == 0:
+            return []
+
+        x = self.pos[:n, 0].astype(np.int64)
+        y = self.pos[:n, 1].astype(np.int64)
+        r = self.radius[:n].astype(np.int64)
+        colors = self.map_colors(screen, self.colors())
+
+        import pygame
+
+        # the circle offsets reach at most radius + 1 pixels away
+        rects = covering_tiles(x, y, int(r.max()) + 1, screen.get_size())
+
+        width, height = screen.get_size()
+        pixels = pygame.surfarray.pixels2d(screen)
+        try:
+            # One vectorized write for all the pixels of all the circles of
+            # the same radius
+            for radius in np.unique(r):
+                if radius not in self._offsets:
+                    self._offsets[radius] = circle_offsets(int(radius))
+                dx, dy = self._offsets[radius]
+                same = r == radius
+                px = (x[same, None] + dx).ravel()
+                py = (y[same, None] + dy).ravel()
+                cs = np.repeat(colors[same], len(dx))
+                inside = (px >= 0) & (px < width) & (py >= 0) & (py < height)
+                pixels[px[inside], py[inside]] = cs[inside]
+        finally:
+            # release the surface lock before anything else blits
+            del pixels
+        return rects
+
+    @staticmethod
+    def map_colors(screen, colors):
+        # RGB rows => the surface's packed pixel values, like map_rgb
+        shifts = screen.get_shifts()
+        losses = screen.get_losses()
+        mapped = np.zeros(len(colors), dtype=np.uint32)
+        for channel in range(3):
+            mapped |= (colors[:, channel].astype(np.uint32)
+                       >> losses[channel]) << shifts[channel]
+        # opaque alpha for surfaces that have one
+        mapped |= np.uint32(screen.get_masks()[3])
+        return mapped
@@ -0,0 +1,88 @@
+from math import radians
+
+import numpy as np
+
+
+def discretize(A, B, dt, terms: int = 12):
+    # Zero order hold of x' = A x + B u with a truncated series of exp(A dt)
+    n = len(A)
+    Ad = np.eye(n)
+    S = np.eye(n) * dt
+    term = np.eye(n)
+    for k in range(1, terms):
+        term = term @ A * dt / k
+        Ad = Ad + term
+        S = S + term * dt / (k + 1)
+    return Ad, S @ B
+
+
+def dlqr(A, B, Q, R, max_iter: int = 100000, tol: float = 1e-9):
+    # Gain of the discrete LQR by iterating the Riccati equation, no scipy
+    P = Q.copy()
+    for _ in range(max_iter):
+        K = np.linalg.solve(R + B.T @ P @ B, B.T @ P @ A)
+        P_next = Q + A.T @ P @ (A - B @ K)
+        if np.abs(P_next - P).max() <= tol * max(1.0, np.abs(P).max()):
+            return K
+        P = P_next
+    raise RuntimeError("LQR Riccati iteration did not converge")
+
+
+class LQRFallback:
+    def __init__(self, controller, Q=None, R=None,
+                 size=(190 / 2, 210 / 2), scale: float = 100,
+                 nozzle_limit: float = radians(60)) -> None:
+        # LQR around hovering at the target. It is only meant to keep the
+        # rocket upright and slow while the MPC cannot deliver a plan, so it
+        # is designed on the simulated rocket (Rocket.apply_force) and not
+        # on the MPC model: forces are `scale` times larger in pixels, the
+        # thrust points at theta - alpha and the body is a size[0] x size[1]
+        # box. The gains are computed once per dt.
+        self.controller = controller
+        self.Q = np.diag([1e-2, 1, 1e3, 1e-1, 1, 100]) if Q is None else Q
+        self.R = np.diag([1e-4, 100]) if R is None else R
+        self.size = size
+        self.scale = scale
+        self.nozzle_limit = nozzle_limit
+        self.gains = {}
+
+    def linearization(self):
+        c = self.controller
+        # hover thrust, the same in the MPC model and the plant
+        F0 = -c.mass * c.gravity
+        width, height = self.size
+        I = c.mass * (width**2 + height**2) / 12
+        a = self.scale * F0 / c.mass
+        A = np.zeros((6, 6))
+        A[:3, 3:] = np.eye(3)
+        # ddot_x = -(scale F / m) sin(theta - alpha)
+        A[3, 2] = a
+        B = np.zeros((6, 2))
+        B[3, 1] = -a
+        # ddot_y = (scale F / m) cos(theta - alpha) + scale g
+        B[4, 0] = self.scale / c.mass
+        # ddot_alpha = (scale F h / 2I) sin(theta)
+        B[5, 1] = self.scale * F0 * height * 0.5 / I
+        return F0, A, B
+
+    def gain(self, dt):
+        if dt not in self.gains:
+            F0, A, B = self.linearization()
+            Ad, Bd = discretize(A, B, dt)
+            self.gains[dt] = (np.array([F0, 0.0]),
+                              dlqr(Ad, Bd, self.Q, self.R))
+        return self.gains[dt]
+
+    def control(self, state, target, dt) -> np.ndarray:
+        # state and target are [x, y, alpha, x_dot, y_dot, alpha_dot]
+        u0, K = self.gain(dt)
+        u = u0 - K @ (np.asarray(state, dtype=float).ravel()
+                      - np.asarray(target, dtype=float).ravel())
+        u[0] = np.clip(u[0], self.controller.T_max, 0)
+        u[1] = np.clip(u[1], -self.nozzle_limit, self.nozzle_limit)
+        return u
+
+    def plan(self, state, target, dt) -> np.ndarray:
+        # [N x 2] like an MPC plan, the law is re-evaluated every tick so
+        # only the first row matters
+        return np.tile(self.control(state, target, dt), (self.controller.N, 1))
@@ -1,20 +1,58 @@
-from physics_simulator import Physics_Simulator
-from rocket import Rocket
+from async_controller import AsyncController
+from event_log import get_logger, configure, JsonLinesSink, LEVELS
+from mpc_controller import MPCController, SHIFTED, LQR
+from profiler import profiler
+from simulation import Simulation
 from state_vector import State_Vector
-from visualize import Visualize
-from mpc_controller import MPCController
+from telemetry import TelemetryRecorder
+from video import VideoRecorder
 from math import radians, degrees
-import matplotlib.pyplot as plt
-import time
+import argparse
+import os
+import subprocess
+import sys
 
 
-def main():
-    print("Start ...")
+log = get_logger("main")
+
 
-    fps = 50
+def main():
+    parser = argparse.ArgumentParser(description="Land the rocket with MPC")
+    parser.add_argument("--log-level", default="info", choices=list(LEVELS),
+                        help="debug logs every physics step and MPC solve")
+    parser.add_argument("--log-file", default=None,
+                        help="write the events as JSON lines instead of "
+                             "to the console")
+    parser.add_argument("--log-every", type=int, default=1,
+                        help="keep one debug tick / step event in this many")
+    parser.add_argument("--profile", nargs="?", const="profile", default=None,
+                        metavar="PREFIX",
+                        help="time every stage, written to PREFIX.csv and "
+                             "PREFIX.trace.json (Chrome trace)")
+    parser.add_argument("--t-final", type=float, default=245,
+                        help="simulated seconds")
+    parser.add_argument("--video", default=None, metavar="PATH",
+                        help="record the frames, PATH.mp4 with ffmpeg or a "
+                             "directory of PNGs")
+    args = parser.parse_args()
+    profiler.enabled = args.profile is not None
+
+    sink = JsonLinesSink(args.log_file) if args.log_file else None
+    configure(level=args.log_level, sink=sink)
+    for name, event in (("simulation", "tick"), ("physics", "step")):
+        get_logger(name).limit(event, every=args.log_every)
+
+    log.info("start")
+
+    # Each subsystem at its own rate, see Simulation.scheduler. The MPC is
+    # tuned for 50 Hz, the physics runs 10 times finer
+    physics_rate = 500
+    control_rate = 50
+    render_rate = 60
+    telemetry_rate = 50
+    status_rate = 1
     mass = 30
 
-    visualizer = Visualize(width=800, height=1000, fps=fps)
     rocket_y = 200  # in pixels
     # initial SS vector
     #***********************************
@@ -23,175 +61,90 @@ def main():
     #  300 <  x  < 500
     #***********************************
     initial_state = State_Vector(x=250, y=rocket_y, alpha=radians(-70))
-    print(initial_state)
-
-    rocket = Rocket(
-        state_vector=initial_state,
-        mass=mass,
-        position=(initial_state.x, initial_state.y),
-    )
-    ps = Physics_Simulator(ground_height=visualizer.display_height, rocket=rocket)
-
-    mpc = MPCController(mass=mass)
 
-    visualizer.add_object(ps)
+    # The MPC runs on its own thread, a slow IPOPT solve never stalls the
+    # render loop, the rocket flies the last plan in the meantime
+    # A solve gets one control tick, when it fails or runs out of time the
+    # rocket flies the previous plan and then an LQR law (see fall_back)
+    controller = AsyncController(
+        MPCController(mass=mass, time_budget=1 / control_rate, fallback=True))
 
-    print(
-        f"ps.groud_level = {ps.groud_level} and ps.groud_tickness = {ps.groud_tickness}"
-    )
-
-    # Note that rocket position is in the centre of it that is why we have
-    # rocket.size.height * 0.5
-    ground = ps.groud_level - ps.groud_tickness
-
-    x_target = visualizer.display_width * 0.5
-    y_target = ground - rocket.size.height * 0.5
-
-    target_vector = State_Vector(
-        x=x_target, y=y_target, alpha=0, x_dot=0, y_dot=0, alpha_dot=0
+    sim = Simulation(
+        initial_state=initial_state,
+        mass=mass,
+        controller=controller,
+        dt=1 / physics_rate,
+        width=800,
+        ground_height=1000,
     )
-
-    running = True
-
-    thrust = 0
-    nozzle_angle = 0
-
-    print(f"initial => {rocket.state_vector}")
-
-    alpha_list = []
-    doty_list = []
-    x_list = []
-    dotalpha_list = []
-
-    p_alpha_list = []
-    p_doty_list = []
-    p_x_list = []
-    p_dotalpha_list = []
-
-    nozzle_list = []
-    thrust_list = []
-    time_stamp = []
-
-    start_time = time.time()
-
-    while running:
-        visualizer.handle_events()
-
-        # force should be a tuple
-        ps.rocket.apply_force(force=thrust, nozzle_angle=nozzle_angle)
-
-        ps.update_rocket_state(dt=1 / fps)
-
-        # optimization
-        U = mpc.setup_mpc(
-            current_state=ps.rocket.state_vector, target_state=target_vector, dt=1 / fps
-        )
-
-        # u_opt is the optimal control
-        u_opt,predicted_state  = mpc.solve(U)
-
-        thrust = u_opt[0, 0]
-        nozzle_angle = u_opt[0, 1]
-
-        # thrust = -300
-        # nozzle_angle = radians(-1)
-        current_time = time.time()
-
-        print(
-            f"Thrust => {'{:.2f}'.format(-thrust)}, \
-              Nozzle Angle => {'{:.2f}'.format(degrees(nozzle_angle))}"
-        )
-
-        print(f"vector: {ps.rocket.state_vector}")
-        print(
-            f"Distance to the ground: {y_target - ps.rocket.state_vector.y:.2f}, "
-            f"Velocity: {ps.rocket.state_vector.y_dot:.2f}, "
-            f"Time: {(current_time - start_time):.2f}"
-        )
-
-        print("\n")
-
-        if(current_time - start_time > 210):
-            time_stamp.append(current_time - start_time)
-            alpha_list.append(degrees(ps.rocket.state_vector.alpha))
-            nozzle_list.append(degrees(nozzle_angle))
-            doty_list.append(ps.rocket.state_vector.y_dot)
-            x_list.append(ps.rocket.state_vector.x)
-            dotalpha_list.append(degrees(ps.rocket.state_vector.alpha_dot))
-            thrust_list.append(abs(thrust))
-
-
-            p_alpha_list.append(degrees(predicted_state[2]))
-            p_doty_list.append(predicted_state[4])
-            p_x_list.append(predicted_state[0])
-            p_dotalpha_list.append(degrees(predicted_state[5]))
-        if(current_time - start_time>245):
-            break
-
-        visualizer.update()
-        # running = False
-        # time.sleep(0.5)
-        # running = True if (current_time - start_time) < 35 else False
-
-        # running = False if (y_target - ps.rocket.state_vector.y) < 2 else True
-
-    print("End ...")
-
-    # Titles for each plot
-    titles = [
-        r"$\alpha$ (deg)",
-        r"$\dot{\alpha}$ (deg/sec)",
-        r"$\dot{Y}$ (m/s)",
-        r"$X$ (m)",
-        r"Nozzle (deg)",
-        r"Thrust (N)",
-    ]
-
-
-
-    data_lists = [
-        (alpha_list, p_alpha_list),
-        (dotalpha_list, p_dotalpha_list),
-        (doty_list, p_doty_list),
-        (x_list, p_x_list),
-        (nozzle_list, None),  # No corresponding p_ data
-        (thrust_list, None),  # No corresponding p_ data
-    ]
-
-    plt.style.use("seaborn-v0_8-deep")
-
-    colors = ["blue", "red"]
-
-    font = {'family' : 'Sans serif',
-            'weight' : 'bold',
-            'size'   : 14}
-
-    plt.rc('font', **font)
-
-    for i, ((data, p_data), title) in enumerate(zip(data_lists, titles)):
-
-        fig, ax = plt.subplots(figsize=(10, 8))
-
-        ax.plot(time_stamp, data, label=f"{title} (Original)", linewidth=2, color=colors[0])
-
-        if p_data is not None:
-            ax.plot(time_stamp, p_data, label=f"{title} (Predicted)", linewidth=2, color=colors[1], linestyle="dashed")
-
-        ax.set_title(title, fontsize=12, fontweight="bold")
-        ax.set_xlabel("Time (s)")
-        ax.set_ylabel("Value")
-
-
-        ax.grid(which="both")
-        ax.grid(which="minor", alpha=0.2)
-        ax.grid(which="major", alpha=0.5)
-
-        ax.legend(fontsize=18)
-
-        filename = f"{i}.png"
-        plt.savefig(filename, dpi=600, bbox_inches="tight")
-
-        plt.close(fig)
+    ps = sim.ps
+    mpc = sim.controller
+
+    s = sim.state
+    log.info("initial", x=s.x, y=s.y, alpha=degrees(s.alpha),
+             ground_level=ps.groud_level,
+             ground_thickness=ps.groud_tickness)
+
+    y_target = sim.target_state.y
+
+    # Every telemetry tick goes to disk, see telemetry.load_telemetry
+    recorder = TelemetryRecorder(path="telemetry")
+
+    # Frames the video writer has no time for are dropped, never the sim's
+    video = None
+    if args.video:
+        video = sim.attach_video(VideoRecorder(args.video, fps=render_rate))
+
+    # Paced by the wall clock, physics catches up when it falls behind,
+    # frames are dropped
+    scheduler = sim.scheduler(control_rate=control_rate,
+                              render_rate=render_rate,
+                              telemetry_rate=telemetry_rate,
+                              recorder=recorder,
+                              stop_on_touchdown=False,
+                              realtime=True)
+
+    def status(current_time):
+        s = ps.rocket.state_vector
+        fields = {}
+        if mpc.staleness:
+            fields = dict(build_ms=mpc.last_build_time * 1e3,
+                          solve_ms=mpc.last_solve_time * 1e3,
+                          plan_age=mpc.staleness[-1],
+                          deadline_misses=mpc.deadline_misses)
+        log.info("status", t=current_time, thrust=-sim.thrust,
+                 nozzle_angle=degrees(sim.nozzle_angle), x=s.x, y=s.y,
+                 alpha=degrees(s.alpha), distance=y_target - s.y,
+                 y_dot=s.y_dot, **fields)
+
+    scheduler.add("status", status, status_rate)
+    scheduler.run(t_final=args.t_final)
+
+    log.info("end", t=sim.time)
+    for name, stats in scheduler.stats().items():
+        log.info("scheduler", task=name, **stats)
+    log.info("controller", **controller.stats())
+    log.info("fallbacks", shifted=controller.fallbacks[SHIFTED],
+             lqr=controller.fallbacks[LQR])
+    controller.close()
+    recorder.close()
+    if video is not None:
+        video.close()
+
+    if profiler.enabled:
+        profiler.write_csv(f"{args.profile}.csv")
+        profiler.write_chrome_trace(f"{args.profile}.trace.json")
+        for name, stats in profiler.stats().items():
+            log.info("profile", name=name, **stats)
+    if sink is not None:
+        sink.close()
+
+    # The figures are rendered by plots.py in its own processes, the run
+    # does not wait for them (telemetry/plots/*.png)
+    subprocess.Popen(
+        [sys.executable, os.path.join(os.path.dirname(__file__), "plots.py"),
+         recorder.path, "--t-start", "210"],
+        start_new_session=True)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,284 @@
+import argparse
+import glob
+import os
+from math import radians
+from time import perf_counter
+
+import numpy as np
+
+from batch_dynamics import BatchDynamics
+from mpc_controller import MPCController, APPROXIMATE, SOLVED, RETRIED
+from state_vector import State_Vector
+from telemetry import load_telemetry
+
+
+# Distilled MPC: a small MLP fitted offline on (state, target, u_opt) pairs
+# recorded from headless MPCController runs (TelemetryRecorder), evaluated
+# with numpy only. The inputs are the state relative to the target plus the
+# target height (the MPC weights depend on it), the outputs the controls
+# scaled to [0, 1] (thrust / T_max) and [-1, 1] (nozzle / its limit).
+
+NOZZLE_LIMIT = radians(60)
+
+
+def features(states, targets):
+    states = np.atleast_2d(states)
+    targets = np.broadcast_to(targets, states.shape)
+    return np.hstack((states - targets, targets[:, 1:2]))
+
+
+def load_dataset(paths):
+    # (features, controls) of every tick the MPC actually solved
+    X, U = [], []
+    for path in paths:
+        data = load_telemetry(path)
+        solved = np.isin(data.status, (SOLVED, RETRIED))
+        X.append(features(data.state[solved], data.target[solved]))
+        U.append(np.asarray(data.control[solved]))
+    return np.vstack(X), np.vstack(U)
+
+
+class MLP:
+    def __init__(self, sizes, seed: int = 0) -> None:
+        # tanh hidden layers, linear output
+        rng = np.random.default_rng(seed)
+        self.layers = [
+            (rng.normal(0, np.sqrt(1 / n_in), (n_in, n_out)), np.zeros(n_out))
+            for n_in, n_out in zip(sizes[:-1], sizes[1:])]
+
+    def forward(self, x, cache: list = None):
+        for i, (W, b) in enumerate(self.layers):
+            x = x @ W + b
+            if i < len(self.layers) - 1:
+                x = np.tanh(x)
+            if cache is not None:
+                cache.append(x)
+        return x
+
+    def fit(self, X, Y, epochs: int = 200, batch_size: int = 256,
+            lr: float = 1e-3, seed: int = 0):
+        # Mini-batch Adam on the mean squared error, returns the loss of
+        # every epoch
+        rng = np.random.default_rng(seed)
+        params = [p for layer in self.layers for p in layer]
+        m = [np.zeros_like(p) for p in params]
+        v = [np.zeros_like(p) for p in params]
+        beta1, beta2, eps = 0.9, 0.999, 1e-8
+        step = 0
+        losses = []
+        for _ in range(epochs):
+            order = rng.permutation(len(X))
+            total = 0.0
+            for start in range(0, len(X), batch_size):
+                batch = order[start:start + batch_size]
+                x, y = X[batch], Y[batch]
+                activations = []
+                out = self.forward(x, activations)
+                error = out - y
+                total += (error**2).sum()
+
+                # backward
+                grad = 2 * error / len(batch)
+                grads = []
+                for i in reversed(range(len(self.layers))):
+                    W, _ = self.layers[i]
+                    inputs = activations[i - 1] if i else x
+                    grads[:0] = [inputs.T @ grad, grad.sum(axis=0)]
+                    if i:
+                        grad = (grad @ W.T) * (1 - activations[i - 1]**2)
+
+                step += 1
+                for p, g, m_p, v_p in zip(params, grads, m, v):
+                    m_p *= beta1
+                    m_p += (1 - beta1) * g
+                    v_p *= beta2
+                    v_p += (1 - beta2) * g**2
+                    p -= lr * (m_p / (1 - beta1**step)) / \
+                        (np.sqrt(v_p / (1 - beta2**step)) + eps)
+            losses.append(total / Y.size)
+        return losses
+
+
+class MLPPolicy:
+    def __init__(self, mlp: MLP, mean, std, low, high, T_max=-600,
+                 nozzle_limit: float = NOZZLE_LIMIT) -> None:
+        # mean, std => input normalization
+        # low, high => box of the training inputs, anything outside it is
+        # out of distribution
+        self.mlp = mlp
+        self.mean, self.std = np.asarray(mean), np.asarray(std)
+        self.low, self.high = np.asarray(low), np.asarray(high)
+        self.T_max = T_max
+        self.nozzle_limit = nozzle_limit
+
+    @classmethod
+    def fit(cls, X, U, hidden=(64, 64), T_max=-600, epochs: int = 200,
+            seed: int = 0, **kwargs):
+        mean, std = X.mean(axis=0), X.std(axis=0) + 1e-9
+        mlp = MLP((X.shape[1],) + tuple(hidden) + (2,), seed=seed)
+        policy = cls(mlp, mean, std, X.min(axis=0), X.max(axis=0), T_max)
+        policy.losses = mlp.fit((X - mean) / std, policy.scale(U),
+                                epochs=epochs, seed=seed, **kwargs)
+        return policy
+
+    def scale(self, U):
+        return np.column_stack((U[:, 0] / self.T_max,
+                                U[:, 1] / self.nozzle_limit))
+
+    def __call__(self, X):
+        # features [B x 7] => controls [B x 2], inside the input bounds
+        y = self.mlp.forward((X - self.mean) / self.std)
+        return np.column_stack(
+            (np.clip(y[:, 0], 0, 1) * self.T_max,
+             np.clip(y[:, 1], -1, 1) * self.nozzle_limit))
+
+    def in_distribution(self, X):
+        return ((X >= self.low) & (X <= self.high)).all(axis=1)
+
+    def save(self, path):
+        tmp = f"{path}.{os.getpid()}.tmp.npz"
+        arrays = {f"W{i}": W for i, (W, _) in enumerate(self.mlp.layers)}
+        arrays.update({f"b{i}": b for i, (_, b) in enumerate(self.mlp.layers)})
+        np.savez(tmp, mean=self.mean, std=self.std, low=self.low,
+                 high=self.high, T_max=self.T_max,
+                 nozzle_limit=self.nozzle_limit, **arrays)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            mlp = MLP.__new__(MLP)
+            n = sum(1 for key in data.files if key.startswith("W"))
+            mlp.layers = [(data[f"W{i}"], data[f"b{i}"]) for i in range(n)]
+            return cls(mlp, data["mean"], data["std"], data["low"],
+                       data["high"], float(data["T_max"]),
+                       float(data["nozzle_limit"]))
+
+
+class MLPController:
+    def __init__(self, policy: MLPPolicy, fallback=None, mass=20,
+                 gravity=9.81, rocket_height=10, N: int = 5,
+                 alpha_limit: float = radians(60)) -> None:
+        # Same interface as MPCController. The real MPC (`fallback`) flies
+        # whenever the state is out of the training distribution, or the
+        # RK4 step of the MPC model under the MLP control leaves it or tilts
+        # the rocket past alpha_limit
+        self.policy = policy
+        self.fallback = fallback if fallback is not None \
+            else MPCController(gravity=gravity, mass=mass,
+                               rocket_height=rocket_height, N=N)
+        self.N = N
+        self.alpha_limit = alpha_limit
+        self.dynamics = BatchDynamics(gravity=gravity, mass=mass,
+                                      rocket_height=rocket_height)
+
+        self.last_build_time = 0.0
+        self.last_solve_time = 0.0
+        self.last_status = SOLVED
+        self.timings = []
+        # ticks flown by the fallback controller
+        self.misses = 0
+
+    def reset(self):
+        self.timings = []
+        self.misses = 0
+        self.fallback.reset()
+
+    def check(self, states, targets, controls, dt):
+        # [B] True where the MLP control can be used
+        X = features(states, targets)
+        ok = self.policy.in_distribution(X)
+        predicted = self.dynamics.step(states, controls, dt)
+        ok &= self.policy.in_distribution(features(predicted, targets))
+        ok &= np.abs(predicted[:, 2]) <= self.alpha_limit
+        return ok, predicted
+
+    def controls(self, states, targets, dt):
+        # Batched: [B x 6] states => [B x 2] controls and the [B] mask of
+        # the rockets the MLP may fly
+        controls = self.policy(features(states, targets))
+        ok, _ = self.check(states, targets, controls, dt)
+        return controls, ok
+
+    def setup_mpc(self, current_state: State_Vector,
+                  target_state: State_Vector, dt: float):
+        start = perf_counter()
+        self.current_state = current_state
+        self.target_state = target_state
+        self.dt = dt
+        self.state = np.array([[current_state.x, current_state.y,
+                                current_state.alpha, current_state.x_dot,
+                                current_state.y_dot,
+                                current_state.alpha_dot]])
+        self.target = np.array([target_state.x, target_state.y,
+                                target_state.alpha, target_state.x_dot,
+                                target_state.y_dot, target_state.alpha_dot])
+        self.last_build_time = perf_counter() - start
+        return None
+
+    def solve(self, U=None):
+        start = perf_counter()
+        controls = self.policy(features(self.state, self.target))
+        ok, predicted = self.check(self.state, self.target, controls, self.dt)
+        if ok[0]:
+            U_opt = np.repeat(controls, self.N, axis=0)
+            predicted_state = predicted[0]
+            self.last_status = APPROXIMATE
+        else:
+            self.misses += 1
+            U = self.fallback.setup_mpc(current_state=self.current_state,
+                                        target_state=self.target_state,
+                                        dt=self.dt)
+            U_opt, predicted_state = self.fallback.solve(U)
+            self.last_status = self.fallback.last_status
+        self.last_solve_time = perf_counter() - start
+        self.timings.append((self.last_build_time, self.last_solve_time))
+        return U_opt, predicted_state
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Distill the MPC into an MLP policy")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    collect = sub.add_parser("collect", help="record headless MPC landings")
+    collect.add_argument("--out", default="dataset")
+    collect.add_argument("--landings", type=int, default=8)
+    collect.add_argument("--t-final", type=float, default=60)
+    collect.add_argument("--seed", type=int, default=0)
+    collect.add_argument("--workers", type=int, default=None)
+
+    train = sub.add_parser("train", help="fit the MLP on recorded landings")
+    train.add_argument("runs", nargs="+", help="telemetry directories")
+    train.add_argument("--out", default="mlp_policy.npz")
+    train.add_argument("--epochs", type=int, default=200)
+    train.add_argument("--hidden", type=int, nargs="+", default=[64, 64])
+    args = parser.parse_args()
+
+    if args.command == "collect":
+        from campaign import run_campaign, sample_cases
+
+        start = perf_counter()
+        results = run_campaign(sample_cases(args.landings, seed=args.seed),
+                               workers=args.workers, t_final=args.t_final,
+                               telemetry_dir=args.out)
+        ticks = sum(r["ticks"] for r in results)
+        print(f"recorded {ticks} ticks to {args.out}/ "
+              f"in {perf_counter() - start:.1f}s")
+    else:
+        runs = [path for pattern in args.runs for path in glob.glob(pattern)]
+        X, U = load_dataset(runs)
+        start = perf_counter()
+        policy = MLPPolicy.fit(X, U, hidden=tuple(args.hidden),
+                               epochs=args.epochs)
+        policy.save(args.out)
+        error = np.abs(policy(X) - U)
+        print(f"{len(X)} samples, {args.epochs} epochs "
+              f"in {perf_counter() - start:.1f}s, final loss "
+              f"{policy.losses[-1]:.2e}")
+        print(f"training error: thrust mean {error[:, 0].mean():.1f} N, "
+              f"nozzle mean {np.degrees(error[:, 1].mean()):.2f} deg")
+
+
+if __name__ == "__main__":
+    main()
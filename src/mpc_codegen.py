@@ -0,0 +1,167 @@
+import casadi as ca
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from time import perf_counter
+from numpy import array, asarray
+
+
+# Cached solvers live here unless the caller asks for another directory
+DEFAULT_CACHE_DIR = os.environ.get(
+    "EARTHRETURN_CACHE",
+    os.path.join(os.path.expanduser("~"), ".cache", "earthreturn"),
+)
+
+
+def model_hash(controller) -> str:
+    # Everything that ends up inside the symbolic NLP, plus the source of the
+    # controller and of this module (solver options) so that editing the
+    # dynamics or the warm start settings invalidates the cache
+    source = hashlib.sha256()
+    for name in ("mpc_controller.py", "mpc_codegen.py"):
+        with open(os.path.join(os.path.dirname(__file__), name), "rb") as f:
+            source.update(f.read())
+
+    key = {
+        "gravity": controller.gravity,
+        "mass": controller.mass,
+        "rocket_height": controller.rocket_height,
+        "T_max": controller.T_max,
+        "N": controller.N,
+        "transcription": controller.transcription,
+        "degree": controller.degree,
+        "s_opts": controller.s_opts,
+        "casadi": ca.__version__,
+        "source": source.hexdigest(),
+    }
+    blob = json.dumps(key, sort_keys=True, default=str).encode()
+    return hashlib.sha256(blob).hexdigest()[:16]
+
+
+class CompiledHorizon:
+    def __init__(self, controller, codegen: bool = False, cache_dir=None,
+                 compiler: str = "gcc") -> None:
+        # codegen => C code generation + compile with the system compiler,
+        # otherwise the nlpsol is only serialized with Function.save
+        self.codegen = codegen
+        self.compiler = compiler
+        self.cache_dir = cache_dir or DEFAULT_CACHE_DIR
+        self.key = model_hash(controller)
+
+        name = f"mpc_{self.key}"
+        self.meta_path = os.path.join(self.cache_dir, name + ".json")
+        self.function_path = os.path.join(self.cache_dir, name + ".casadi")
+        self.c_path = os.path.join(self.cache_dir, name + ".c")
+        self.library_path = os.path.join(self.cache_dir, name + ".so")
+
+        start = perf_counter()
+        self.from_cache = self._cached()
+        if not self.from_cache:
+            self._export(controller)
+        self._load(controller)
+        # Time spent getting a ready-to-call solver (build or load)
+        self.load_time = perf_counter() - start
+
+    def _cached(self) -> bool:
+        target = self.library_path if self.codegen else self.function_path
+        return os.path.exists(self.meta_path) and os.path.exists(target)
+
+    def _export(self, controller):
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        # Build the same horizon NLP as the persistent Opti
+        opti = ca.Opti()
+        X0 = opti.parameter(6)
+        Z = opti.parameter(6)
+        W = opti.parameter(5)
+        DT = opti.parameter()
+        U, _ = controller.build_horizon(opti, X0, Z, W, DT)
+
+        nlp = {"x": opti.x, "p": opti.p, "f": opti.f, "g": opti.g}
+        solver = ca.nlpsol("mpc", "ipopt", nlp, self._options(controller))
+
+        meta = {
+            "n_x": opti.x.shape[0],
+            "n_p": opti.p.shape[0],
+            "n_u": U.shape[0] * U.shape[1],
+            "lbg": array(ca.evalf(opti.lbg)).ravel().tolist(),
+            "ubg": array(ca.evalf(opti.ubg)).ravel().tolist(),
+        }
+
+        # Everything is written to a private temporary directory and moved
+        # into place with os.replace, so processes sharing a cold cache never
+        # see a half-written file
+        tmp_dir = tempfile.mkdtemp(dir=self.cache_dir, prefix=".export-")
+        try:
+            tmp_function = os.path.join(tmp_dir, "mpc.casadi")
+            solver.save(tmp_function)
+
+            if self.codegen:
+                # The generated file holds the expanded objective, constraints
+                # and their derivatives, IPOPT itself stays in casadi.
+                # generate_dependencies always writes to the working
+                # directory, so it runs in a child process inside tmp_dir
+                subprocess.run(
+                    [sys.executable, "-c",
+                     "import casadi; casadi.Function.load('mpc.casadi')"
+                     ".generate_dependencies('mpc.c')"],
+                    cwd=tmp_dir, check=True,
+                )
+                subprocess.run(
+                    [self.compiler, "-fPIC", "-shared", "-O2",
+                     "mpc.c", "-o", "mpc.so"],
+                    cwd=tmp_dir, check=True,
+                )
+                os.replace(os.path.join(tmp_dir, "mpc.c"), self.c_path)
+                os.replace(os.path.join(tmp_dir, "mpc.so"), self.library_path)
+            else:
+                os.replace(tmp_function, self.function_path)
+
+            # Written last so a half-finished export is never picked up
+            tmp_meta = os.path.join(tmp_dir, "mpc.json")
+            with open(tmp_meta, "w") as f:
+                json.dump(meta, f)
+            os.replace(tmp_meta, self.meta_path)
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def _options(self, controller):
+        p_opts = dict(controller.p_opts)
+        p_opts["ipopt"] = dict(p_opts.get("ipopt", {}))
+        p_opts["ipopt"].update(controller.s_opts)
+        p_opts["ipopt"]["warm_start_init_point"] = "yes"
+        p_opts["ipopt"]["warm_start_bound_push"] = 1e-9
+        p_opts["ipopt"]["warm_start_mult_bound_push"] = 1e-9
+        return p_opts
+
+    def _load(self, controller):
+        with open(self.meta_path) as f:
+            meta = json.load(f)
+        self.n_x = meta["n_x"]
+        self.n_u = meta["n_u"]
+        self.lbg = array(meta["lbg"])
+        self.ubg = array(meta["ubg"])
+
+        if self.codegen:
+            options = self._options(controller)
+            options.pop("expand", None)
+            self.solver = ca.nlpsol("mpc", "ipopt", self.library_path, options)
+        else:
+            self.solver = ca.Function.load(self.function_path)
+
+    def __call__(self, p, x0=None, lam_g0=None):
+        args = {"p": p, "lbg": self.lbg, "ubg": self.ubg}
+        if x0 is not None:
+            args["x0"] = x0
+        if lam_g0 is not None:
+            args["lam_g0"] = lam_g0
+        result = self.solver(**args)
+        return (asarray(result["x"]).ravel(),
+                asarray(result["lam_g"]).ravel())
+
+    def stats(self):
+        return self.solver.stats()
@@ -1,12 +1,60 @@
 import casadi as ca
-from numpy import array
+from copy import deepcopy
+from numpy import array, hstack, zeros, repeat, poly1d, polyder
+from time import perf_counter
 from state_vector import State_Vector
 from math import radians, sin, cos
-from utils import state_space_to_mpc_vector
+from utils import state_space_to_mpc_vector, shift_plan
+from mpc_codegen import CompiledHorizon
+from mpc_rti import RealTimeIteration
+from fallback import LQRFallback
+from event_log import get_logger, DEBUG
+from profiler import profiler, solver_stats
+
+
+log = get_logger("mpc")
+# a solver in trouble fails every tick
+log.limit("fallback", rate=1)
+
+
+# last_status of a tick
+SOLVED = 0
+# the warm started solve failed, the cold start retry succeeded
+RETRIED = 1
+# the solve failed or ran out of time (fallback=True):
+# the last feasible plan shifted one more step
+SHIFTED = 2
+# no plan left to shift, the LQR law around the target
+LQR = 3
+# no solve at all, an approximation of the MPC policy (table, MLP)
+APPROXIMATE = 4
+
+
+def collocation_coefficients(degree):
+    # Lagrange polynomial coefficients on the Legendre collocation points
+    # C[r, j] => derivative of the r-th basis polynomial at point j
+    # D[r] => r-th basis polynomial at the end of the interval
+    tau = [0] + ca.collocation_points(degree, "legendre")
+    C = zeros((degree + 1, degree + 1))
+    D = zeros(degree + 1)
+    for j in range(degree + 1):
+        p = poly1d([1])
+        for r in range(degree + 1):
+            if r != j:
+                p *= poly1d([1, -tau[r]]) / (tau[j] - tau[r])
+        D[j] = p(1.0)
+        p_der = polyder(p)
+        for r in range(degree + 1):
+            C[j, r] = p_der(tau[r])
+    return C, D
 
 
 class MPCController:
-    def __init__(self, gravity=9.81, mass=20, rocket_height=10, T_max=-600, N=5):
+    def __init__(self, gravity=9.81, mass=20, rocket_height=10, T_max=-600, N=5,
+                 persistent=True, backend="opti", cache_dir=None,
+                 transcription="single_shooting", degree=3,
+                 mode="ipopt", qp_solver="qrqp", rti_reference_every=0,
+                 rti_iterations=2, time_budget=None, fallback=False):
         self.gravity = gravity
         self.mass = mass
         self.T_max = T_max
@@ -16,6 +64,151 @@ class MPCController:
         self.rocket_height = rocket_height
         self.I = (1 / 12) * mass * (rocket_height**2)
 
+        # persistent => build the NLP once and only update parameters
+        # every tick, otherwise the problem is rebuilt on each setup_mpc
+        self.persistent = persistent
+        self._built = False
+
+        # single_shooting, multiple_shooting or collocation
+        # degree => number of collocation points per interval
+        self.transcription = transcription
+        self.degree = degree
+        self.S = None
+
+        # opti => casadi Opti stack
+        # function => serialized nlpsol loaded from the on-disk cache
+        # codegen => C generated and compiled nlpsol loaded from the cache
+        # The compiled backends are always persistent
+        self.backend = backend
+        self.cache_dir = cache_dir
+        self.compiled = None
+
+        # ipopt => solve the NLP to convergence every tick
+        # rti => real-time iteration, rti_iterations condensed QPs per tick
+        # with qp_solver (qrqp, osqp, ...) and an IPOPT reference solve
+        # every rti_reference_every ticks to log the suboptimality
+        self.mode = mode
+        self.qp_solver = qp_solver
+        self.rti_reference_every = rti_reference_every
+        self.rti_iterations = rti_iterations
+        self.rti = None
+
+        self.p_opts = {
+            "print_time": False,  # Disable printing of timing information
+            "ipopt": {
+                "print_level": 0,  # Set print level to 0 (no output)
+                "sb": "yes",  # Suppress IPOPT banner
+                "file_print_level": 0,  # No output in log files
+            },
+            "expand": True,
+        }
+        self.s_opts = {"max_iter": 50, "print_level": 0, "sb": "yes"}
+        if transcription == "collocation":
+            # With IPOPT's gradient based scaling the cold start of the
+            # collocation NLP crawls (about 250 iterations at N=30, every one
+            # regularizing the Hessian). Unscaled it takes 15-70 iterations,
+            # warm started ticks still take 6-10.
+            self.s_opts["nlp_scaling_method"] = "none"
+            self.s_opts["max_iter"] = 100
+
+        # time_budget => wall clock limit of one IPOPT solve in seconds. A
+        # solve that runs out of it fails like any other, with a budget the
+        # cold start retry is skipped so a tick never pays for two solves.
+        # fallback => a failed solve does not raise, see fall_back()
+        self.time_budget = time_budget
+        if time_budget is not None:
+            self.s_opts["max_wall_time"] = time_budget
+        self.fallback = fallback
+        self.fallback_law = LQRFallback(self)
+
+        # Warm start data from the previous tick
+        self.U_opt = None
+        self.lam_g = None
+        self.x_opt = None
+        self.S_opt = None
+        # Last plan the solver delivered (or its shifted fallback), and how
+        # many times it has been shifted since
+        self.last_plan = None
+        self.plan_age = 0
+
+        # (build time, solve time) in seconds for each tick
+        self.last_build_time = 0.0
+        self.last_solve_time = 0.0
+        self.last_status = SOLVED
+        self.timings = []
+        # fallback events per status and the time each one took
+        self.fallbacks = {SHIFTED: 0, LQR: 0}
+        self.fallback_times = []
+
+    def reset(self):
+        # Forget the warm start and timings, e.g. before a new landing
+        self.forget_plan()
+        self.timings = []
+        self.fallbacks = {SHIFTED: 0, LQR: 0}
+        self.fallback_times = []
+        if self.rti is not None:
+            self.rti.reset()
+
+    # what the next solve starts from, see warm_start
+    WARM_START = ("U_opt", "lam_g", "x_opt", "S_opt", "last_plan", "plan_age",
+                  "last_status")
+
+    def warm_start(self) -> dict:
+        # A copy of the warm start, to continue from the same point later
+        # or in another process with set_warm_start
+        data = {name: deepcopy(getattr(self, name))
+                for name in self.WARM_START}
+        # the shape of the problem it belongs to, see set_warm_start
+        data["problem"] = self._problem()
+        if self.rti is not None:
+            data["rti"] = {"U": deepcopy(self.rti.U), "tick": self.rti.tick,
+                           "last_step": self.rti.last_step}
+        return data
+
+    def set_warm_start(self, data: dict):
+        # The problem itself is built by the next setup_mpc if needed. The
+        # warm start must come from a controller solving the same problem
+        if "async" in data:
+            raise ValueError("Warm start of an AsyncController, restore it "
+                             "into an AsyncController")
+        if data["problem"] != self._problem():
+            raise ValueError(f"Warm start of a {data['problem']} controller, "
+                             f"this one is {self._problem()}")
+        self.forget_plan()
+        for name in self.WARM_START:
+            setattr(self, name, deepcopy(data[name]))
+        if "rti" in data:
+            if self.rti is None:
+                self.rti = RealTimeIteration(
+                    self, qp_solver=self.qp_solver,
+                    reference_every=self.rti_reference_every,
+                    iterations=self.rti_iterations)
+            self.rti.U = deepcopy(data["rti"]["U"])
+            self.rti.tick = data["rti"]["tick"]
+            self.rti.last_step = data["rti"]["last_step"]
+
+    def _problem(self) -> dict:
+        # what the shapes of the warm start depend on
+        return {"N": self.N, "mode": self.mode,
+                "transcription": self.transcription,
+                "degree": self.degree if self.transcription == "collocation"
+                else None}
+
+    def forget_plan(self):
+        self.U_opt = None
+        self.lam_g = None
+        self.x_opt = None
+        self.S_opt = None
+        self.last_plan = None
+        self.plan_age = 0
+        if self._built:
+            # the persistent Opti still holds the last solution as its
+            # initial guess
+            self.opti.set_initial(self.U, 0)
+            self.opti.set_initial(self.opti.lam_g, 0)
+        if self.rti is not None:
+            self.rti.U = None
+
     def dot_s(self, current_state: ca.DM, u: ca.MX):
         # System Dynamic
 
@@ -61,28 +254,27 @@ class MPCController:
     ########################################################
     #                   Setup MPC
     ########################################################
-    def setup_mpc(
-        self, current_state: State_Vector, target_state: State_Vector, dt: float
-    ):
-        self.initial_state = current_state
-        self.dt = dt
-        # X is current state
-        X = state_space_to_mpc_vector(current_state)
-        # Z is target state
-        Z = state_space_to_mpc_vector(target_state)
-
+    def weights(self, X: ca.DM, Z: ca.DM, target_state: State_Vector):
+        # [q, x_penalty, alpha_penalty, dot_y_penalty, alpha_dot_penalty]
         residual = X - Z
+        q = 1e3
+        alpha_penalty = 4e7
+        dot_y_penalty = 5e3 / (abs(residual[1] / (target_state.y + 1e-6)))
+        alpha_dot_penalty = 5e5 * (abs(X[5]))
+        # FIXME: x penalty limited me on the initial state of the rocket [not used]
+        x_penalty = 1e4
+        return ca.vertcat(
+            q, x_penalty, alpha_penalty, dot_y_penalty, alpha_dot_penalty
+        )
 
-        q = self.opti.parameter()
+    def cost_matrices(self, W):
+        q = W[0]
+        x_penalty = W[1]
+        alpha_penalty = W[2]
+        dot_y_penalty = W[3]
+        alpha_dot_penalty = W[4]
 
-        self.opti.set_value(q, 1)
-        Q = ca.MX(6, 6)
-        Q[0, 0] = q
-        Q[1, 1] = q
-        Q[2, 2] = q
-        Q[3, 3] = q
-        Q[4, 4] = q
-        Q[5, 5] = q
+        Q = ca.diag(ca.vertcat(q, q, q, q, q, q))
 
         # Penalize the controls [2x2]
         R = ca.DM(
@@ -92,48 +284,69 @@ class MPCController:
             ]
         )
 
-        #########################################
-
-        alpha_penalty = self.opti.parameter()
-        alpha_dot_penalty = self.opti.parameter()
-
-        dot_y_penalty = self.opti.parameter()
-        x_penalty = self.opti.parameter()
-        self.opti.set_value(q, 1e3)
-
-        self.opti.set_value(alpha_penalty, 4e7)
-        self.opti.set_value(
-            dot_y_penalty, 5e3 / (abs(residual[1] / (target_state.y + 1e-6)))
+        Q_F = ca.diag(
+            ca.vertcat(
+                x_penalty, q, alpha_penalty, q, dot_y_penalty, alpha_dot_penalty
+            )
         )
 
-        self.opti.set_value(alpha_dot_penalty, 5e5 * (abs(X[5])))
-        # FIXME: x penalty limited me on the initial state of the rocket [not used]
-        self.opti.set_value(x_penalty, 1e4)
-
-        Q_F = ca.MX(6, 6)
-        Q_F[0, 0] = x_penalty
-        Q_F[1, 1] = q
-        Q_F[2, 2] = alpha_penalty
-        Q_F[3, 3] = q
-        Q_F[4, 4] = dot_y_penalty
-        Q_F[5, 5] = alpha_dot_penalty
-
         R_F = ca.DM(
             [
                 [1, 0],
                 [0, 2e3],
             ]
         )
+        return Q, R, Q_F, R_F
+
+    def build_horizon(self, opti: ca.Opti, X, Z, W, dt):
+        Q, R, Q_F, R_F = self.cost_matrices(W)
 
         #########################################
 
+        def stage_cost(X, u_i):
+            return (X - Z).T @ Q @ (X - Z) + u_i @ R @ u_i.T
+
+        def terminal_cost(X, u_i):
+            return (X - Z).T @ Q_F @ (X - Z) + u_i @ R_F @ u_i.T
+
         # N horizon, each [F_T, theta]
-        U = self.opti.variable(self.N, 2)
+        U = opti.variable(self.N, 2)
+
+        if self.transcription == "single_shooting":
+            S = None
+            cost = self.single_shooting(X, U, dt, stage_cost, terminal_cost)
+        elif self.transcription == "multiple_shooting":
+            S = opti.variable(6, self.N + 1)
+            cost = self.multiple_shooting(
+                opti, X, U, S, dt, stage_cost, terminal_cost)
+        elif self.transcription == "collocation":
+            # S holds the interval states followed by the collocation states
+            S = opti.variable(6, (self.N + 1) + self.N * self.degree)
+            cost = self.collocation(
+                opti, X, U, S, dt, stage_cost, terminal_cost)
+        else:
+            raise ValueError(f"Unknown transcription: {self.transcription}")
+
+        opti.minimize(cost)
+
+        ###########################################
+        # Set the constraints on the control inputs
+        ###########################################
+
+        # 0 <= T <= T_max
+        opti.subject_to(opti.bounded(self.T_max, U[:, 0], 0))
+        # -0.2 Radians < theta < 0.2 Radians
+        t_limit = radians(60)
+        opti.subject_to(opti.bounded(-t_limit, U[:, 1], t_limit))
+        return U, S
+
+    def single_shooting(self, X, U, dt, stage_cost, terminal_cost):
+        # The state is eliminated, X_N is N nested RK4 steps of X_0
         cost = 0
 
         for i in range(self.N - 1):
             u_i = U[i, :]
-            cost_i = (X - Z).T @ Q @ (X - Z) + u_i @ R @ u_i.T
+            cost_i = stage_cost(X, u_i)
 
             X = self.new_state(current_state=X, u=u_i.T, dt=dt)
 
@@ -141,36 +354,195 @@ class MPCController:
 
         # Putting more weight on the last step
         X = self.new_state(current_state=X, u=u_i.T, dt=dt)
-        cost = cost + (X - Z).T @ Q_F @ (X - Z) + u_i @ R_F @ u_i.T
+        cost = cost + terminal_cost(X, u_i)
+        return cost
 
-        self.opti.minimize(cost)
-
-        ###########################################
-        # Set the constraints on the control inputs
-        ###########################################
+    def multiple_shooting(self, opti, X, U, S, dt, stage_cost, terminal_cost):
+        # The states are decision variables tied together by defect
+        # constraints S[k+1] == F(S[k], u_k)
+        F = self.rk4_function()
+        cost = 0
 
-        # 0 <= T <= T_max
-        self.opti.subject_to(self.opti.bounded(self.T_max, U[:, 0], 0))
-        # -0.2 Radians < theta < 0.2 Radians
-        t_limit = radians(60)
-        self.opti.subject_to(self.opti.bounded(-t_limit, U[:, 1], t_limit))
-        return U
+        opti.subject_to(S[:, 0] - X == 0)
+        for i in range(self.N - 1):
+            u_i = U[i, :]
+            cost = cost + stage_cost(S[:, i], u_i)
+            opti.subject_to(S[:, i + 1] == F(S[:, i], u_i.T, dt))
+
+        # Same as single shooting, the last step reuses the last control
+        opti.subject_to(S[:, self.N] == F(S[:, self.N - 1], u_i.T, dt))
+        cost = cost + terminal_cost(S[:, self.N], u_i)
+        return cost
+
+    def collocation(self, opti, X, U, S, dt, stage_cost, terminal_cost):
+        # Direct collocation on Legendre points, the dynamics are enforced
+        # on `degree` points inside every interval
+        f = self.dynamics_function()
+        C, D = collocation_coefficients(self.degree)
+        d = self.degree
+        n = self.N + 1
+        cost = 0
 
-    def solve(self, U):
-        p_opts = {
-            "print_time": False,  # Disable printing of timing information
-            "ipopt": {
-                "print_level": 0,  # Set print level to 0 (no output)
-                "sb": "yes",  # Suppress IPOPT banner
-                "file_print_level": 0,  # No output in log files
-            },
-            "expand": True,
-        }
-        s_opts = {"max_iter": 50, "print_level": 0, "sb": "yes"}
+        opti.subject_to(S[:, 0] - X == 0)
+        for i in range(self.N):
+            # the last interval reuses the last control like the shooting ones
+            u_i = U[min(i, self.N - 2), :]
+            if i < self.N - 1:
+                cost = cost + stage_cost(S[:, i], u_i)
+
+            S_c = S[:, n + i * d: n + (i + 1) * d]
+            X_end = D[0] * S[:, i]
+            for j in range(1, d + 1):
+                # state derivative at the collocation point
+                x_p = C[0, j] * S[:, i]
+                for r in range(d):
+                    x_p = x_p + C[r + 1, j] * S_c[:, r]
+                opti.subject_to(dt * f(S_c[:, j - 1], u_i.T) == x_p)
+                X_end = X_end + D[j] * S_c[:, j - 1]
+
+            opti.subject_to(S[:, i + 1] == X_end)
+
+        cost = cost + terminal_cost(S[:, self.N], u_i)
+        return cost
+
+    def initial_states(self, X, dt):
+        # Cold start guess for the state decision variables: roll the
+        # model forward with the engine off
+        X = array(X, dtype=float).ravel()
+        nodes = [X]
+        for _ in range(self.N):
+            X = self.rk4_numeric(X, [0.0, 0.0], dt)
+            nodes.append(X)
+        nodes = array(nodes).T
+        if self.transcription == "collocation":
+            # collocation states start at the state of their interval
+            nodes = hstack((nodes, repeat(nodes[:, :-1], self.degree, axis=1)))
+        return nodes
+
+    def dynamics_function(self):
+        x = ca.SX.sym("x", 6)
+        u = ca.SX.sym("u", 2)
+        return ca.Function("f", [x, u], [self.dot_s(x, u)])
+
+    def rk4_function(self):
+        x = ca.SX.sym("x", 6)
+        u = ca.SX.sym("u", 2)
+        dt = ca.SX.sym("dt")
+        return ca.Function("F", [x, u, dt], [self.new_state(x, u, dt)])
+
+    def build(self):
+        # The horizon NLP is built only once, everything that changes
+        # from tick to tick is an opti.parameter
+        self.opti = ca.Opti()
+        self.X0 = self.opti.parameter(6)
+        self.Z = self.opti.parameter(6)
+        self.W = self.opti.parameter(5)
+        self.DT = self.opti.parameter()
+
+        self.U, self.S = self.build_horizon(
+            self.opti, self.X0, self.Z, self.W, self.DT)
+
+        p_opts = dict(self.p_opts)
+        s_opts = dict(self.s_opts)
+        # reuse the previous primal-dual solution as starting point
+        s_opts["warm_start_init_point"] = "yes"
+        s_opts["warm_start_bound_push"] = 1e-9
+        s_opts["warm_start_mult_bound_push"] = 1e-9
         self.opti.solver("ipopt", p_opts, s_opts)
+        self._built = True
+
+    def setup_mpc(
+        self, current_state: State_Vector, target_state: State_Vector, dt: float
+    ):
+        # timed on every path, the RTI and compiled ones return early
+        start = perf_counter()
+        try:
+            return self._setup(current_state, target_state, dt)
+        finally:
+            self.last_build_time = perf_counter() - start
+            profiler.add("mpc.setup", start, self.last_build_time)
+
+    def _setup(self, current_state: State_Vector, target_state: State_Vector,
+               dt: float):
+        self.initial_state = current_state
+        self.target_state = target_state
+        self.dt = dt
+        if self.fallback:
+            # the LQR gain is computed once per dt, not on the failing tick
+            self.fallback_law.gain(dt)
+        # X is current state
+        X = state_space_to_mpc_vector(current_state)
+        # Z is target state
+        Z = state_space_to_mpc_vector(target_state)
+
+        W = self.weights(X, Z, target_state)
+
+        if self.mode == "rti":
+            if self.rti is None:
+                self.rti = RealTimeIteration(
+                    self, qp_solver=self.qp_solver,
+                    reference_every=self.rti_reference_every,
+                    iterations=self.rti_iterations)
+            self.p = ca.vertcat(X, Z, W, dt)
+            return None
+
+        if self.backend != "opti":
+            if self.compiled is None:
+                self.compiled = CompiledHorizon(
+                    self, codegen=self.backend == "codegen",
+                    cache_dir=self.cache_dir)
+            self.p = ca.vertcat(X, Z, W, dt)
+            return None
+
+        if not self.persistent:
+            # Rebuild the whole problem from scratch on a fresh Opti
+            self.opti = ca.Opti()
+            U, S = self.build_horizon(self.opti, X, Z, W, dt)
+            if S is not None:
+                self.opti.set_initial(S, self.initial_states(X, dt))
+            return U
+
+        if not self._built:
+            self.build()
+
+        self.opti.set_value(self.X0, X)
+        self.opti.set_value(self.Z, Z)
+        self.opti.set_value(self.W, W)
+        self.opti.set_value(self.DT, dt)
+
+        if self.U_opt is not None:
+            U_init = shift_plan(self.U_opt)
+            self.opti.set_initial(self.U, U_init)
+            self.opti.set_initial(self.opti.lam_g, self.lam_g)
+            if self.S is not None:
+                self.opti.set_initial(self.S, self.S_opt)
+        elif self.S is not None:
+            # No plan yet
+            self.opti.set_initial(self.S, self.initial_states(X, dt))
+
+        return self.U
 
-        solution = self.opti.solve()
-        U_opt = solution.value(U)
+    def solve(self, U):
+        start = perf_counter()
+        self.last_status = SOLVED
+        try:
+            U_opt = self.solve_plan(U)
+            self.last_plan = U_opt
+            self.plan_age = 0
+        except RuntimeError as e:
+            if not self.fallback:
+                raise
+            U_opt = self.fall_back()
+            log.warning("fallback", status=self.last_status,
+                        plan_age=self.plan_age, error=e)
+
+        self.last_solve_time = perf_counter() - start
+        self.timings.append((self.last_build_time, self.last_solve_time))
+        profiler.add("mpc.solve", start, self.last_solve_time)
+        if log.enabled(DEBUG):
+            log.debug("solve", status=self.last_status,
+                      build_time=self.last_build_time,
+                      solve_time=self.last_solve_time)
 
         u_optimal=[U_opt[0,0],U_opt[0,1]]
         predicted_state = \
@@ -179,6 +551,105 @@ class MPCController:
                                                     dt=self.dt)
         return U_opt,predicted_state
 
+    def solve_plan(self, U):
+        if self.mode == "rti":
+            U_opt = self.U_opt = self.rti.step(self.p)
+        elif self.backend != "opti":
+            U_opt = self.solve_compiled()
+        else:
+            if not self.persistent:
+                self.opti.solver("ipopt", self.p_opts, self.s_opts)
+
+            try:
+                solution = self.opti.solve()
+            except RuntimeError:
+                if not self.persistent or self.U_opt is None or \
+                        self.time_budget is not None:
+                    raise
+                # The shifted plan can be far from the new optimum after a
+                # sudden change, retry once from a cold start
+                self.cold_start()
+                self.last_status = RETRIED
+                log.info("cold_retry")
+                solution = self.opti.solve()
+            U_opt = solution.value(U)
+            if profiler.enabled:
+                solver_stats(self.opti.stats())
+
+            if self.persistent:
+                self.U_opt = U_opt
+                self.lam_g = solution.value(self.opti.lam_g)
+                if self.S is not None:
+                    self.S_opt = solution.value(self.S)
+        return U_opt
+
+    def fall_back(self):
+        # The solve failed or ran out of time: fly the last feasible plan
+        # one step further, once it is used up the LQR law takes over
+        start = perf_counter()
+        if self.last_plan is not None and self.plan_age < self.N - 1:
+            U_opt = self.last_plan = shift_plan(self.last_plan)
+            self.plan_age += 1
+            self.last_status = SHIFTED
+            # the next tick is warm started from it
+            self.U_opt = U_opt
+            if self.rti is not None:
+                self.rti.U = U_opt
+        else:
+            # and the next solve starts cold
+            self.forget_plan()
+            U_opt = self.fallback_law.plan(
+                state_space_to_mpc_vector(self.initial_state),
+                state_space_to_mpc_vector(self.target_state), self.dt)
+            self.last_status = LQR
+        self.fallbacks[self.last_status] += 1
+        self.fallback_times.append(perf_counter() - start)
+        return U_opt
+
+    def cold_start(self):
+        # Drop the warm start of the persistent Opti problem
+        X = self.opti.value(self.X0)
+        dt = self.opti.value(self.DT)
+        self.opti.set_initial(self.U, 0)
+        self.opti.set_initial(self.opti.lam_g, 0)
+        if self.S is not None:
+            self.opti.set_initial(self.S, self.initial_states(X, dt))
+
+    def solve_compiled(self):
+        n_u = self.compiled.n_u
+        # Everything after the controls is the state trajectory, single
+        # shooting has no state variables
+        x_cold = zeros(n_u)
+        if self.compiled.n_x > n_u:
+            S_init = self.initial_states(self.p[:6], float(self.p[-1]))
+            x_cold = hstack((x_cold, S_init.ravel(order="F")))
+        if self.x_opt is None:
+            x_opt, lam_g = self.compiled(self.p, x0=x_cold)
+        else:
+            # The controls come first in the decision vector, stored column
+            # by column, shift them like in the Opti warm start
+            x0 = self.x_opt.copy()
+            U_init = shift_plan(self.U_opt)
+            x0[:n_u] = U_init.ravel(order="F")
+            x_opt, lam_g = self.compiled(self.p, x0=x0, lam_g0=self.lam_g)
+            if not self.compiled.stats()["success"] and \
+                    self.time_budget is None:
+                # retry once from a cold start, see solve()
+                self.last_status = RETRIED
+                x_opt, lam_g = self.compiled(self.p, x0=x_cold)
+
+        stats = self.compiled.stats()
+        if profiler.enabled:
+            solver_stats(stats)
+        if not stats["success"]:
+            raise RuntimeError(
+                f"Compiled MPC solve failed: {stats['return_status']}")
+
+        self.x_opt = x_opt
+        self.lam_g = lam_g
+        self.U_opt = x_opt[:self.compiled.n_u].reshape((self.N, 2), order="F")
+        return self.U_opt
+
     def dot_s_n(self, current_state, u):
                 # System Dynamic numerical version
 
@@ -219,7 +690,9 @@ class MPCController:
             current_state.y_dot,
             current_state.alpha_dot,
         ]
+        return self.rk4_numeric(cs, optimal_u, dt)
 
+    def rk4_numeric(self, cs, optimal_u, dt):
         k1 = self.dot_s_n(cs, optimal_u)
         k2 = self.dot_s_n(cs + 0.5 * dt *  array(k1), optimal_u)
         k3 = self.dot_s_n(cs + 0.5 * dt * array(k2), optimal_u)
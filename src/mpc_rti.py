@@ -0,0 +1,178 @@
+import casadi as ca
+from time import perf_counter
+from math import radians
+from numpy import array, asarray, maximum, minimum, vstack, zeros
+from numpy.linalg import eigh
+from utils import shift_plan
+
+
+class RealTimeIteration:
+    def __init__(self, controller, qp_solver: str = "qrqp",
+                 reference_every: int = 0, iterations: int = 2) -> None:
+        # Real-time iteration: a fixed number of QPs per tick, starting from
+        # the shifted previous plan. The states are condensed out, the QP
+        # only has the controls and their bounds. The last control never
+        # enters the cost (the last step reuses the one before), so only the
+        # first N - 1 controls are optimized.
+        #
+        # The residuals stay large (the target is hundreds of pixels away),
+        # so a Gauss-Newton Hessian is a poor model and made the nozzle
+        # chatter. The exact Hessian is used, made positive definite, and a
+        # backtracking line search on the exact cost globalizes the step.
+        self.controller = controller
+        self.N = controller.N
+        self.qp_solver = qp_solver
+        # QPs per tick. With one the plan falls behind when the weights move
+        # quickly (dot_y_penalty close to the ground) and the closed loop
+        # diverges, two keep it on the IPOPT solution
+        self.iterations = iterations
+        # Every `reference_every` ticks the full IPOPT problem is solved as
+        # well to measure the suboptimality of the RTI step (0 => never)
+        self.reference_every = reference_every
+
+        start = perf_counter()
+        self._build()
+        self.build_time = perf_counter() - start
+
+        self.U = None
+        self.tick = 0
+        self.last_solve_time = 0.0
+        # step length taken by the last line search
+        self.last_step = 1.0
+        # one dict per reference solve
+        self.log = []
+
+    def residuals(self, X, Z, U, W, dt):
+        # Same cost as MPCController.single_shooting written as r.T @ r
+        Q, R, Q_F, R_F = self.controller.cost_matrices(W)
+        q, r, q_f, r_f = (ca.sqrt(ca.diag(M)) for M in (Q, R, Q_F, R_F))
+        F = self.controller.rk4_function()
+
+        terms = []
+        for i in range(self.N - 1):
+            u_i = U[i, :].T
+            terms += [q * (X - Z), r * u_i]
+            X = F(X, u_i, dt)
+
+        # Putting more weight on the last step (reusing the last control)
+        X = F(X, u_i, dt)
+        terms += [q_f * (X - Z), r_f * u_i]
+        return ca.vertcat(*terms)
+
+    def _build(self):
+        n = self.N - 1
+        X0 = ca.SX.sym("X0", 6)
+        Z = ca.SX.sym("Z", 6)
+        W = ca.SX.sym("W", 5)
+        dt = ca.SX.sym("dt")
+        p = ca.vertcat(X0, Z, W, dt)
+        U = ca.SX.sym("U", n, 2)
+        u = ca.vec(U)
+
+        r = self.residuals(X0, Z, U, W, dt)
+
+        # QP in the step du around the linearization point u:
+        # min 0.5 du.T H du + g.T du
+        cost = ca.sumsqr(r)
+        H, g = ca.hessian(cost, u)
+        self.qp_data = ca.Function("qp_data", [u, p], [ca.densify(H), g])
+        self.cost = ca.Function("cost", [u, p], [cost])
+
+        options = {"error_on_fail": False}
+        if self.qp_solver == "qrqp":
+            options["print_iter"] = False
+            options["print_header"] = False
+        elif self.qp_solver == "qpoases":
+            options["printLevel"] = "none"
+        elif self.qp_solver == "osqp":
+            options["osqp"] = {"verbose": False}
+        qp = {"h": ca.Sparsity.dense(2 * n, 2 * n), "a": ca.Sparsity(0, 2 * n)}
+        self.qp = ca.conic("rti", self.qp_solver, qp, options)
+
+        t_limit = radians(60)
+        self.lbu = array([self.controller.T_max] * n + [-t_limit] * n)
+        self.ubu = array([0.0] * n + [t_limit] * n)
+
+        # The exact single shooting NLP, used as reference
+        controller = self.controller
+        nlp = {"x": u, "p": p, "f": ca.sumsqr(r)}
+        self.reference = ca.nlpsol(
+            "reference", "ipopt", nlp,
+            dict(controller.p_opts, calc_lam_p=False, ipopt=dict(
+                controller.p_opts["ipopt"], **controller.s_opts)))
+
+    def step(self, p):
+        start = perf_counter()
+        if self.U is None:
+            # engine off, inside the bounds
+            u_lin = zeros(2 * (self.N - 1))
+        else:
+            u_lin = shift_plan(self.U)[:-1].ravel(order="F")
+
+        u = u_lin
+        for _ in range(self.iterations):
+            H, g = self.qp_data(u, p)
+            result = self.qp(h=self.convexify(H), g=g,
+                             lbx=self.lbu - u, ubx=self.ubu - u)
+            if not self.qp.stats()["success"]:
+                raise RuntimeError(
+                    f"RTI QP failed: {self.qp.stats()['return_status']}")
+
+            du = asarray(result["x"]).ravel()
+            du *= self.line_search(u, du, p, float(ca.dot(g, du)))
+            # the active set solvers can end a hair outside the box
+            u = minimum(maximum(u + du, self.lbu), self.ubu)
+
+        U = u.reshape((self.N - 1, 2), order="F")
+        # the unused last control repeats the one before, like shift_plan
+        self.U = vstack((U, U[-1:, :]))
+        self.last_solve_time = perf_counter() - start
+        self.tick += 1
+
+        if self.reference_every and self.tick % self.reference_every == 0:
+            self.compare_with_reference(p, u_lin, u)
+
+        return self.U
+
+    @staticmethod
+    def convexify(H, ratio=1e-6):
+        # Mirror negative eigenvalues of the (small, dense) Hessian and
+        # keep the rest away from zero. Only clipping them to ~0 gives huge
+        # steps along the directions of negative curvature
+        w, V = eigh(asarray(H))
+        w = maximum(abs(w), ratio * max(abs(w).max(), 1.0))
+        return (V * w) @ V.T
+
+    def line_search(self, u, du, p, slope, shrink=0.5, min_step=1e-3):
+        # A full step from a plan far from the optimum overshoots, the
+        # nozzle goes bang-bang and the closed loop diverges. Backtrack
+        # until the exact cost decreases enough (Armijo)
+        cost = float(self.cost(u, p))
+        t = 1.0
+        while t > min_step and \
+                float(self.cost(u + t * du, p)) > cost + 1e-4 * t * slope:
+            t *= shrink
+        self.last_step = t
+        return t
+
+    def compare_with_reference(self, p, u_lin, u):
+        start = perf_counter()
+        reference = self.reference(x0=u_lin, p=p, lbx=self.lbu, ubx=self.ubu)
+        reference_time = perf_counter() - start
+
+        rti_cost = float(self.cost(u, p))
+        ipopt_cost = float(reference["f"])
+        self.log.append({
+            "tick": self.tick,
+            "rti_time": self.last_solve_time,
+            "ipopt_time": reference_time,
+            "rti_cost": rti_cost,
+            "ipopt_cost": ipopt_cost,
+            "suboptimality": (rti_cost - ipopt_cost) / max(abs(ipopt_cost), 1e-9),
+            "ipopt_status": self.reference.stats()["return_status"],
+        })
+
+    def reset(self):
+        self.U = None
+        self.tick = 0
+        self.log = []
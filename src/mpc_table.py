@@ -0,0 +1,292 @@
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from time import perf_counter
+
+import numpy as np
+
+from batch_dynamics import BatchDynamics
+from mpc_controller import MPCController, APPROXIMATE, SOLVED
+from state_vector import State_Vector
+
+
+# Explicit MPC: the first optimal control of MPCController tabulated on a
+# grid of states relative to the target, interpolated multilinearly at run
+# time. The weights of the MPC depend on the target height, so a table only
+# holds for the target (and dt) it was built for.
+
+# Grid axes of [x, y, alpha, x_dot, y_dot, alpha_dot] - target, covering
+# the landings of campaign.sample_cases. The dot_y penalty grows like
+# 1 / |y - y_target|, the y axis gets denser close to the ground and never
+# reaches it (the penalty is infinite there)
+DEFAULT_AXES = (
+    np.linspace(-150, 150, 5),
+    -np.geomspace(800, 2, 10),
+    np.linspace(-0.9, 0.9, 5),
+    np.linspace(-150, 150, 5),
+    np.linspace(-20, 80, 5),
+    np.linspace(-2.4, 2.4, 5),
+)
+DEFAULT_TARGET = (400, 937.5, 0, 0, 0, 0)
+
+# One controller per worker process, see campaign._init_worker
+_controller = None
+_settings = None
+
+
+def _init_worker(controller_kwargs, settings):
+    global _controller, _settings
+    _controller = MPCController(**controller_kwargs)
+    _settings = settings
+
+
+def solve_points(points):
+    # Cold solve at every point so that the table does not depend on the
+    # order the points are visited in. A failed solve leaves NaN
+    target = State_Vector(*_settings["target"])
+    controls = np.full((len(points), 2), np.nan)
+    for i, point in enumerate(points):
+        _controller.reset()
+        state = State_Vector(*(np.add(_settings["target"], point)))
+        try:
+            U = _controller.setup_mpc(current_state=state,
+                                      target_state=target,
+                                      dt=_settings["dt"])
+            U_opt, _ = _controller.solve(U)
+            controls[i] = np.asarray(U_opt)[0]
+        except RuntimeError:
+            pass
+    return controls
+
+
+def build_table(axes=DEFAULT_AXES, target=DEFAULT_TARGET,
+                controller_kwargs=None, dt: float = 1 / 50,
+                workers: int = None, chunksize: int = 64, progress=None):
+    controller_kwargs = controller_kwargs or {"mass": 30}
+    axes = tuple(np.asarray(axis, dtype=float) for axis in axes)
+    shape = tuple(len(axis) for axis in axes)
+    points = np.stack(np.meshgrid(*axes, indexing="ij"), -1).reshape(-1, 6)
+    chunks = [points[i:i + chunksize]
+              for i in range(0, len(points), chunksize)]
+
+    settings = {"target": list(target), "dt": dt}
+    controls = []
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count(),
+                             initializer=_init_worker,
+                             initargs=(controller_kwargs, settings)) as executor:
+        for result in executor.map(solve_points, chunks):
+            controls.append(result)
+            if progress is not None:
+                progress(sum(map(len, controls)), len(points))
+
+    values = np.vstack(controls).reshape(shape + (2,))
+    return ControlTable(axes, values, target, dt, controller_kwargs)
+
+
+class ControlTable:
+    def __init__(self, axes, values, target, dt, controller_kwargs) -> None:
+        # values [len(axis_0) x ... x len(axis_5) x 2]
+        self.axes = tuple(np.asarray(axis, dtype=float) for axis in axes)
+        self.values = np.asarray(values, dtype=np.float32)
+        self.target = np.asarray(target, dtype=float)
+        self.dt = dt
+        self.controller_kwargs = controller_kwargs
+
+        # The 2^6 corners of a grid cell as offsets into the flat values
+        shape = self.values.shape[:-1]
+        strides = np.array([int(np.prod(shape[d + 1:])) for d in range(6)])
+        self._corners = np.array(list(product((0, 1), repeat=6)), dtype=bool)
+        self._offsets = self._corners.astype(np.int64) @ strides
+        self._strides = strides
+        self._flat = self.values.reshape(-1, 2)
+
+    def __len__(self):
+        return len(self._flat)
+
+    def __repr__(self) -> str:
+        failed = np.isnan(self._flat).any(axis=1).sum()
+        return f"ControlTable(shape={self.values.shape[:-1]}, failed={failed})"
+
+    def lookup(self, states):
+        # states [B x 6] absolute => controls [B x 2] and inside [B], False
+        # where the state is off the grid (clamped to its border) or the
+        # cell touches a failed solve (NaN)
+        q = np.atleast_2d(np.asarray(states, dtype=float)) - self.target
+        B = len(q)
+        base = np.zeros(B, dtype=np.int64)
+        t = np.empty((B, 6))
+        inside = np.ones(B, dtype=bool)
+        for d, axis in enumerate(self.axes):
+            # the y axis is decreasing
+            ascending = axis[-1] > axis[0]
+            a = axis if ascending else axis[::-1]
+            i = np.clip(np.searchsorted(a, q[:, d]) - 1, 0, len(a) - 2)
+            s = (q[:, d] - a[i]) / (a[i + 1] - a[i])
+            inside &= (s >= 0) & (s <= 1)
+            s = np.clip(s, 0, 1)
+            if not ascending:
+                i = len(a) - 2 - i
+                s = 1 - s
+            base += i * self._strides[d]
+            t[:, d] = s
+
+        # weight of each corner, [B x 64]
+        weights = np.where(self._corners[None], t[:, None, :],
+                           1 - t[:, None, :]).prod(axis=2)
+        corners = self._flat[base[:, None] + self._offsets[None]]
+        controls = np.einsum("bc,bcu->bu", weights, corners)
+        inside &= ~np.isnan(controls).any(axis=1)
+        return controls, inside
+
+    def save(self, path):
+        # written next to the target and moved, like the solver cache
+        tmp = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez_compressed(
+            tmp, values=self.values, target=self.target,
+            dt=self.dt, controller_kwargs=json.dumps(self.controller_kwargs),
+            **{f"axis_{d}": axis for d, axis in enumerate(self.axes)})
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(axes=[data[f"axis_{d}"] for d in range(6)],
+                       values=data["values"], target=data["target"],
+                       dt=float(data["dt"]),
+                       controller_kwargs=json.loads(
+                           str(data["controller_kwargs"])))
+
+
+class TableController:
+    def __init__(self, table: ControlTable, fallback=None, N: int = 5) -> None:
+        # Same interface as MPCController. States off the table (or on a
+        # cell with a failed solve) go to `fallback` (e.g. the online
+        # MPCController) when there is one, otherwise the clamped value is
+        # used. The plan repeats the tabulated first control
+        self.table = table
+        self.fallback = fallback
+        self.N = N
+        kwargs = table.controller_kwargs
+        self.dynamics = BatchDynamics(
+            gravity=kwargs.get("gravity", 9.81), mass=kwargs.get("mass", 20),
+            rocket_height=kwargs.get("rocket_height", 10))
+
+        self.last_build_time = 0.0
+        self.last_solve_time = 0.0
+        self.last_status = SOLVED
+        self.timings = []
+        # ticks flown by the fallback controller
+        self.misses = 0
+
+    def reset(self):
+        self.timings = []
+        self.misses = 0
+        if self.fallback is not None:
+            self.fallback.reset()
+
+    def setup_mpc(self, current_state: State_Vector,
+                  target_state: State_Vector, dt: float):
+        start = perf_counter()
+        target = [target_state.x, target_state.y, target_state.alpha,
+                  target_state.x_dot, target_state.y_dot,
+                  target_state.alpha_dot]
+        if not np.allclose(target, self.table.target) or \
+                not np.isclose(dt, self.table.dt):
+            raise ValueError(
+                f"Table built for target {self.table.target.tolist()} and "
+                f"dt {self.table.dt}, got {target} and {dt}")
+        self.current_state = current_state
+        self.target_state = target_state
+        self.dt = dt
+        self.state = np.array([[current_state.x, current_state.y,
+                                current_state.alpha, current_state.x_dot,
+                                current_state.y_dot,
+                                current_state.alpha_dot]])
+        self.last_build_time = perf_counter() - start
+        return None
+
+    def solve(self, U=None):
+        start = perf_counter()
+        controls, inside = self.table.lookup(self.state)
+        if not inside[0] and self.fallback is not None:
+            self.misses += 1
+            U = self.fallback.setup_mpc(current_state=self.current_state,
+                                        target_state=self.target_state,
+                                        dt=self.dt)
+            U_opt, predicted_state = self.fallback.solve(U)
+            self.last_status = self.fallback.last_status
+        else:
+            U_opt = np.repeat(controls, self.N, axis=0)
+            predicted_state = self.dynamics.step(self.state, controls,
+                                                 self.dt)[0]
+            self.last_status = APPROXIMATE
+        self.last_solve_time = perf_counter() - start
+        self.timings.append((self.last_build_time, self.last_solve_time))
+        return U_opt, predicted_state
+
+
+def evaluate(table: ControlTable, samples: int = 200, seed: int = 0):
+    # Table against the online (cold started) MPC at random states inside
+    # the grid. Returns the errors and the time per state of both
+    rng = np.random.default_rng(seed)
+    low = np.array([axis.min() for axis in table.axes])
+    high = np.array([axis.max() for axis in table.axes])
+    states = table.target + rng.uniform(low, high, (samples, 6))
+
+    start = perf_counter()
+    controls, inside = table.lookup(states)
+    lookup_time = (perf_counter() - start) / samples
+
+    _init_worker(table.controller_kwargs,
+                 {"target": table.target.tolist(), "dt": table.dt})
+    start = perf_counter()
+    exact = solve_points(states - table.target)
+    solve_time = (perf_counter() - start) / samples
+
+    valid = inside & ~np.isnan(exact).any(axis=1)
+    error = np.abs(controls[valid] - exact[valid])
+    return {
+        "samples": samples,
+        "valid": int(valid.sum()),
+        "thrust_error_mean": error[:, 0].mean(),
+        "thrust_error_p95": np.percentile(error[:, 0], 95),
+        "nozzle_error_mean_deg": np.degrees(error[:, 1].mean()),
+        "nozzle_error_p95_deg": np.degrees(np.percentile(error[:, 1], 95)),
+        "lookup_us": lookup_time * 1e6,
+        "solve_us": solve_time * 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Tabulate the MPC policy offline and check the table")
+    parser.add_argument("command", choices=["build", "evaluate"])
+    parser.add_argument("--table", default="mpc_table.npz")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--N", type=int, default=5)
+    parser.add_argument("--dt", type=float, default=1 / 50)
+    parser.add_argument("--samples", type=int, default=200,
+                        help="random states compared with the online MPC")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        def progress(done, total):
+            print(f"\r{done}/{total} points", end="", flush=True)
+
+        start = perf_counter()
+        table = build_table(controller_kwargs={"mass": 30, "N": args.N},
+                            dt=args.dt, workers=args.workers,
+                            progress=progress)
+        table.save(args.table)
+        print(f"\n{table} written to {args.table} "
+              f"in {perf_counter() - start:.1f}s")
+    else:
+        table = ControlTable.load(args.table)
+        for key, value in evaluate(table, samples=args.samples).items():
+            print(f"{key}: {value:.4g}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+from copy import copy
+from math import pi
+
+import numpy as np
+
+from event_log import get_logger, DEBUG
+from exhaust_flame import ExhaustFlame
+from physics_simulator import Physics_Simulator
+from profiler import profiler
+from rocket import Rocket, Size
+from state_vector import State_Vector
+
+
+log = get_logger("physics")
+
+
+class RigidBodies:
+    def __init__(self, states, mass=30, size=(190 / 2, 210 / 2),
+                 gravity=(0.0, 981), ground_level: float = None,
+                 ground_thickness: float = 10) -> None:
+        # B rockets (boxes) in pymunk's units and conventions: pixels,
+        # y down, thrust scaled by 100 (see Rocket.apply_force), integrated
+        # like pymunk's space.step. states [B x 6] are
+        # [x, y, alpha, x_dot, y_dot, alpha_dot], mass a scalar or [B].
+        # ground_level => a flat ground, see contact(), None => no ground
+        states = np.atleast_2d(np.asarray(states, dtype=float))
+        self.B = len(states)
+        self.pos = states[:, :2].copy()
+        self.angle = states[:, 2].copy()
+        self.vel = states[:, 3:5].copy()
+        self.omega = states[:, 5].copy()
+
+        self.mass = np.broadcast_to(np.asarray(mass, dtype=float),
+                                    (self.B,)).copy()
+        self.size = size
+        width, height = size
+        # moment of a box, what pymunk computes for Poly.create_box
+        self.moment = self.mass * (width**2 + height**2) / 12
+        self.gravity = np.asarray(gravity, dtype=float)
+        self.ground_level = ground_level
+        self.ground_thickness = ground_thickness
+
+        # Held over the next step (zero order hold), cleared by it like
+        # pymunk's body.force / body.torque. The thrust follows the body
+        # when a step is split
+        self.thrust = np.zeros(self.B)
+        self.nozzle_angle = np.zeros(self.B)
+        self.external = np.zeros((self.B, 2))
+        # last adaptive step size, see step
+        self.h = None
+
+    @property
+    def states(self) -> np.ndarray:
+        return np.column_stack((self.pos, self.angle, self.vel, self.omega))
+
+    def apply_thrust(self, thrust, nozzle_angle, index=slice(None)):
+        # Rocket.apply_force for all the rockets (or `index`) at once
+        self.thrust[index] = thrust
+        self.nozzle_angle[index] = nozzle_angle
+
+    def apply_force(self, force, index=slice(None)):
+        # at the centre of mass, already in pymunk units
+        self.external[index] += force
+
+    def accelerations(self, angle):
+        thrust = self.thrust * 100
+        direction = -angle + self.nozzle_angle + pi / 2
+        fx = thrust * np.cos(direction)
+        fy = thrust * np.sin(direction)
+        # nozzle at the bottom of the body, (0, h / 2) rotated by -angle
+        half = self.size[1] * 0.5
+        torque = half * np.sin(angle) * fy - half * np.cos(angle) * fx
+        force = np.column_stack((fx, fy)) + self.external
+        return (self.gravity + force / self.mass[:, None],
+                torque / self.moment)
+
+    def euler(self, state, h):
+        # pymunk moves the bodies with the velocities of the previous step,
+        # then applies the forces
+        pos, angle, vel, omega = state
+        acc, angular_acc = self.accelerations(angle)
+        return (pos + vel * h, angle + omega * h,
+                vel + acc * h, omega + angular_acc * h)
+
+    def contact(self):
+        # Inelastic contact with a flat ground: a box that sinks into it is
+        # pushed back on top, stops falling and stops turning. No friction
+        # or tipping, a landing ends at the first touch anyway
+        width, height = self.size
+        extent = 0.5 * (width * np.abs(np.sin(self.angle))
+                        + height * np.abs(np.cos(self.angle)))
+        surface = self.ground_level - self.ground_thickness
+        hit = self.pos[:, 1] + extent >= surface
+        if hit.any():
+            self.pos[hit, 1] = surface - extent[hit]
+            self.vel[hit, 1] = np.minimum(self.vel[hit, 1], 0)
+            self.omega[hit] = 0
+
+    def step(self, dt: float, substeps: int = 1, tolerance: float = None,
+             min_step: float = 1e-5):
+        # dt in `substeps` equal steps. With a tolerance (pixels over dt)
+        # the steps adapt instead: a step h is kept when it and two half
+        # steps end less than tolerance * h / dt apart (position, or the
+        # nozzle for the angle) for every rocket. The method is first order,
+        # that difference is the error of the half steps, the kept step
+        # extrapolates them to second order. One step size for the whole
+        # batch, carried over to the next call. Returns the number of steps
+        half = self.size[1] * 0.5
+        h = dt / substeps if tolerance is None or self.h is None else self.h
+        t, steps = 0.0, 0
+        while dt - t > 1e-9 * dt:
+            h_step = min(h, dt - t)
+            state = (self.pos, self.angle, self.vel, self.omega)
+            if tolerance is None:
+                state = self.euler(state, h_step)
+            else:
+                full = self.euler(state, h_step)
+                halves = self.euler(self.euler(state, h_step / 2), h_step / 2)
+                error = max(np.abs(full[0] - halves[0]).max(),
+                            half * np.abs(full[1] - halves[1]).max())
+                # Richardson extrapolation, second order
+                state = tuple(2 * b - a for a, b in zip(full, halves))
+                allowed = tolerance * h_step / dt
+                factor = min(2.0, max(0.2, 0.9 * allowed / max(error, 1e-300)))
+                if error > allowed and h_step > min_step:
+                    h = max(h_step * factor, min_step)
+                    continue
+                if h_step == h:
+                    h *= factor
+                self.h = h
+            self.pos, self.angle, self.vel, self.omega = state
+            if self.ground_level is not None:
+                self.contact()
+            t += h_step
+            steps += 1
+        self.thrust[:] = 0
+        self.nozzle_angle[:] = 0
+        self.external[:] = 0
+        return steps
+
+
+class NumpyRocket(Rocket):
+    def __init__(self, state_vector: State_Vector,
+                 mass: float = 10.0,
+                 position=(0, 0),
+                 size=(190/2, 210/2),
+                 nozzel_angle: float = 0.0) -> None:
+        # Rocket without a pymunk body, one row of a RigidBodies
+        self.mass = mass
+        self.nozzle_angle = nozzel_angle
+        self.position = position
+        self.state_vector = state_vector
+        self.size = Size(*size)
+        self.current_thrust = (0, 0)
+        self.bodies = None
+        self.index = 0
+
+    def apply_force(self, force: float, nozzle_angle: float = 0.0):
+        self.current_thrust = force
+        self.nozzle_angle = nozzle_angle
+        self.bodies.apply_thrust(force, nozzle_angle, self.index)
+
+    def update_state_vector(self) -> None:
+        b, i = self.bodies, self.index
+        self.state_vector.x, self.state_vector.y = b.pos[i]
+        self.state_vector.alpha = b.angle[i]
+        self.state_vector.x_dot, self.state_vector.y_dot = b.vel[i]
+        self.state_vector.alpha_dot = b.omega[i]
+
+
+class NumpyPhysicsSimulator(Physics_Simulator):
+    def __init__(self, rocket: NumpyRocket,
+                 ground_height,
+                 gravity_x: float = 0.0,
+                 gravity_y: float = +981,
+                 substeps: int = 1,
+                 tolerance: float = None,
+                 sprite_resolution: float = 0.5,
+                 smooth_sprites: bool = False,
+                 ) -> None:
+        # Physics_Simulator without pymunk, the rocket is integrated by
+        # RigidBodies. Drawing is inherited
+        # tolerance => adaptive steps, see RigidBodies.step
+        self.substeps = substeps
+        self.tolerance = tolerance
+        self.steps = 0
+        self.sprite_resolution = sprite_resolution
+        self.smooth_sprites = smooth_sprites
+        # held in bodies.external instead
+        self._external_force = None
+        self._gravity = gravity_x, gravity_y
+        self._rocket = rocket
+        self.groud_level = ground_height
+        self.groud_tickness = 10
+
+        s = rocket.state_vector
+        # like Rocket: the initial alpha_dot and x_dot are not used
+        self.bodies = RigidBodies(
+            [[s.x, s.y, s.alpha, 0, s.y_dot, 0]], mass=rocket.mass,
+            size=tuple(rocket.size), gravity=self._gravity,
+            ground_level=ground_height if gravity_y > 0 else None,
+            ground_thickness=self.groud_tickness)
+        rocket.bodies = self.bodies
+        rocket.index = 0
+
+        self.exhaust_flame = ExhaustFlame(ground=self.groud_level - self.groud_tickness,
+                                          position=(0, 0),
+                                          thrust_force=1,
+                                          angle=0.0,
+                                          number_of_particles=500)
+
+    def update_rocket_state(self, dt):
+        with profiler.span("physics.step"):
+            steps = self.bodies.step(dt, self.substeps, self.tolerance)
+        self.steps += steps
+        self.rocket.update_state_vector()
+        if log.enabled(DEBUG):
+            log.debug("step", dt=dt, steps=steps, h=self.bodies.h,
+                      x=self.bodies.pos[0, 0], y=self.bodies.pos[0, 1],
+                      alpha=self.bodies.angle[0])
+
+    def apply_external_force(self, force):
+        self.bodies.apply_force(force, self.rocket.index)
+
+    def body_state(self) -> dict:
+        b = self.bodies
+        return {name: copy(getattr(b, name)) for name in
+                ("pos", "angle", "vel", "omega", "thrust", "nozzle_angle",
+                 "external", "h")}
+
+    def set_body_state(self, state: dict):
+        for name, value in state.items():
+            setattr(self.bodies, name, copy(value))
+
+    def __repr__(self) -> str:
+        return f"p: {tuple(self.bodies.pos[0])}, v: {tuple(self.bodies.vel[0])}"
@@ -1,11 +1,16 @@
-import pymunk
-import pygame
+import assets
 from rocket import Rocket
 from elements import Elements
 from math import degrees
 from exhaust_flame import ExhaustFlame
 from math import exp
+from copy import copy
 from utils import rotate_point
+from event_log import get_logger, DEBUG
+from profiler import profiler
+
+
+log = get_logger("physics")
 
 
 class Physics_Simulator(Elements):
@@ -13,7 +18,12 @@ class Physics_Simulator(Elements):
                  ground_height,
                  gravity_x: float = 0.0,
                  gravity_y: float = +981,
+                 substeps: int = 1,
+                 sprite_resolution: float = 0.5,
+                 smooth_sprites: bool = False,
                  ) -> None:
+        import pymunk
+
         self._gravity = gravity_x, gravity_y
 
         self._rocket = rocket
@@ -39,6 +49,18 @@ class Physics_Simulator(Elements):
 
         self._print_options = pymunk.SpaceDebugDrawOptions()
 
+        # physics steps per update_rocket_state, the forces are held over
+        # all of them
+        self.substeps = substeps
+        self.steps = 0
+        self._external_force = None
+
+        # the rocket is drawn from rotations cached every sprite_resolution
+        # degrees (assets.RotationCache), None => rotated every frame
+        # smooth_sprites => filtered rotations (rotozoom)
+        self.sprite_resolution = sprite_resolution
+        self.smooth_sprites = smooth_sprites
+
         self.exhaust_flame = ExhaustFlame(ground=self.groud_level - self.groud_tickness,
                                           position=(0, 0),
                                           thrust_force=1,
@@ -50,25 +72,104 @@ class Physics_Simulator(Elements):
         return self._rocket
 
     def update_rocket_state(self, dt):
-        self._space.step(dt)
-        self.rocket.update_state_vector()
+        # pymunk clears the forces after every step, from the second
+        # substep on the last thrust of Rocket.apply_force is applied again
+        # at the new angle
+        rocket = self.rocket
+        with profiler.span("physics.step"):
+            for substep in range(self.substeps):
+                if substep:
+                    if not isinstance(rocket.current_thrust, tuple):
+                        rocket.apply_force(rocket.current_thrust,
+                                           rocket.nozzle_angle)
+                    if self._external_force is not None:
+                        self._push(self._external_force)
+                self._space.step(dt / self.substeps)
+        self.steps += self.substeps
+        self._external_force = None
+        rocket.update_state_vector()
+        if log.enabled(DEBUG):
+            body = rocket.body
+            log.debug("step", dt=dt, substeps=self.substeps,
+                      x=body.position.x, y=body.position.y, alpha=body.angle,
+                      force=tuple(body.force), torque=body.torque)
+
+    def apply_external_force(self, force):
+        # at the centre of mass, in pymunk units, until the next
+        # update_rocket_state
+        self._external_force = tuple(force)
+        self._push(self._external_force)
+
+    def _push(self, force):
+        body = self.rocket.body
+        body.apply_force_at_world_point(force=force, point=body.position)
+
+    def snapshot(self, particles: bool = False) -> dict:
+        # The rocket's body, the held controls and the exhaust flame
+        rocket = self.rocket
+        return {"body": self.body_state(),
+                "state_vector": copy(rocket.state_vector),
+                "current_thrust": rocket.current_thrust,
+                "nozzle_angle": rocket.nozzle_angle,
+                "external_force": self._external_force,
+                "steps": self.steps,
+                "flame": self.exhaust_flame.snapshot(particles)}
+
+    def restore(self, snapshot: dict):
+        rocket = self.rocket
+        self.set_body_state(snapshot["body"])
+        rocket.state_vector = copy(snapshot["state_vector"])
+        rocket.current_thrust = snapshot["current_thrust"]
+        rocket.nozzle_angle = snapshot["nozzle_angle"]
+        self._external_force = snapshot["external_force"]
+        self.steps = snapshot["steps"]
+        self.exhaust_flame.restore(snapshot["flame"])
+
+    def body_state(self) -> dict:
+        body = self.rocket.body
+        return {"position": tuple(body.position),
+                "velocity": tuple(body.velocity),
+                "angle": body.angle,
+                "angular_velocity": body.angular_velocity,
+                "force": tuple(body.force),
+                "torque": body.torque}
+
+    def set_body_state(self, state: dict):
+        body = self.rocket.body
+        body.position = state["position"]
+        body.velocity = state["velocity"]
+        body.angle = state["angle"]
+        body.angular_velocity = state["angular_velocity"]
+        body.force = state["force"]
+        body.torque = state["torque"]
+        # the collision shapes follow the body
+        self._space.reindex_shapes_for_body(body)
 
     def __repr__(self) -> str:
         # return f"{self._space.debug_draw(self._print_options)}"
         return f"p: {self._rocket.body.position}, v: {self._rocket.body.velocity}"
 
     def draw(self, screen):
+        import pygame
+
         # Draw the rocket
 
         # Unfiltered counterclockwise rotation.
         # The angle argument represents degrees and can be any floating point value.
         # Negative angle amounts will rotate clockwise.
-        rotated_image = pygame.transform.rotate(
-            self._rocket.image, degrees(self._rocket.body.angle))
+        state = self._rocket.state_vector
+        with profiler.span("render.rocket"):
+            if self.sprite_resolution:
+                rotated_image = assets.rotations(
+                    self._rocket.image_name, self._rocket.size,
+                    self.sprite_resolution, self.smooth_sprites).get(
+                        degrees(state.alpha))
+            else:
+                rotated_image = pygame.transform.rotate(
+                    self._rocket.image, degrees(state.alpha))
 
-        rect = rotated_image.get_rect(
-            center=(self._rocket.body.position.x, self._rocket.body.position.y))
-        screen.blit(rotated_image, rect.topleft)
+            rect = rotated_image.get_rect(center=(state.x, state.y))
+            drawn = screen.blit(rotated_image, rect.topleft)
 
 
         # \frac{1}{1+e^{-4\left(x\cdot2-1\right)}}
@@ -81,16 +182,17 @@ class Physics_Simulator(Elements):
                                                    (self._rocket.size.height * 0.5),
                                                    cx=rect.centerx,
                                                    cy=rect.centery,
-                                                   angle=-self._rocket.body.angle)
+                                                   angle=-state.alpha)
 
-        self.exhaust_flame.angle = self._rocket.body.angle + self._rocket.nozzle_angle
+        self.exhaust_flame.angle = state.alpha + self._rocket.nozzle_angle
 
         # From current_thrust we can identify the direction and magnitude
         # of the force and there is no need for rocket angle
         self.exhaust_flame.thrust_force = self._rocket.current_thrust
 
         # Emit new particles
-        self.exhaust_flame.emit()
+        with profiler.span("flame.emit"):
+            self.exhaust_flame.emit()
 
         #########################################################
         #########################################################
@@ -100,5 +202,8 @@ class Physics_Simulator(Elements):
         #     self._rocket.wpx), int(self._rocket.wpy)), 10)
 
         # Update and draw particles
-        self.exhaust_flame.update()
-        self.exhaust_flame.draw(screen)
+        with profiler.span("flame.update"):
+            self.exhaust_flame.update()
+        with profiler.span("flame.draw"):
+            flame = self.exhaust_flame.draw(screen)
+        return [drawn] + flame
@@ -0,0 +1,183 @@
+import argparse
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+
+import numpy as np
+
+from telemetry import load_telemetry
+
+
+# name => (title, column, index, transform, with the MPC prediction)
+FIGURES = {
+    "alpha": (r"$\alpha$ (deg)", "state", 2, "degrees", True),
+    "alpha_dot": (r"$\dot{\alpha}$ (deg/sec)", "state", 5, "degrees", True),
+    "y_dot": (r"$\dot{Y}$ (m/s)", "state", 4, None, True),
+    "x": (r"$X$ (m)", "state", 0, None, True),
+    "nozzle": (r"Nozzle (deg)", "control", 1, "degrees", False),
+    "thrust": (r"Thrust (N)", "control", 0, "abs", False),
+}
+
+# dpi of the final figures and of the quick previews
+DPI = 600
+PREVIEW_DPI = 100
+
+CACHE = "plots.json"
+
+TRANSFORMS = {None: lambda v: v, "degrees": np.degrees, "abs": np.abs}
+
+
+def series(telemetry, figure):
+    _, column, index, transform, with_prediction = FIGURES[figure]
+    f = TRANSFORMS[transform]
+    measured = f(telemetry[column][:, index])
+    predicted = f(telemetry["predicted"][:, index]) if with_prediction \
+        else None
+    return telemetry.t, measured, predicted
+
+
+def figure_hash(telemetry, figure, dpi) -> str:
+    # The figure only depends on its own inputs and on this file, so a
+    # recording that did not change (or only changed in other columns)
+    # is not rendered again
+    digest = hashlib.sha256()
+    with open(__file__, "rb") as f:
+        digest.update(f.read())
+    digest.update(json.dumps([figure, dpi]).encode())
+    for values in series(telemetry, figure):
+        if values is not None:
+            digest.update(np.ascontiguousarray(values).tobytes())
+    return digest.hexdigest()[:16]
+
+
+def render_figure(path, figure, out_path, t_start, t_end, dpi):
+    # Runs on a worker: reads the memory-mapped recording itself so only
+    # file names cross the process boundary
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    telemetry = load_telemetry(path).between(t_start, t_end)
+    t, measured, predicted = series(telemetry, figure)
+    title = FIGURES[figure][0]
+
+    plt.style.use("seaborn-v0_8-deep")
+
+    colors = ["blue", "red"]
+
+    font = {'family' : 'Sans serif',
+            'weight' : 'bold',
+            'size'   : 14}
+
+    plt.rc('font', **font)
+
+    fig, ax = plt.subplots(figsize=(10, 8))
+
+    ax.plot(t, measured, label=f"{title} (Original)", linewidth=2, color=colors[0])
+
+    if predicted is not None:
+        # a sample's prediction is for the next sample's instant
+        ax.plot(t[1:], predicted[:-1], label=f"{title} (Predicted)", linewidth=2, color=colors[1], linestyle="dashed")
+
+    ax.set_title(title, fontsize=12, fontweight="bold")
+    ax.set_xlabel("Time (s)")
+    ax.set_ylabel("Value")
+
+    ax.grid(which="both")
+    ax.grid(which="minor", alpha=0.2)
+    ax.grid(which="major", alpha=0.5)
+
+    ax.legend(fontsize=18)
+
+    # written next to the target and moved, a killed render never leaves
+    # a truncated png behind
+    root, ext = os.path.splitext(out_path)
+    tmp = f"{root}.{os.getpid()}.tmp{ext}"
+    fig.savefig(tmp, dpi=dpi, bbox_inches="tight")
+    plt.close(fig)
+    os.replace(tmp, out_path)
+    return out_path
+
+
+def render_run(path, out_dir=None, figures=None, t_start: float = -np.inf,
+               t_end: float = np.inf, preview: bool = False,
+               workers: int = None, force: bool = False):
+    # Renders the figures of a recording (see TelemetryRecorder) into
+    # out_dir, by default path/plots. Returns {figure: png path} of the
+    # figures that were rendered, the rest were up to date
+    out_dir = out_dir or os.path.join(path, "plots")
+    figures = figures or list(FIGURES)
+    dpi = PREVIEW_DPI if preview else DPI
+    suffix = "-preview" if preview else ""
+    os.makedirs(out_dir, exist_ok=True)
+
+    cache_path = os.path.join(out_dir, CACHE)
+    cache = {}
+    if os.path.exists(cache_path):
+        with open(cache_path) as f:
+            cache = json.load(f)
+
+    telemetry = load_telemetry(path).between(t_start, t_end)
+    jobs = {}
+    for figure in figures:
+        out_path = os.path.join(out_dir, f"{figure}{suffix}.png")
+        key = figure_hash(telemetry, figure, dpi)
+        if force or cache.get(out_path) != key or \
+                not os.path.exists(out_path):
+            jobs[figure] = (out_path, key)
+
+    rendered = {}
+    if jobs:
+        with ProcessPoolExecutor(
+                max_workers=min(workers or os.cpu_count(), len(jobs))) \
+                as executor:
+            futures = {
+                figure: executor.submit(render_figure, path, figure,
+                                        out_path, t_start, t_end, dpi)
+                for figure, (out_path, _) in jobs.items()}
+            for figure, future in futures.items():
+                out_path, key = jobs[figure]
+                rendered[figure] = future.result()
+                cache[out_path] = key
+
+        tmp = cache_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(cache, f, indent=1, sort_keys=True)
+        os.replace(tmp, cache_path)
+    return rendered
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Render the figures of recorded runs")
+    parser.add_argument("runs", nargs="+",
+                        help="telemetry directories (TelemetryRecorder path)")
+    parser.add_argument("--out", default=None,
+                        help="output directory, defaults to <run>/plots")
+    parser.add_argument("--figures", nargs="+", choices=list(FIGURES),
+                        default=None)
+    parser.add_argument("--t-start", type=float, default=-np.inf)
+    parser.add_argument("--t-end", type=float, default=np.inf)
+    parser.add_argument("--preview", action="store_true",
+                        help=f"{PREVIEW_DPI} dpi instead of {DPI}")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--force", action="store_true",
+                        help="ignore the cache")
+    args = parser.parse_args()
+
+    for run in args.runs:
+        start = perf_counter()
+        out_dir = args.out and (os.path.join(args.out, os.path.basename(
+            os.path.normpath(run))) if len(args.runs) > 1 else args.out)
+        rendered = render_run(run, out_dir, figures=args.figures,
+                              t_start=args.t_start, t_end=args.t_end,
+                              preview=args.preview, workers=args.workers,
+                              force=args.force)
+        print(f"{run}: rendered {len(rendered)} figures "
+              f"in {perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
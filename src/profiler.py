@@ -0,0 +1,151 @@
+import csv
+import json
+import os
+import threading
+from contextlib import nullcontext
+from time import perf_counter
+
+import numpy as np
+
+
+# Named spans around the stages of a tick (MPC setup and solve, physics,
+# exhaust flame, rendering) and counters (IPOPT iterations, ...). Off by
+# default, a span of a disabled profiler is a shared no-op context.
+#
+#   from profiler import profiler
+#   with profiler.span("physics.step"):
+#       ...
+#
+# stats() gives p50 / p95 / p99 per name, write_csv() and
+# write_chrome_trace() export them (the trace opens in chrome://tracing or
+# https://ui.perfetto.dev).
+
+_NULL = nullcontext()
+
+
+class _Span:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name) -> None:
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = self.profiler.clock()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.add(self.name, self.start,
+                          self.profiler.clock() - self.start)
+
+
+class Profiler:
+    def __init__(self, enabled: bool = False, max_events: int = 2_000_000,
+                 clock=perf_counter) -> None:
+        # max_events => the trace keeps the first max_events spans, the
+        # statistics keep all of them
+        self.enabled = enabled
+        self.max_events = max_events
+        self.clock = clock
+        self.reset()
+
+    def reset(self):
+        self.origin = self.clock()
+        # name => durations in s / counter values
+        self.durations = {}
+        self.counters = {}
+        # (name, start, duration, thread) / (name, time, value)
+        self.events = []
+        self.counter_events = []
+
+    def span(self, name: str):
+        return _Span(self, name) if self.enabled else _NULL
+
+    def add(self, name: str, start: float, duration: float):
+        # A span timed by the caller, start from self.clock
+        if not self.enabled:
+            return
+        self.durations.setdefault(name, []).append(duration)
+        if len(self.events) < self.max_events:
+            self.events.append((name, start, duration, threading.get_ident()))
+
+    def count(self, name: str, value: float):
+        if not self.enabled:
+            return
+        self.counters.setdefault(name, []).append(value)
+        if len(self.counter_events) < self.max_events:
+            self.counter_events.append((name, self.clock(), value))
+
+    def stats(self) -> dict:
+        # name => kind, count, total, mean, p50, p95, p99, max; spans in ms
+        stats = {}
+        for kind, samples, scale in (("span", self.durations, 1e3),
+                                     ("counter", self.counters, 1.0)):
+            for name, values in samples.items():
+                values = np.asarray(values, dtype=float) * scale
+                p50, p95, p99 = np.percentile(values, (50, 95, 99))
+                stats[name] = {"kind": kind, "count": len(values),
+                               "total": values.sum(), "mean": values.mean(),
+                               "p50": p50, "p95": p95, "p99": p99,
+                               "max": values.max()}
+        return stats
+
+    def summary(self) -> str:
+        lines = [f"{'name':<24} {'count':>8} {'total':>10} {'mean':>9} "
+                 f"{'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}"]
+        for name, s in sorted(self.stats().items(),
+                              key=lambda item: -item[1]["total"]
+                              if item[1]["kind"] == "span" else 0):
+            unit = " ms" if s["kind"] == "span" else ""
+            lines.append(
+                f"{name:<24} {s['count']:>8} {s['total']:>10.1f} "
+                + " ".join(f"{s[key]:>9.3f}"
+                           for key in ("mean", "p50", "p95", "p99", "max"))
+                + unit)
+        return "\n".join(lines)
+
+    def write_csv(self, path: str):
+        stats = self.stats()
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["name", "kind", "count", "total", "mean",
+                             "p50", "p95", "p99", "max"])
+            for name, s in stats.items():
+                writer.writerow([name, s["kind"], s["count"]] + [
+                    f"{s[key]:.6g}"
+                    for key in ("total", "mean", "p50", "p95", "p99", "max")])
+
+    def write_chrome_trace(self, path: str):
+        # Trace Event Format: complete ("X") events for the spans, counter
+        # ("C") events, timestamps in us from the last reset
+        pid = os.getpid()
+        threads = {}
+        events = []
+        for name, start, duration, thread in self.events:
+            tid = threads.setdefault(thread, len(threads))
+            events.append({"name": name, "ph": "X", "pid": pid, "tid": tid,
+                           "ts": (start - self.origin) * 1e6,
+                           "dur": duration * 1e6})
+        for name, t, value in self.counter_events:
+            events.append({"name": name, "ph": "C", "pid": pid,
+                           "ts": (t - self.origin) * 1e6,
+                           "args": {"value": float(value)}})
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for thread, tid in threads.items():
+            events.append({"name": "thread_name", "ph": "M", "pid": pid,
+                           "tid": tid, "args": {
+                               "name": names.get(thread, f"thread-{tid}")}})
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+
+# The one profiler of the process, enabled by main --profile
+profiler = Profiler()
+
+
+def solver_stats(stats: dict):
+    # IPOPT counters from opti.stats() / nlpsol stats
+    profiler.count("ipopt.iterations", stats.get("iter_count", 0))
+    profiler.count("ipopt.t_wall_nlp_ms", 1e3 * sum(
+        value for key, value in stats.items()
+        if key.startswith("t_wall_nlp")))
@@ -1,6 +1,4 @@
-import pygame
-import pymunk
-import os
+import assets
 from state_vector import State_Vector
 from utils import rotate_point
 from math import sin, cos, pi, degrees
@@ -26,11 +24,16 @@ class Size:
 
 
 class Rocket:
+    image_name = "rocket-model-2.png"
+
     def __init__(self, state_vector: State_Vector,
                  mass: float = 10.0,
                  position=(0, 0),
                  size=(190/2, 210/2),
                  nozzel_angle: float = 0.0) -> None:
+        # pymunk is only imported by the simulators that use it
+        import pymunk
+
         self.mass = mass
         self.nozzle_angle = nozzel_angle
         self.position = position
@@ -52,16 +55,13 @@ class Rocket:
         self.body.velocity = pymunk.Vec2d(0, state_vector.y_dot)
         # self.body.angular_velocity = state_vector.alpha_dot
 
-        image_path = os.path.join(os.path.dirname(
-            __file__), 'img', 'rocket-model.png')
-        # Load the rocket image
-
-        self.image = pygame.image.load(image_path)
-        self.image = pygame.transform.scale(
-            self.image, (self.size.width, self.size.height))
-
         self.current_thrust = (0, 0)
 
+    @property
+    def image(self):
+        # Only loaded when something draws the rocket, once per process
+        return assets.image(self.image_name, self.size)
+
     def update_state_vector(self) -> None:
         self.state_vector.x = self.body.position.x
         self.state_vector.y = self.body.position.y
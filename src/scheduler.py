@@ -0,0 +1,148 @@
+from math import ceil
+from time import perf_counter, sleep
+
+import numpy as np
+
+from profiler import profiler
+
+
+class Task:
+    def __init__(self, name: str, callback, rate: float,
+                 skip_missed: bool = False) -> None:
+        # callback(t) runs at t = k / rate, k = 0, 1, 2, ...
+        # skip_missed => in real time, drop the runs that are already a
+        # period late instead of catching up on them (rendering)
+        self.name = name
+        self.span = f"task.{name}"
+        self.callback = callback
+        self.rate = rate
+        self.period = 1 / rate
+        self.skip_missed = skip_missed
+        # k of the next run
+        self.next = 0
+        self.skipped = 0
+        # wall time of every run / how late it started (real time only)
+        self.durations = []
+        self.jitter = []
+
+    def due(self) -> int:
+        # in integer nanoseconds, so that the order of the tasks never
+        # depends on rounding
+        return round(self.next * 1e9 / self.rate)
+
+    def __repr__(self) -> str:
+        return f"Task({self.name}, {self.rate:g} Hz, runs={len(self.durations)})"
+
+
+class Scheduler:
+    def __init__(self, realtime: bool = False, clock=perf_counter,
+                 sleep=sleep, start: float = 0.0) -> None:
+        # Runs every task at its own rate on one thread, in simulated time.
+        # Tasks due at the same instant run in the order they were added.
+        # realtime => each run waits for its wall clock time, how late it
+        # starts is its jitter. Otherwise the tasks run back to back as fast
+        # as the CPU allows and the order of the runs is deterministic
+        # start => simulated time of the clock at the beginning, e.g. of a
+        # restored simulation
+        self.realtime = realtime
+        self.clock = clock
+        self.sleep = sleep
+        self.tasks = []
+        self.time_ns = self.start_ns = round(start * 1e9)
+        self.running = False
+
+    @property
+    def time(self) -> float:
+        return self.time_ns * 1e-9
+
+    @property
+    def elapsed(self) -> float:
+        return (self.time_ns - self.start_ns) * 1e-9
+
+    def add(self, name: str, callback, rate: float,
+            skip_missed: bool = False) -> Task:
+        # rate None or 0 => the task is disabled
+        if not rate:
+            return None
+        task = Task(name, callback, rate, skip_missed)
+        # start with the first run at or after the current time
+        task.next = ceil(self.time_ns * rate / 1e9 - 1e-9)
+        self.tasks.append(task)
+        return task
+
+    def stop(self):
+        self.running = False
+
+    def run(self, t_final: float = None):
+        # Until stop() or the first run due at or after t_final
+        end = None if t_final is None else round(t_final * 1e9)
+        start = self.clock() - self.time
+        self.running = True
+        while self.running and self.tasks:
+            task = min(self.tasks, key=Task.due)
+            due = task.due()
+            if end is not None and due >= end:
+                break
+            self.time_ns = due
+
+            if self.realtime:
+                wait = due * 1e-9 - (self.clock() - start)
+                if wait > 0:
+                    self.sleep(wait)
+                task.jitter.append(self.clock() - start - due * 1e-9)
+
+            begin = self.clock()
+            with profiler.span(task.span):
+                task.callback(self.time)
+            task.durations.append(self.clock() - begin)
+            task.next += 1
+
+            if self.realtime and task.skip_missed:
+                behind = int((self.clock() - start) * task.rate)
+                if behind > task.next:
+                    task.skipped += behind - task.next
+                    task.next = behind
+        self.running = False
+        if end is not None and self.time_ns < end:
+            self.time_ns = end
+
+    def stats(self) -> dict:
+        # name => runs, achieved rate, wall time per run and, in real time,
+        # start jitter, all times in ms
+        stats = {}
+        elapsed = self.elapsed
+        for task in self.tasks:
+            durations = np.array(task.durations) * 1e3
+            entry = {
+                "rate": task.rate,
+                "runs": len(durations),
+                "skipped": task.skipped,
+                "achieved_rate": len(durations) / elapsed if elapsed else 0.0,
+                "duration_mean": durations.mean() if len(durations) else np.nan,
+                "duration_p95": np.percentile(durations, 95) if len(durations) else np.nan,
+                "duration_max": durations.max() if len(durations) else np.nan,
+                # fraction of the simulated time spent in the task
+                "load": durations.sum() * 1e-3 / elapsed if elapsed else 0.0,
+            }
+            if task.jitter:
+                jitter = np.array(task.jitter) * 1e3
+                entry.update(jitter_p50=np.percentile(jitter, 50),
+                             jitter_p95=np.percentile(jitter, 95),
+                             jitter_max=jitter.max())
+            stats[task.name] = entry
+        return stats
+
+    def summary(self) -> str:
+        lines = []
+        for name, s in self.stats().items():
+            line = (f"{name}: {s['runs']} runs at {s['achieved_rate']:.1f}/"
+                    f"{s['rate']:g} Hz, {s['duration_mean']:.3f} ms mean, "
+                    f"{s['duration_p95']:.3f} ms p95, load {s['load']:.1%}")
+            if "jitter_p50" in s:
+                line += (f", jitter {s['jitter_p50']:.3f} ms p50, "
+                         f"{s['jitter_p95']:.3f} ms p95, "
+                         f"{s['jitter_max']:.3f} ms max")
+            if s["skipped"]:
+                line += f", skipped {s['skipped']}"
+            lines.append(line)
+        return "\n".join(lines)
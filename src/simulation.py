@@ -0,0 +1,333 @@
+from copy import copy
+import assets
+from physics_simulator import Physics_Simulator
+from numpy_physics import NumpyPhysicsSimulator, NumpyRocket
+from rocket import Rocket
+from state_vector import State_Vector
+from external_forces import Wind
+from event_log import get_logger, DEBUG
+from scheduler import Scheduler
+from telemetry import TelemetryRecorder
+
+
+log = get_logger("simulation")
+
+
+class Trajectory:
+    def __init__(self, t, states, predicted, controls) -> None:
+        # t [n], states [n x 6], predicted [n x 6], controls [n x 2]
+        # states are measured after the physics step, controls are
+        # [thrust, nozzle angle] computed at the end of the tick. predicted
+        # is the MPC model's state for the next tick (t + dt) under those
+        # controls: predicted[:-1] is to be compared with states[1:]
+        self.t = t
+        self.states = states
+        self.predicted = predicted
+        self.controls = controls
+
+    def __len__(self):
+        return len(self.t)
+
+    def __repr__(self) -> str:
+        return f"Trajectory(ticks={len(self)}, t_final={self.t[-1] if len(self) else 0:.2f})"
+
+
+class Simulation:
+    def __init__(self, initial_state: State_Vector,
+                 mass: float = 30,
+                 controller=None,
+                 target_state: State_Vector = None,
+                 dt: float = 1 / 50,
+                 width: int = 800,
+                 ground_height: int = 1000,
+                 gravity_x: float = 0.0,
+                 gravity_y: float = +981,
+                 wind: Wind = None,
+                 physics: str = "pymunk",
+                 substeps: int = 1,
+                 tolerance: float = None,
+                 render: bool = False) -> None:
+        # Closed loop of Physics_Simulator + controller stepped in simulated
+        # time, as fast as the CPU allows. Nothing here needs pygame unless
+        # a renderer is attached.
+        self.dt = dt
+        self.width = width
+        self.ground_height = ground_height
+        # to build the same simulation again from a snapshot
+        self.config = dict(mass=mass, dt=dt, width=width,
+                           ground_height=ground_height, gravity_x=gravity_x,
+                           gravity_y=gravity_y, physics=physics,
+                           substeps=substeps, tolerance=tolerance)
+
+        # The caller keeps its own copy of the initial state
+        self.initial_state = copy(initial_state)
+        # pymunk => Physics_Simulator, numpy => NumpyPhysicsSimulator, the
+        # same rigid body in plain numpy
+        # substeps => physics steps per control tick (dt), the controls are
+        # held over them. tolerance => adaptive steps instead, numpy only
+        options = {"substeps": substeps}
+        if physics == "pymunk":
+            rocket_type, simulator_type = Rocket, Physics_Simulator
+            if tolerance is not None:
+                raise ValueError("Adaptive steps need physics='numpy'")
+        elif physics == "numpy":
+            rocket_type, simulator_type = NumpyRocket, NumpyPhysicsSimulator
+            options["tolerance"] = tolerance
+        else:
+            raise ValueError(f"Unknown physics backend: {physics}")
+        self.rocket = rocket_type(
+            state_vector=copy(initial_state),
+            mass=mass,
+            position=(initial_state.x, initial_state.y),
+        )
+        self.ps = simulator_type(ground_height=ground_height,
+                                 rocket=self.rocket,
+                                 gravity_x=gravity_x,
+                                 gravity_y=gravity_y,
+                                 **options)
+
+        # Constant wind force in N, pushing on the centre of mass
+        self.wind = wind
+
+        if controller is None:
+            # casadi is only imported when the default MPC is used
+            from mpc_controller import MPCController
+            controller = MPCController(mass=mass)
+        self.controller = controller
+
+        if target_state is None:
+            # Note that rocket position is in the centre of it that is why we
+            # have rocket.size.height * 0.5
+            ground = self.ps.groud_level - self.ps.groud_tickness
+            target_state = State_Vector(
+                x=width * 0.5, y=ground - self.rocket.size.height * 0.5)
+        self.target_state = target_state
+
+        self.thrust = 0
+        self.nozzle_angle = 0
+        self.predicted_state = None
+        self.tick = 0
+
+        self.visualizer = None
+        self.video = None
+        if render:
+            self.attach_renderer()
+
+    @property
+    def time(self):
+        return self.tick * self.dt
+
+    @property
+    def state(self) -> State_Vector:
+        return self.rocket.state_vector
+
+    def attach_renderer(self, fps: int = None):
+        # Imported here so headless runs never open a window
+        from visualize import Visualize
+
+        self.visualizer = Visualize(width=self.width,
+                                    height=self.ground_height,
+                                    fps=fps or round(1 / self.dt))
+        self.visualizer.add_object(self.ps)
+        # load the sprite now rather than on the first frame
+        assets.preload((self.rocket.image_name, self.rocket.size))
+        return self.visualizer
+
+    def attach_video(self, video):
+        # video => a VideoRecorder, gets one rendered frame per 1 / its fps
+        # of simulated time. Without a renderer one is attached offscreen,
+        # the frames are then only drawn when the video takes one
+        if self.visualizer is None:
+            from video import offscreen
+            offscreen()
+            self.attach_renderer()
+        self.video = video
+        return video
+
+    def snapshot(self, particles: bool = False) -> dict:
+        # Everything the next ticks depend on: the physics, the held
+        # controls, the controller's warm start and the flame's random
+        # generator. Plain values, picklable (see checkpoints.save).
+        # particles => the live flame particles too, only for rendering
+        warm_start = getattr(self.controller, "warm_start", None)
+        return {
+            "config": dict(self.config),
+            "tick": self.tick,
+            "initial_state": copy(self.initial_state),
+            "target_state": copy(self.target_state),
+            "wind": None if self.wind is None else list(self.wind.direction),
+            "thrust": self.thrust,
+            "nozzle_angle": self.nozzle_angle,
+            "predicted_state": copy(self.predicted_state),
+            "physics": self.ps.snapshot(particles),
+            "controller": warm_start() if warm_start is not None else None,
+        }
+
+    def restore(self, snapshot: dict):
+        # Back to the moment of snapshot, which must come from a simulation
+        # with the same physics backend
+        if snapshot["config"]["physics"] != self.config["physics"]:
+            raise ValueError(
+                f"Snapshot of {snapshot['config']['physics']} physics, "
+                f"this simulation runs {self.config['physics']}")
+        # first, it raises when the controller does not match
+        if snapshot["controller"] is not None and \
+                hasattr(self.controller, "set_warm_start"):
+            self.controller.set_warm_start(snapshot["controller"])
+        self.tick = snapshot["tick"]
+        self.target_state = copy(snapshot["target_state"])
+        self.wind = None if snapshot["wind"] is None \
+            else Wind(list(snapshot["wind"]))
+        self.thrust = snapshot["thrust"]
+        self.nozzle_angle = snapshot["nozzle_angle"]
+        self.predicted_state = copy(snapshot["predicted_state"])
+        self.ps.restore(snapshot["physics"])
+
+    @classmethod
+    def from_snapshot(cls, snapshot: dict, controller=None, **changes):
+        # A new simulation continuing from snapshot, e.g. in another process
+        # changes => what-if: any Simulation argument (wind, mass,
+        # target_state, render, ...) different from the recorded run. A
+        # controller of its own, the default MPC otherwise. Either way it
+        # must solve the recorded controller's problem (horizon, mode,
+        # transcription), restore raises a ValueError otherwise
+        config = dict(snapshot["config"])
+        config.update(changes)
+        sim = cls(initial_state=snapshot["initial_state"],
+                  controller=controller, **config)
+        sim.restore(snapshot)
+        for name in ("wind", "target_state"):
+            if name in changes:
+                setattr(sim, name, changes[name])
+        return sim
+
+    def distance_to_ground(self):
+        return self.target_state.y - self.state.y
+
+    def touched_down(self, tolerance: float = 2.0) -> bool:
+        return self.distance_to_ground() < tolerance
+
+    def log_touchdown(self):
+        s = self.state
+        log.info("touchdown", t=self.time, x=s.x, alpha=s.alpha,
+                 x_dot=s.x_dot, y_dot=s.y_dot)
+
+    def step(self):
+        if self.visualizer is not None:
+            self.visualizer.handle_events()
+
+        self.step_physics()
+        self.step_control()
+
+        if self.visualizer is None:
+            return
+        if self.video is None:
+            self.visualizer.update()
+        elif self.video.due(self.time):
+            self.visualizer.update(wait=False)
+            self.video.capture(self.visualizer.screen, self.time)
+
+    def step_physics(self):
+        # One physics step of dt, the controls are held
+        # force should be a tuple
+        self.ps.rocket.apply_force(force=self.thrust,
+                                   nozzle_angle=self.nozzle_angle)
+        if self.wind is not None:
+            # same 100x pixel scaling as the thrust in Rocket.apply_force
+            self.ps.apply_external_force((self.wind.direction[0] * 100,
+                                          self.wind.direction[1] * 100))
+        self.ps.update_rocket_state(dt=self.dt)
+        self.tick += 1
+
+    def step_control(self, dt: float = None):
+        # New controls from the current state, dt => the control period the
+        # MPC plans with, the physics dt by default
+        # optimization
+        U = self.controller.setup_mpc(current_state=self.state,
+                                      target_state=self.target_state,
+                                      dt=dt or self.dt)
+        # u_opt is the optimal control
+        u_opt, self.predicted_state = self.controller.solve(U)
+
+        self.thrust = u_opt[0, 0]
+        self.nozzle_angle = u_opt[0, 1]
+
+        if log.enabled(DEBUG):
+            s = self.state
+            log.debug("tick", t=self.time, x=s.x, y=s.y, alpha=s.alpha,
+                      x_dot=s.x_dot, y_dot=s.y_dot, alpha_dot=s.alpha_dot,
+                      thrust=self.thrust, nozzle_angle=self.nozzle_angle)
+
+    def render(self, wait: bool = True):
+        # wait => let the renderer hold the frame rate
+        self.visualizer.handle_events()
+        self.visualizer.update(wait=wait)
+        if self.video is not None:
+            self.video.capture(self.visualizer.screen, self.time)
+
+    def scheduler(self, control_rate: float = 20, render_rate: float = None,
+                  telemetry_rate: float = None,
+                  recorder: TelemetryRecorder = None,
+                  stop_on_touchdown: bool = True,
+                  realtime: bool = False,
+                  checkpoints=None) -> Scheduler:
+        # Multi-rate loop: physics every dt, the controller at control_rate
+        # (planning with its own period), rendering and recording at their
+        # own rates, None => off. At a shared instant the controller and
+        # the recorder see the state before the physics step, the renderer
+        # after it.
+        # The clock starts at the simulation's time (after restore), t_final
+        # in run(t_final) is simulated time too.
+        # Call run(t_final) on the returned Scheduler
+        scheduler = Scheduler(realtime=realtime, start=self.time)
+        if checkpoints is not None:
+            # a Checkpoints, before anything else runs at its instants
+            scheduler.add("checkpoint", lambda t: checkpoints.record(self),
+                          1 / checkpoints.every)
+        scheduler.add("control",
+                      lambda t: self.step_control(dt=1 / control_rate),
+                      control_rate)
+        if recorder is not None:
+            scheduler.add("telemetry", lambda t: recorder.record(self),
+                          telemetry_rate or control_rate)
+
+        def physics(t):
+            self.step_physics()
+            if stop_on_touchdown and self.touched_down():
+                self.log_touchdown()
+                scheduler.stop()
+
+        scheduler.add("physics", physics, 1 / self.dt)
+        if render_rate:
+            if self.visualizer is None:
+                self.attach_renderer(fps=render_rate)
+            scheduler.add("render", lambda t: self.render(wait=False),
+                          render_rate, skip_missed=True)
+        return scheduler
+
+    def run(self, t_final: float = 245, stop_on_touchdown: bool = True,
+            t_record: float = 0.0, recorder: TelemetryRecorder = None,
+            checkpoints=None) -> Trajectory:
+        # t_record => only keep the samples after this simulated time
+        # recorder => also write the kept samples to it, e.g. to stream them
+        # to disk
+        # checkpoints => a Checkpoints that snapshots the run periodically
+        samples = TelemetryRecorder(capacity=max(int(t_final / self.dt), 1))
+
+        while self.time < t_final:
+            if checkpoints is not None:
+                checkpoints.record(self)
+            self.step()
+
+            if self.time >= t_record:
+                samples.record(self)
+                if recorder is not None:
+                    recorder.record(self)
+
+            if stop_on_touchdown and self.touched_down():
+                self.log_touchdown()
+                break
+
+        data = samples.data()
+        return Trajectory(t=data.t, states=data.state,
+                          predicted=data.predicted, controls=data.control)
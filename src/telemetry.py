@@ -0,0 +1,186 @@
+import json
+import os
+
+import numpy as np
+
+
+# name => (dtype, shape of one sample)
+COLUMNS = {
+    "t": ("f8", ()),
+    # measured after the physics step
+    "state": ("f8", (6,)),
+    # the MPC model's state for the next tick (t + dt), from the plan of
+    # this tick: compare with the next sample's state
+    "predicted": ("f8", (6,)),
+    "target": ("f8", (6,)),
+    # [thrust, nozzle angle] computed at the end of the tick
+    "control": ("f8", (2,)),
+    # MPCController.last_status
+    "status": ("i1", ()),
+    "solve_time": ("f4", ()),
+    "build_time": ("f4", ()),
+}
+
+META = "meta.json"
+
+
+class Telemetry:
+    def __init__(self, columns: dict) -> None:
+        # Read side, one array per column with the samples along axis 0.
+        # The arrays are memory-mapped when loaded from disk
+        self.columns = columns
+
+    def __len__(self):
+        return len(self.columns["t"]) if "t" in self.columns else 0
+
+    def __getitem__(self, name) -> np.ndarray:
+        return self.columns[name]
+
+    def __getattr__(self, name):
+        try:
+            return self.__dict__["columns"][name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __repr__(self) -> str:
+        return f"Telemetry(ticks={len(self)}, columns={list(self.columns)})"
+
+    def between(self, t_start: float = -np.inf, t_end: float = np.inf):
+        # Samples with t_start <= t <= t_end, t is increasing
+        t = self.columns["t"]
+        first = np.searchsorted(t, t_start, side="left")
+        last = np.searchsorted(t, t_end, side="right")
+        return Telemetry({name: column[first:last]
+                          for name, column in self.columns.items()})
+
+
+class TelemetryRecorder:
+    def __init__(self, path: str = None, capacity: int = 4096,
+                 columns: dict = COLUMNS) -> None:
+        # Fixed-size numpy columns written one row per tick.
+        # path is None => in memory, the columns double when full.
+        # otherwise => the rows are streamed to path/<column>.bin in chunks of
+        # `capacity` rows, so the memory stays constant however long the run.
+        # meta.json is rewritten after every chunk, a crashed run can still
+        # be read back up to its last chunk with load_telemetry
+        self.path = path
+        self.spec = {name: (np.dtype(dtype), tuple(shape))
+                     for name, (dtype, shape) in columns.items()}
+        self.buffers = {name: np.zeros((capacity,) + shape, dtype)
+                        for name, (dtype, shape) in self.spec.items()}
+        # rows in the buffers / rows already on disk
+        self.count = 0
+        self.flushed = 0
+        self.closed = False
+
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+            for name in self.spec:
+                # start from empty files, a previous run may be there
+                open(self._file(name), "wb").close()
+            self._write_meta()
+
+    def __len__(self):
+        return self.flushed + self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def append(self, **values):
+        # One row, a missing column keeps zeros
+        if self.closed:
+            raise ValueError("TelemetryRecorder is closed")
+        if self.count == len(self.buffers["t"]):
+            if self.path is None:
+                self._grow()
+            else:
+                self.flush()
+        row = self.count
+        for name, value in values.items():
+            self.buffers[name][row] = value
+        self.count += 1
+
+    def record(self, sim):
+        # One tick of a Simulation
+        s = sim.state
+        z = sim.target_state
+        predicted = sim.predicted_state
+        controller = sim.controller
+        self.append(
+            t=sim.time,
+            state=(s.x, s.y, s.alpha, s.x_dot, s.y_dot, s.alpha_dot),
+            predicted=np.nan if predicted is None else np.ravel(predicted),
+            target=(z.x, z.y, z.alpha, z.x_dot, z.y_dot, z.alpha_dot),
+            control=(sim.thrust, sim.nozzle_angle),
+            status=getattr(controller, "last_status", 0),
+            solve_time=getattr(controller, "last_solve_time", np.nan),
+            build_time=getattr(controller, "last_build_time", np.nan),
+        )
+
+    def _grow(self):
+        for name, buffer in self.buffers.items():
+            grown = np.zeros((2 * len(buffer),) + buffer.shape[1:],
+                             buffer.dtype)
+            grown[:self.count] = buffer[:self.count]
+            self.buffers[name] = grown
+
+    def _file(self, name):
+        return os.path.join(self.path, f"{name}.bin")
+
+    def _write_meta(self):
+        meta = {
+            "rows": self.flushed,
+            "columns": {name: {"dtype": dtype.str, "shape": list(shape)}
+                        for name, (dtype, shape) in self.spec.items()},
+        }
+        tmp = os.path.join(self.path, META + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump(meta, f, indent=1)
+        os.replace(tmp, os.path.join(self.path, META))
+
+    def flush(self):
+        if self.path is None or self.count == 0:
+            return
+        for name, buffer in self.buffers.items():
+            with open(self._file(name), "ab") as f:
+                f.write(buffer[:self.count].tobytes())
+        self.flushed += self.count
+        self.count = 0
+        self._write_meta()
+
+    def close(self):
+        if not self.closed:
+            self.flush()
+            self.closed = True
+
+    def data(self) -> Telemetry:
+        # What has been recorded so far
+        if self.path is None:
+            return Telemetry({name: buffer[:self.count]
+                              for name, buffer in self.buffers.items()})
+        self.flush()
+        return load_telemetry(self.path)
+
+
+def load_telemetry(path: str, mmap: bool = True) -> Telemetry:
+    with open(os.path.join(path, META)) as f:
+        meta = json.load(f)
+    rows = meta["rows"]
+    columns = {}
+    for name, column in meta["columns"].items():
+        dtype = np.dtype(column["dtype"])
+        shape = (rows,) + tuple(column["shape"])
+        file = os.path.join(path, f"{name}.bin")
+        if mmap and rows:
+            # the file may be longer than meta.json says while a recorder
+            # is still writing to it
+            columns[name] = np.memmap(file, dtype=dtype, mode="r",
+                                      shape=shape)
+        else:
+            count = rows * int(np.prod(shape[1:], dtype=int))
+            columns[name] = np.fromfile(file, dtype=dtype,
+                                        count=count).reshape(shape)
+    return Telemetry(columns)
@@ -1,6 +1,5 @@
 import numpy as np
 from state_vector import State_Vector
-from casadi import DM as ca_dm
 from math import pi
 import numpy as np
 
@@ -43,7 +42,9 @@ def np2sv(x: np.array):
                         x[3, 0])
 
 
-def state_space_to_mpc_vector(state_vector: State_Vector) -> ca_dm:
+def state_space_to_mpc_vector(state_vector: State_Vector) -> "ca_dm":
+    # casadi is only imported by the code that uses it
+    from casadi import DM as ca_dm
     vector = ca_dm([[state_vector.x],
                     [state_vector.y],
                     [state_vector.alpha],
@@ -53,7 +54,7 @@ def state_space_to_mpc_vector(state_vector: State_Vector) -> ca_dm:
     return vector
 
 
-def mpc_vector_to_state_space(mpc_vector: ca_dm) -> State_Vector:
+def mpc_vector_to_state_space(mpc_vector: "ca_dm") -> State_Vector:
     vector = State_Vector(
         x=(mpc_vector[0]),
         y=(mpc_vector[1]),
@@ -63,3 +64,11 @@ def mpc_vector_to_state_space(mpc_vector: ca_dm) -> State_Vector:
         alpha_dot=(mpc_vector[5])
     )
     return vector
+
+
+def shift_plan(U: np.ndarray, steps: int = 1) -> np.ndarray:
+    # Move an [N x 2] control plan `steps` steps forward for warm starting.
+    # The last row never enters the MPC cost (the last step reuses the one
+    # before), so the last used control is repeated instead of it
+    steps = min(steps, len(U) - 1)
+    return np.vstack((U[steps:-1, :], np.repeat(U[-2:-1, :], steps + 1, axis=0)))
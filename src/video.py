@@ -0,0 +1,206 @@
+import os
+import queue
+import shutil
+import subprocess
+import sys
+import threading
+from math import floor
+from time import perf_counter
+
+import numpy as np
+
+from event_log import get_logger
+
+
+log = get_logger("video")
+
+VIDEO_EXTENSIONS = (".mp4", ".mkv", ".webm", ".avi", ".mov", ".gif")
+
+
+def offscreen():
+    # Rendering without a window (campaign workers, CI), before the first
+    # pygame display is opened
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+
+def _pixel_format(surface):
+    # (bytes per pixel, byte index of R, G, B, ffmpeg pix_fmt) of the raw
+    # pixels of surface
+    bpp = surface.get_bytesize()
+    if bpp not in (3, 4):
+        raise ValueError(f"Cannot record {8 * bpp} bit surfaces")
+    names = ["0"] * bpp
+    index = []
+    for channel, shift in zip("rgb", surface.get_shifts()[:3]):
+        byte = shift // 8 if sys.byteorder == "little" else bpp - 1 - shift // 8
+        names[byte] = channel
+        index.append(byte)
+    pix_fmt = "".join(names) + ("24" if bpp == 3 else "")
+    return bpp, index, pix_fmt
+
+
+class VideoRecorder:
+    def __init__(self, path: str, fps: float = 30, queue_size: int = 32,
+                 block: bool = False, ffmpeg: str = None) -> None:
+        # Frames of a pygame surface, written by a background thread:
+        # path ending in .mp4, .mkv, ... => a video encoded by a local
+        # ffmpeg, otherwise a directory of frame-000000.png. Without ffmpeg
+        # a video path falls back to frames in <path>.frames/
+        #
+        # capture copies the pixels once into one of queue_size buffers and
+        # returns, the thread does the encoding and the disk I/O. When every
+        # buffer is waiting for the thread the frame is dropped, or with
+        # block => capture waits for a buffer (backpressure, for offline
+        # recordings that must keep every frame)
+        # fps => frame rate of the file, and of the frames kept when
+        # capture is given the simulated time
+        self.fps = fps
+        self.queue_size = queue_size
+        self.block = block
+        self.ffmpeg = ffmpeg or shutil.which("ffmpeg")
+
+        video = path.lower().endswith(VIDEO_EXTENSIONS)
+        if video and self.ffmpeg is None:
+            log.warning("no_ffmpeg", path=path)
+            path += ".frames"
+            video = False
+        self.path = path
+        self.encoder = "ffmpeg" if video else "png"
+        if not video:
+            os.makedirs(path, exist_ok=True)
+
+        # captured => frames handed to capture and kept
+        # dropped => frames lost because the writer was behind
+        # blocked => seconds capture waited for the writer (block only)
+        # queue_max => most frames ever waiting for the writer
+        self.captured = 0
+        self.written = 0
+        self.dropped = 0
+        self.blocked = 0.0
+        self.queue_max = 0
+        self.error = None
+
+        self._next_t = None
+        self._size = None
+        self._free = queue.Queue()
+        self._frames = queue.Queue()
+        self._process = None
+        self._thread = None
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def due(self, t: float) -> bool:
+        # whether capture would keep a frame at simulated time t
+        return self._next_t is None or t >= self._next_t - 1e-9
+
+    def capture(self, surface, t: float = None) -> bool:
+        # t => simulated time, only one frame per 1 / fps is kept
+        # Returns whether the frame was queued
+        if self._closed or self.error is not None:
+            return False
+        if t is not None:
+            if not self.due(t):
+                return False
+            self._next_t = (floor(t * self.fps + 1e-9) + 1) / self.fps
+        if self._thread is None:
+            self._start(surface)
+        elif surface.get_size() != self._size:
+            raise ValueError(f"Frame size {surface.get_size()} after "
+                             f"{self._size}")
+
+        try:
+            if self.block:
+                start = perf_counter()
+                buffer = self._free.get()
+                self.blocked += perf_counter() - start
+            else:
+                buffer = self._free.get_nowait()
+        except queue.Empty:
+            self.dropped += 1
+            return False
+
+        # a view of the surface's own pixels, copied once into the buffer.
+        # The surface stays locked until the view is deleted
+        width, height = self._size
+        pixels = np.frombuffer(surface.get_buffer(), dtype=np.uint8).reshape(
+            height, surface.get_pitch())
+        np.copyto(buffer, pixels[:, :width * self._bpp])
+        del pixels
+        self._frames.put((self.captured, buffer))
+        self.captured += 1
+        self.queue_max = max(self.queue_max, self._frames.qsize())
+        return True
+
+    def _start(self, surface):
+        self._size = width, height = surface.get_size()
+        self._bpp, self._rgb, pix_fmt = _pixel_format(surface)
+        for _ in range(self.queue_size):
+            self._free.put(np.empty((height, width * self._bpp), np.uint8))
+        if self.encoder == "ffmpeg":
+            self._process = subprocess.Popen(
+                [self.ffmpeg, "-y", "-loglevel", "error",
+                 "-f", "rawvideo", "-pix_fmt", pix_fmt,
+                 "-s", f"{width}x{height}", "-r", str(self.fps), "-i", "-",
+                 # yuv420p needs even sizes
+                 "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2",
+                 "-pix_fmt", "yuv420p", self.path],
+                stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+        self._thread = threading.Thread(target=self._write, daemon=True,
+                                        name="video-writer")
+        self._thread.start()
+
+    def _write(self):
+        while True:
+            item = self._frames.get()
+            if item is None:
+                return
+            index, buffer = item
+            try:
+                if self.error is None:
+                    self._encode(index, buffer)
+                    self.written += 1
+            except Exception as e:
+                self.error = e
+                log.error("write_failed", path=self.path, frame=index,
+                          error=e)
+            finally:
+                self._free.put(buffer)
+
+    def _encode(self, index, buffer):
+        if self._process is not None:
+            self._process.stdin.write(memoryview(buffer))
+            return
+        import pygame
+        width, height = self._size
+        rgb = buffer.reshape(height, width, self._bpp)[:, :, self._rgb]
+        frame = pygame.image.frombuffer(rgb.tobytes(), self._size, "RGB")
+        pygame.image.save(frame, os.path.join(self.path,
+                                              f"frame-{index:06d}.png"))
+
+    def close(self):
+        # Waits for the frames in the queue to be written
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread is not None:
+            self._frames.put(None)
+            self._thread.join()
+        if self._process is not None:
+            # closes ffmpeg's stdin, ffmpeg finishes the file
+            _, stderr = self._process.communicate()
+            if self._process.returncode and self.error is None:
+                self.error = RuntimeError(
+                    f"ffmpeg exited with {self._process.returncode}: "
+                    f"{stderr.decode(errors='replace').strip()[-200:]}")
+        log.info("video", path=self.path, **self.stats())
+
+    def stats(self) -> dict:
+        return {"captured": self.captured, "written": self.written,
+                "dropped": self.dropped, "blocked_s": self.blocked,
+                "queue_max": self.queue_max,
+                "error": "" if self.error is None else str(self.error)}
@@ -1,11 +1,17 @@
 import pymunk.pygame_util
 import pygame
-import os
 from pygame.locals import QUIT
+import assets
+from profiler import profiler
 
 
 class Visualize:
-    def __init__(self, width, height, fps: int = 60) -> None:
+    def __init__(self, width, height, fps: int = 60,
+                 dirty_rects: bool = True) -> None:
+        # dirty_rects => every frame only the rects the objects drew on last
+        # frame and this one are restored, drawn and sent to the display,
+        # as long as every object returns its rects from draw (see
+        # Elements). Otherwise the whole screen is redrawn and flipped
         # Initialize Pygame
         pygame.init()
         self.display_width = width
@@ -17,28 +23,51 @@ class Visualize:
         self.draw_options = pymunk.pygame_util.DrawOptions(self.screen)
         self.fps = fps
 
-        background_path = os.path.join(os.path.dirname(
-            __file__), 'img', 'bg_dark.jpg')
-        self.background = pygame.image.load(background_path)
-        self.background = pygame.transform.scale(
-            self.background, self.screen.get_size())
+        assets.display_opened()
+        self.background = assets.image("bg_dark.jpg", self.screen.get_size())
         self.objects = []
+        self.dirty_rects = dirty_rects
+        # rects drawn by the last frame, None => redraw everything
+        self._drawn = None
 
     def add_object(self, object):
         self.objects.append(object)
+        self._drawn = None
 
     def remove_object(self, obj):
         if obj in self.objects:
             self.objects.remove(obj)
+            self._drawn = None
 
-    def update(self):
-        self.screen.blit(self.background, (0, 0))
+    def update(self, wait: bool = True, full: bool = False):
+        # wait => hold the frame rate, off when a Scheduler paces the frames
+        # full => redraw the whole screen this frame
+        full = full or not self.dirty_rects or self._drawn is None
+        with profiler.span("render.background"):
+            if full:
+                self.screen.blit(self.background, (0, 0))
+            else:
+                # erase what the last frame drew
+                for rect in self._drawn:
+                    self.screen.blit(self.background, rect, rect)
 
+        drawn = []
         for obj in self.objects:
-            obj.draw(self.screen)
+            rects = obj.draw(self.screen)
+            if rects is None:
+                drawn = None
+            elif drawn is not None:
+                drawn.extend(rects)
 
-        pygame.display.flip()
-        self.clock.tick(self.fps)
+        with profiler.span("render.flip"):
+            if full or drawn is None:
+                pygame.display.flip()
+            else:
+                pygame.display.update(self._drawn + drawn)
+        self._drawn = drawn
+        if wait:
+            with profiler.span("render.wait"):
+                self.clock.tick(self.fps)
 
     def handle_events(self):
         for event in pygame.event.get():
@@ -0,0 +1,91 @@
+import json
+import os
+import subprocess
+import sys
+
+import assets
+
+SRC = os.path.join(os.path.dirname(__file__), "..", "src")
+
+
+def test_images_are_loaded_and_scaled_once():
+    assets.clear()
+    background = assets.image("bg_dark.jpg", (80, 100))
+    assert background.get_size() == (80, 100)
+    assert assets.image("bg_dark.jpg", (80.0, 100.0)) is background
+    # the unscaled image is cached too and shared by every size
+    original = assets.image("bg_dark.jpg")
+    assert assets.image("bg_dark.jpg") is original
+    assert assets.image("bg_dark.jpg", (40, 50)).get_size() == (40, 50)
+    assets.clear()
+
+
+def test_headless_simulation_skips_the_rendering_stack():
+    # a controller that holds the engine off, the default MPC needs casadi
+    code = """
+import json, sys
+import numpy as np
+from simulation import Simulation
+from state_vector import State_Vector
+
+class EngineOff:
+    def setup_mpc(self, current_state, target_state, dt):
+        return None
+
+    def solve(self, U):
+        return np.zeros((5, 2)), None
+
+sim = Simulation(State_Vector(x=350, y=600), controller=EngineOff(),
+                 physics="numpy")
+sim.step()
+print(json.dumps([m for m in ("pygame", "pymunk", "casadi", "matplotlib")
+                  if m in sys.modules]))
+"""
+    out = subprocess.run([sys.executable, "-c", code], cwd=SRC,
+                         capture_output=True, text=True, check=True)
+    assert json.loads(out.stdout.splitlines()[-1]) == []
+
+
+def sprite():
+    import pygame
+    surface = pygame.Surface((20, 40), pygame.SRCALPHA)
+    surface.fill((255, 255, 255, 255))
+    return surface
+
+
+def test_rotations_are_rounded_and_reused():
+    import pygame
+    cache = assets.RotationCache(sprite(), resolution=0.5)
+    first = cache.get(10.1)
+    assert cache.get(9.9) is first and cache.get(370.0) is first
+    assert (cache.hits, cache.misses) == (2, 1)
+    assert first.get_size() == pygame.transform.rotate(sprite(), 10).get_size()
+    assert cache.get(10.4) is not first
+
+
+def test_rotations_evict_the_least_recently_used():
+    cache = assets.RotationCache(sprite(), resolution=1, max_size=3)
+    kept = cache.get(0)
+    cache.get(1)
+    cache.get(2)
+    cache.get(0)
+    cache.get(3)
+    assert len(cache) == 3 and cache.get(0) is kept
+    assert cache.misses == 4
+    cache.get(1)
+    assert cache.misses == 5
+
+    cache = assets.RotationCache(sprite(), resolution=1, max_size=100)
+    cache.prefill(-10, 10)
+    assert len(cache) == 20 and cache.misses == 20
+    cache.prefill()
+    assert len(cache) == 100
+
+
+def test_smooth_rotations_are_cached_apart():
+    assets.clear()
+    sharp = assets.rotations("bg_dark.jpg", (40, 50))
+    smooth = assets.rotations("bg_dark.jpg", (40, 50), smooth=True)
+    assert assets.rotations("bg_dark.jpg", (40, 50)) is sharp
+    assert smooth is not sharp and smooth.get(30) is not sharp.get(30)
+    assets.clear()
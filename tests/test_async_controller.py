@@ -0,0 +1,101 @@
+import time
+from math import radians
+
+import numpy as np
+import pytest
+
+from async_controller import AsyncController
+from mpc_controller import MPCController
+from state_vector import State_Vector
+from utils import shift_plan
+
+STATE = State_Vector(x=350, y=600, alpha=radians(-20), y_dot=30)
+TARGET = State_Vector(x=400, y=937.5)
+
+
+class SlowController(MPCController):
+    # a solve that always takes longer than `delay` seconds
+    def __init__(self, delay, **kwargs):
+        super().__init__(**kwargs)
+        self.delay = delay
+
+    def solve(self, U):
+        time.sleep(self.delay)
+        return super().solve(U)
+
+
+def test_shift_plan_by_several_steps():
+    U = np.arange(10.0).reshape(5, 2)
+    np.testing.assert_array_equal(shift_plan(U, 1), shift_plan(U))
+    np.testing.assert_array_equal(shift_plan(U, 2),
+                                  [[4, 5], [6, 7], [6, 7], [6, 7], [6, 7]])
+    np.testing.assert_array_equal(shift_plan(U, 10), [[6, 7]] * 5)
+
+
+def test_first_plan_matches_the_blocking_controller():
+    reference = MPCController(mass=30)
+    U = reference.setup_mpc(current_state=STATE, target_state=TARGET, dt=0.02)
+    expected, predicted = reference.solve(U)
+
+    controller = AsyncController(MPCController(mass=30))
+    controller.setup_mpc(current_state=STATE, target_state=TARGET, dt=0.02)
+    U_opt, async_predicted = controller.solve()
+    controller.close()
+
+    np.testing.assert_allclose(U_opt, expected)
+    np.testing.assert_allclose(async_predicted, predicted)
+    assert controller.staleness == [0] and controller.deadline_misses == 0
+    # attributes of the wrapped controller are still there
+    assert controller.N == 5 and len(controller.timings) == 1
+
+
+def test_slow_solves_are_shifted_and_counted():
+    controller = AsyncController(SlowController(0.05, mass=30))
+    for _ in range(10):
+        controller.setup_mpc(current_state=STATE, target_state=TARGET,
+                             dt=0.02)
+        U_opt, _ = controller.solve()
+        time.sleep(0.01)
+    controller.wait()
+    stats = controller.stats()
+    plan, plan_tick = controller.plan, controller.plan_tick
+    controller.close()
+
+    assert stats["ticks"] == 10
+    # the ticks never wait for the worker, most snapshots are skipped
+    assert 1 <= stats["solves"] < 10
+    assert stats["deadline_misses"] > 0 and stats["staleness_max"] > 1
+    np.testing.assert_array_equal(
+        U_opt, shift_plan(plan, 10 - plan_tick) if plan_tick < 10 else plan)
+
+
+def test_first_failure_is_raised_then_tolerated():
+    controller = AsyncController(
+        MPCController(mass=30, transcription="unknown"))
+    controller.setup_mpc(current_state=STATE, target_state=TARGET, dt=0.02)
+    with pytest.raises(ValueError):
+        controller.solve()
+    assert controller.failures == 1
+    controller.close()
+
+
+def test_next_plan_is_solved_for_the_predicted_state():
+    controller = AsyncController(MPCController(mass=30))
+    controller.setup_mpc(current_state=STATE, target_state=TARGET, dt=0.02)
+    _, predicted = controller.solve()
+    # the worker solves from where the control just returned takes the rocket
+    controller.wait()
+    controller.setup_mpc(current_state=State_Vector(*predicted),
+                         target_state=TARGET, dt=0.02)
+    U_opt, _ = controller.solve()
+    controller.close()
+
+    reference = MPCController(mass=30)
+    U = reference.setup_mpc(current_state=STATE, target_state=TARGET, dt=0.02)
+    reference.solve(U)
+    U = reference.setup_mpc(current_state=State_Vector(*predicted),
+                            target_state=TARGET, dt=0.02)
+    expected, _ = reference.solve(U)
+
+    np.testing.assert_allclose(U_opt, expected, rtol=1e-6, atol=1e-6)
+    assert controller.staleness == [0, 0] and controller.deadline_misses == 0
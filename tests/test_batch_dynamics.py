@@ -0,0 +1,54 @@
+import numpy as np
+
+from batch_dynamics import BatchDynamics
+from mpc_controller import MPCController
+from state_vector import State_Vector
+
+
+def random_batch(B, seed=0):
+    rng = np.random.default_rng(seed)
+    states = np.column_stack([
+        rng.uniform(0, 800, B), rng.uniform(0, 1000, B),
+        rng.uniform(-1, 1, B), rng.normal(0, 20, B),
+        rng.normal(0, 20, B), rng.normal(0, 1, B),
+    ])
+    controls = np.column_stack([
+        rng.uniform(-600, 0, B), rng.uniform(-np.pi / 3, np.pi / 3, B)])
+    return states, controls
+
+
+def test_step_matches_predicted_next_state():
+    mpc = MPCController(mass=30)
+    dynamics = BatchDynamics.from_controller(mpc)
+    states, controls = random_batch(64)
+
+    batch = dynamics.step(states, controls, dt=1 / 50)
+    for s, u, expected in zip(states, controls, batch):
+        single = mpc.predicted_next_state(State_Vector(*s), list(u), 1 / 50)
+        np.testing.assert_allclose(expected, single, rtol=1e-12, atol=1e-9)
+
+
+def test_per_rocket_mass_broadcasts():
+    states, controls = random_batch(8)
+    masses = np.linspace(20, 40, 8)
+    batch = BatchDynamics(mass=masses).step(states, controls, dt=0.02)
+    for i, m in enumerate(masses):
+        single = BatchDynamics(mass=m).step(states[i:i + 1], controls[i:i + 1],
+                                            dt=0.02)
+        np.testing.assert_allclose(batch[i], single[0])
+
+
+def test_rollout_chains_steps():
+    dynamics = BatchDynamics(mass=30)
+    states, _ = random_batch(5)
+    rng = np.random.default_rng(1)
+    controls = np.stack([rng.uniform(-600, 0, (5, 10)),
+                         rng.uniform(-1, 1, (5, 10))], axis=-1)
+
+    trajectory = dynamics.rollout(states, controls, dt=0.02)
+    assert trajectory.shape == (5, 11, 6)
+    np.testing.assert_array_equal(trajectory[:, 0], states)
+    x = states
+    for i in range(10):
+        x = dynamics.step(x, controls[:, i], dt=0.02)
+    np.testing.assert_allclose(trajectory[:, -1], x)
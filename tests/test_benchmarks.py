@@ -0,0 +1,36 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "benchmarks"))
+
+from suite import compare, metric  # noqa: E402
+
+
+def results(**metrics):
+    return {"results": {"mpc.drift": metrics}}
+
+
+def test_signed_slope_is_compared_by_its_difference():
+    def slope(value):
+        return metric(value, "ms", better="abs", tolerance=1.0)
+
+    # from -2 to -0.5 ms per 1000 ticks: the drift got worse, by more
+    # than the tolerance
+    row, = compare(results(slope=slope(-2.0)), results(slope=slope(-0.5)), 0.2)
+    assert row[4] == 1.5 and row[5]
+    row, = compare(results(slope=slope(-2.0)), results(slope=slope(-2.5)), 0.2)
+    assert row[4] == -0.5 and not row[5]
+    # noise around 0 is not a huge relative change
+    row, = compare(results(slope=slope(0.01)), results(slope=slope(0.4)), 0.2)
+    assert not row[5]
+
+
+def test_relative_metrics():
+    rows = compare(results(latency=metric(2.0, "ms"),
+                           rate=metric(100, "steps/s", better="higher"),
+                           failures=metric(0, "solves")),
+                   results(latency=metric(2.2, "ms"),
+                           rate=metric(50, "steps/s", better="higher"),
+                           failures=metric(1, "solves")), 0.2)
+    assert [(row[1], row[5]) for row in rows] == [
+        ("latency", False), ("rate", True), ("failures", True)]
@@ -0,0 +1,58 @@
+import math
+
+import numpy as np
+
+import campaign
+from campaign import run_campaign, run_case, sample_cases, summary
+from telemetry import load_telemetry
+
+
+def test_sample_cases_is_deterministic():
+    assert sample_cases(20, seed=3) == sample_cases(20, seed=3)
+    assert sample_cases(20, seed=3) != sample_cases(20, seed=4)
+
+    cases = sample_cases(200, seed=0)
+    assert [c["case"] for c in cases] == list(range(200))
+    assert all(300 <= c["x"] <= 500 for c in cases)
+    assert all(abs(c["alpha"]) <= 50 for c in cases)
+
+
+def test_summary_is_deterministic():
+    results = [
+        dict(touched_down=True, error="", touchdown_y_dot=1.0 + i,
+             attitude_error=0.5, fuel_used=100.0, solve_p95_ms=4.0 + i)
+        for i in range(3)
+    ] + [dict(touched_down=False, error="RuntimeError: x",
+              solve_p95_ms=math.nan)]
+    text = summary(results)
+    assert text == summary(list(results))
+    assert text.splitlines()[0] == \
+        "landings: 4, touched down: 3, solver errors: 1"
+    assert "touchdown y_dot: mean 2.00, max 3.00" in text
+
+
+def test_run_case_records_any_exception():
+    case = sample_cases(1, seed=0)[0]
+    campaign._init_worker({"mass": 30, "transcription": "unknown"},
+                          {"dt": 1 / 50, "t_final": 1.0})
+    result = run_case(case)
+    assert result["error"].startswith("ValueError: Unknown transcription")
+    assert not result["touched_down"]
+    assert np.isnan(result["solve_mean_ms"])
+
+
+def test_results_do_not_depend_on_case_order():
+    cases = sample_cases(2, seed=1)
+    together = run_campaign(cases, workers=1, t_final=0.5)
+    alone = run_campaign(cases[1:], workers=1, t_final=0.5)
+
+    assert [r["case"] for r in together] == [0, 1]
+    for key in ("touchdown_x_dot", "touchdown_y_dot", "x_error", "fuel_used"):
+        assert together[1][key] == alone[0][key]
+
+
+def test_campaign_records_telemetry(tmp_path):
+    result, = run_campaign(sample_cases(1, seed=2), workers=1, t_final=0.2,
+                           telemetry_dir=str(tmp_path))
+    data = load_telemetry(str(tmp_path / "case-0000"))
+    assert len(data) == result["ticks"] == 10
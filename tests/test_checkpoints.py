@@ -0,0 +1,148 @@
+import os
+import subprocess
+import sys
+from math import radians
+
+import numpy as np
+import pytest
+
+from checkpoints import Checkpoints
+from exhaust_flame import ExhaustFlame
+from async_controller import AsyncController
+from external_forces import Wind
+from mpc_controller import MPCController
+from simulation import Simulation
+from state_vector import State_Vector
+
+SRC = os.path.join(os.path.dirname(__file__), "..", "src")
+
+
+def landing(physics="numpy", **kwargs):
+    return Simulation(State_Vector(x=350, y=400, alpha=radians(-20)),
+                      physics=physics, wind=Wind([5, 0]), **kwargs)
+
+
+@pytest.mark.parametrize("physics", ["numpy", "pymunk"])
+def test_resumed_run_matches_the_original(physics):
+    checkpoints = Checkpoints(every=0.4)
+    original = landing(physics).run(t_final=1.2, checkpoints=checkpoints)
+    assert checkpoints.times == pytest.approx([0, 0.4, 0.8])
+
+    resumed = checkpoints.resume(0.5).run(t_final=1.2)
+    # from the checkpoint at 0.4 s on, tick for tick
+    assert resumed.t[0] == pytest.approx(0.42)
+    start = len(original) - len(resumed)
+    np.testing.assert_array_equal(resumed.states, original.states[start:])
+    np.testing.assert_array_equal(resumed.controls, original.controls[start:])
+
+
+def test_resumed_scheduler_counts_simulated_time():
+    checkpoints = Checkpoints(every=0.5)
+    sim = landing()
+    sim.scheduler(control_rate=25, checkpoints=checkpoints).run(t_final=1.2)
+    assert sim.tick == 60
+
+    resumed = checkpoints.resume(1.0)
+    scheduler = resumed.scheduler(control_rate=25)
+    scheduler.run(t_final=1.2)
+    assert resumed.tick == 60
+    assert scheduler.stats()["control"]["runs"] == 5
+    assert scheduler.stats()["physics"]["achieved_rate"] == pytest.approx(50)
+    assert vars(resumed.state) == vars(sim.state)
+
+
+def test_branches_change_the_run_not_the_checkpoint():
+    checkpoints = Checkpoints(every=0.4, keep=2)
+    original = landing().run(t_final=1.2, checkpoints=checkpoints)
+    assert checkpoints.times == pytest.approx([0.4, 0.8])
+    with pytest.raises(ValueError):
+        checkpoints.latest(0.2)
+
+    gust = checkpoints.resume(0.8, wind=Wind([-200, 0]))
+    assert gust.wind.direction == [-200, 0]
+    branch = gust.run(t_final=1.2)
+    assert branch.states[-1, 0] < original.states[-1, 0] - 1
+
+    again = checkpoints.resume(0.8).run(t_final=1.2)
+    np.testing.assert_array_equal(again.states[-1], original.states[-1])
+
+
+def test_snapshots_restore_in_a_new_process(tmp_path):
+    checkpoints = Checkpoints(every=0.4)
+    original = landing().run(t_final=1.2, checkpoints=checkpoints)
+    path = str(tmp_path / "landing.ckpt")
+    checkpoints.save(path)
+
+    code = f"""
+from checkpoints import Checkpoints
+trajectory = Checkpoints.load({path!r}).resume(0.8).run(t_final=1.2)
+print(repr(trajectory.states[-1].tolist()))
+"""
+    out = subprocess.run([sys.executable, "-c", code], cwd=SRC,
+                         capture_output=True, text=True, check=True)
+    final = eval(out.stdout.strip().splitlines()[-1])
+    np.testing.assert_array_equal(final, original.states[-1])
+
+
+def test_restore_needs_the_same_physics():
+    snapshot = landing("numpy").snapshot()
+    with pytest.raises(ValueError):
+        landing("pymunk").restore(snapshot)
+
+
+def test_restore_needs_the_same_controller_problem():
+    sim = landing(controller=MPCController(mass=30, N=10))
+    sim.run(t_final=0.2)
+    snapshot = sim.snapshot()
+    # the default controller plans over N=5
+    with pytest.raises(ValueError, match="'N': 10"):
+        Simulation.from_snapshot(snapshot)
+
+    controller = AsyncController(MPCController(mass=30, N=10))
+    try:
+        with pytest.raises(ValueError, match="synchronous"):
+            controller.set_warm_start(snapshot["controller"])
+        async_snapshot = dict(snapshot, controller=controller.warm_start())
+    finally:
+        controller.close()
+    with pytest.raises(ValueError, match="AsyncController"):
+        Simulation.from_snapshot(async_snapshot,
+                                 controller=MPCController(mass=30, N=10))
+
+    resumed = Simulation.from_snapshot(
+        snapshot, controller=MPCController(mass=30, N=10))
+    assert resumed.controller.U_opt.shape == (10, 2)
+
+
+def test_flame_restores_its_particles_and_random_state():
+    def flame():
+        return ExhaustFlame(ground=990, position=(400, 500), angle=0.0,
+                            thrust_force=600, number_of_particles=50, seed=1)
+
+    original = flame()
+    for _ in range(5):
+        original.emit()
+        original.update()
+    snapshot = original.snapshot(particles=True)
+    original.emit()
+    original.update()
+
+    copy = flame()
+    copy.restore(snapshot)
+    assert len(copy) == len(snapshot["particles"]["pos"])
+    copy.emit()
+    copy.update()
+    assert len(copy) == len(original)
+    np.testing.assert_array_equal(copy.pos[:len(copy)],
+                                  original.pos[:len(original)])
+
+    # without the particles only the random state comes back
+    copy.restore(original.snapshot())
+    assert len(copy) == 0
+
+
+def test_scheduler_takes_checkpoints():
+    sim = landing()
+    checkpoints = Checkpoints(every=0.5)
+    sim.scheduler(control_rate=50, checkpoints=checkpoints).run(t_final=1.2)
+    assert checkpoints.times == pytest.approx([0, 0.5, 1.0])
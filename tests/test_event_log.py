@@ -0,0 +1,95 @@
+import json
+from math import radians
+
+import numpy as np
+import pytest
+
+import event_log
+from event_log import Logger, JsonLinesSink, ConsoleSink, DEBUG, INFO
+from simulation import Simulation
+from state_vector import State_Vector
+
+
+class Unformattable:
+    def __str__(self):
+        raise AssertionError("formatted while disabled")
+
+    __repr__ = __format__ = __str__
+
+
+def test_disabled_levels_do_nothing():
+    records = []
+    logger = Logger("test", level=INFO, sink=records.append)
+    assert not logger.enabled(DEBUG)
+    assert not logger.debug("tick", state=Unformattable())
+    assert logger.info("start", x=1.0)
+    assert [r["event"] for r in records] == ["start"]
+    assert records[0]["x"] == 1.0 and records[0]["logger"] == "test"
+
+
+def test_sampling_and_rate_limits():
+    records = []
+    now = [0.0]
+    logger = Logger("test", level=DEBUG, sink=records.append,
+                    clock=lambda: now[0])
+    logger.limit("tick", every=10)
+    logger.limit("fallback", rate=2)
+    for i in range(100):
+        logger.debug("tick", i=i)
+        logger.warning("fallback", i=i)
+        now[0] += 0.01
+
+    ticks = [r["i"] for r in records if r["event"] == "tick"]
+    assert ticks == list(range(0, 100, 10))
+    # 1 s of calls at 2 per second
+    assert len([r for r in records if r["event"] == "fallback"]) == 2
+    assert logger.dropped == {"tick": 90, "fallback": 98}
+
+
+def test_json_lines_sink(tmp_path):
+    path = tmp_path / "events.jsonl"
+    with JsonLinesSink(str(path)) as sink:
+        logger = Logger("test", level=DEBUG, sink=sink)
+        logger.info("status", t=np.float64(0.5), state=np.arange(3),
+                    status=np.int8(2), error=RuntimeError("failed"))
+    record = json.loads(path.read_text().splitlines()[0])
+    assert record["event"] == "status" and record["level"] == INFO
+    assert record["t"] == 0.5 and record["state"] == [0, 1, 2]
+    assert record["status"] == 2 and record["error"] == "failed"
+
+
+def test_console_sink(capsys):
+    Logger("physics", level=DEBUG, sink=ConsoleSink()).debug(
+        "step", dt=0.002, steps=3)
+    assert capsys.readouterr().err.strip() == \
+        "debug   physics step dt=0.002 steps=3"
+
+
+@pytest.fixture
+def captured():
+    records = []
+    level = event_log._config["level"]
+    sink = event_log._config["sink"]
+    event_log.configure(level=DEBUG, sink=records.append)
+    yield records
+    event_log.configure(level=level, sink=sink)
+
+
+def test_simulation_controller_and_physics_events(captured):
+    sim = Simulation(State_Vector(x=400, y=930, y_dot=60))
+    sim.run(t_final=10)
+    events = {(r["logger"], r["event"]) for r in captured}
+    assert {("simulation", "tick"), ("simulation", "touchdown"),
+            ("mpc", "solve"), ("physics", "step")} <= events
+    touchdown = [r for r in captured if r["event"] == "touchdown"]
+    assert len(touchdown) == 1 and touchdown[0]["t"] == sim.time
+
+
+def test_configure_reaches_existing_loggers(captured):
+    logger = event_log.get_logger("simulation")
+    assert logger.enabled(DEBUG)
+    event_log.configure(level="off")
+    assert not logger.enabled(event_log.ERROR)
+    Simulation(State_Vector(x=350, y=200, alpha=radians(-20))).run(
+        t_final=0.2)
+    assert captured == []
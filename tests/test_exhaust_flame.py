@@ -0,0 +1,74 @@
+import numpy as np
+import pygame
+
+from exhaust_flame import ExhaustFlame
+
+
+def flame(**kwargs):
+    options = dict(ground=990, position=(400, 500), angle=0.0,
+                   thrust_force=600, number_of_particles=100, seed=0)
+    options.update(kwargs)
+    return ExhaustFlame(**options)
+
+
+def test_emit_spawns_particles_and_respects_capacity():
+    f = flame(capacity=250)
+    f.emit()
+    assert len(f) == 100
+    assert (f.lifetime[:100] >= 10).all() and (f.lifetime[:100] <= 70).all()
+    np.testing.assert_array_equal(f.pos[:100], [[400, 500]] * 100)
+
+    f.emit()
+    f.emit()
+    assert len(f) == 250 and f.dropped == 50
+
+    weak = flame(thrust_force=40)
+    weak.emit()
+    assert len(weak) == 0
+
+
+def test_update_culls_dead_particles_in_order():
+    f = flame(number_of_particles=5)
+    f.emit()
+    f.lifetime[:5] = [1, 5, 1, 5, 5]
+    f.initial_lifetime[:5] = [1, 5, 1, 6, 7]
+    f.update()
+    assert len(f) == 3
+    np.testing.assert_array_equal(f.initial_lifetime[:3], [5, 6, 7])
+
+
+def test_ground_hit_turns_particles_into_dust():
+    f = flame(number_of_particles=1)
+    f.emit()
+    f.pos[0] = (400, 985)
+    f.vel[0] = (0, 10)
+    f.update()
+    assert f.dust[0]
+    assert f.pos[0, 1] == 990 - 3
+    assert -5 <= f.vel[0, 1] <= -1
+    np.testing.assert_array_equal(f.colors()[0], [135, 35, 0])
+
+
+def test_draw_matches_pygame_circles():
+    f = flame(number_of_particles=1)
+    f.emit()
+    f.pos[0] = (100.7, 200.2)
+    f.radius[0] = 2.5
+
+    screen = pygame.Surface((300, 300))
+    f.draw(screen)
+    expected = pygame.Surface((300, 300))
+    pygame.draw.circle(expected, (255, 0, 0), (100, 200), 2)
+    np.testing.assert_array_equal(pygame.surfarray.array3d(screen),
+                                  pygame.surfarray.array3d(expected))
+
+
+def test_colors_fade_from_red_to_white():
+    f = flame(number_of_particles=3)
+    f.emit()
+    f.initial_lifetime[:3] = 100
+    f.lifetime[:3] = [100, 50, 1]
+    colors = f.colors()
+    np.testing.assert_array_equal(colors[0], [255, 0, 0])
+    np.testing.assert_array_equal(colors[1], [255, 255, 0])
+    assert colors[2][2] > 240
@@ -0,0 +1,78 @@
+from math import radians
+
+import numpy as np
+import pytest
+
+from mpc_controller import LQR, MPCController, SHIFTED, SOLVED
+from simulation import Simulation
+from state_vector import State_Vector
+from utils import shift_plan
+
+STATE = State_Vector(x=350, y=600, alpha=radians(-20), y_dot=30)
+TARGET = State_Vector(x=400, y=937.5)
+
+
+def tick(controller):
+    U = controller.setup_mpc(current_state=STATE, target_state=TARGET,
+                             dt=0.02)
+    U_opt, _ = controller.solve(U)
+    return np.array(U_opt)
+
+
+def fail(*args):
+    raise RuntimeError("Maximum_WallTime_Exceeded")
+
+
+def test_lqr_alone_lands_the_rocket():
+    # every solve runs out of time, only the LQR law flies
+    controller = MPCController(mass=30, time_budget=1e-5, fallback=True)
+    sim = Simulation(State_Vector(x=350, y=800, alpha=radians(20)),
+                     controller=controller)
+    sim.run(t_final=10)
+
+    assert sim.touched_down() and sim.time < 10
+    assert abs(sim.state.y_dot) < 5 and abs(sim.state.x_dot) < 10
+    assert abs(sim.state.alpha) < radians(1)
+    assert controller.fallbacks[LQR] == sim.tick
+    u = controller.fallback_law.control(np.zeros(6), np.zeros(6), 0.02)
+    np.testing.assert_allclose(u, [-30 * 9.81, 0])
+
+
+@pytest.mark.parametrize("kwargs", [{}, {"backend": "function"},
+                                    {"mode": "rti"}])
+def test_failed_solves_shift_the_plan_then_use_lqr(monkeypatch, kwargs):
+    controller = MPCController(mass=30, fallback=True, **kwargs)
+    plan = tick(controller)
+    assert controller.last_status == SOLVED
+
+    monkeypatch.setattr(controller, "solve_plan", fail)
+    statuses = []
+    for _ in range(controller.N):
+        U_opt = tick(controller)
+        statuses.append(controller.last_status)
+        if controller.last_status == SHIFTED:
+            plan = shift_plan(plan)
+            np.testing.assert_array_equal(U_opt, plan)
+    assert statuses == [SHIFTED] * (controller.N - 1) + [LQR]
+    assert controller.fallbacks == {SHIFTED: controller.N - 1, LQR: 1}
+    assert len(controller.fallback_times) == controller.N
+    # the next solve starts cold
+    assert controller.U_opt is None and controller.last_plan is None
+
+    monkeypatch.undo()
+    tick(controller)
+    assert controller.last_status == SOLVED and controller.plan_age == 0
+    controller.reset()
+    assert controller.fallbacks == {SHIFTED: 0, LQR: 0}
+
+
+def test_time_budget_falls_back_instead_of_raising():
+    controller = MPCController(mass=30, time_budget=1e-5, fallback=True)
+    for _ in range(3):
+        tick(controller)
+        assert controller.last_status == LQR
+    assert controller.s_opts["max_wall_time"] == 1e-5
+
+    strict = MPCController(mass=30, time_budget=1e-5)
+    with pytest.raises(RuntimeError):
+        tick(strict)
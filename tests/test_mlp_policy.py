@@ -0,0 +1,73 @@
+from math import radians
+
+import numpy as np
+import pytest
+
+from mlp_policy import (MLP, MLPController, MLPPolicy, features,
+                        load_dataset)
+from mpc_controller import MPCController
+from simulation import Simulation
+from state_vector import State_Vector
+from telemetry import TelemetryRecorder
+
+
+@pytest.fixture(scope="module")
+def dataset(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("runs") / "run")
+    sim = Simulation(State_Vector(x=380, y=600, alpha=radians(-10)))
+    with TelemetryRecorder(path=path) as recorder:
+        sim.run(t_final=2.0, recorder=recorder)
+    return load_dataset([path])
+
+
+def test_mlp_fits_a_smooth_function():
+    rng = np.random.default_rng(0)
+    X = rng.uniform(-1, 1, (512, 3))
+    Y = np.column_stack((np.sin(X[:, 0]) + X[:, 1], X[:, 2] ** 2))
+    mlp = MLP((3, 16, 2))
+    losses = mlp.fit(X, Y, epochs=100, batch_size=64, lr=1e-2)
+    assert losses[-1] < 0.05 * losses[0]
+
+
+def test_policy_fits_the_mpc_and_round_trips(dataset, tmp_path):
+    X, U = dataset
+    assert X.shape == (100, 7) and U.shape == (100, 2)
+    policy = MLPPolicy.fit(X, U, hidden=(32,), epochs=300)
+    assert policy.losses[-1] < policy.losses[0]
+
+    controls = policy(X)
+    assert (controls[:, 0] <= 0).all() and (controls[:, 0] >= -600).all()
+    assert (np.abs(controls[:, 1]) <= radians(60)).all()
+    assert policy.in_distribution(X).all()
+    assert not policy.in_distribution(X + 1e3).any()
+
+    path = str(tmp_path / "policy.npz")
+    policy.save(path)
+    np.testing.assert_array_equal(MLPPolicy.load(path)(X), controls)
+
+
+def test_controller_falls_back_out_of_distribution(dataset):
+    X, U = dataset
+    policy = MLPPolicy.fit(X, U, hidden=(32,), epochs=300)
+    fallback = MPCController(mass=30)
+    controller = MLPController(policy, fallback=fallback, mass=30)
+    target = State_Vector(x=400, y=937.5)
+
+    # a state seen while recording
+    state = State_Vector(*(X[50, :6] + [400, 937.5, 0, 0, 0, 0]))
+    controller.setup_mpc(current_state=state, target_state=target, dt=1 / 50)
+    U_opt, predicted = controller.solve()
+    assert controller.misses == 0 and U_opt.shape == (5, 2)
+    np.testing.assert_allclose(U_opt[0], policy(X[50:51])[0])
+
+    controller.setup_mpc(current_state=State_Vector(x=100, y=100),
+                         target_state=target, dt=1 / 50)
+    controller.solve()
+    assert controller.misses == 1 and len(fallback.timings) == 1
+
+    # batched
+    z = np.array([400, 937.5, 0, 0, 0, 0])
+    states = X[:, :6] + z
+    controls, ok = controller.controls(states, z, 1 / 50)
+    assert controls.shape == (100, 2) and ok.any()
+    np.testing.assert_allclose(features(states, z), X)
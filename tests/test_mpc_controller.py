@@ -0,0 +1,90 @@
+from math import radians
+
+import numpy as np
+import pytest
+
+from mpc_controller import MPCController
+from state_vector import State_Vector
+from utils import shift_plan
+
+TRANSCRIPTIONS = ["single_shooting", "multiple_shooting", "collocation"]
+BACKENDS = ["opti", "function", "codegen"]
+
+START = State_Vector(x=350, y=600, alpha=radians(-20), y_dot=30)
+TARGET = State_Vector(x=400, y=937.5)
+
+
+def solve_ticks(controller, ticks=3, dt=1 / 50):
+    # Closed loop on the controller's own model
+    state = START
+    plans = []
+    for _ in range(ticks):
+        U = controller.setup_mpc(current_state=state, target_state=TARGET,
+                                 dt=dt)
+        U_opt, predicted = controller.solve(U)
+        plans.append(np.array(U_opt))
+        state = State_Vector(*predicted)
+    return plans
+
+
+@pytest.fixture(scope="module")
+def cache_dir(tmp_path_factory):
+    return str(tmp_path_factory.mktemp("solver-cache"))
+
+
+@pytest.fixture(scope="module")
+def reference():
+    return solve_ticks(MPCController(mass=30, persistent=False))
+
+
+@pytest.mark.parametrize("transcription", TRANSCRIPTIONS)
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_backends_and_transcriptions_match(backend, transcription, cache_dir,
+                                           reference):
+    mpc = MPCController(mass=30, backend=backend,
+                        transcription=transcription, cache_dir=cache_dir)
+    plans = solve_ticks(mpc)
+
+    for plan, expected in zip(plans, reference):
+        assert plan.shape == (mpc.N, 2)
+        # only the applied control, collocation integrates a bit differently
+        np.testing.assert_allclose(plan[0], expected[0], rtol=1e-2, atol=1e-3)
+
+
+def test_persistent_matches_rebuild(reference):
+    plans = solve_ticks(MPCController(mass=30))
+    for plan, expected in zip(plans, reference):
+        # the last control is not in the cost, its value is arbitrary
+        np.testing.assert_allclose(plan[:-1], expected[:-1],
+                                   rtol=1e-4, atol=1e-6)
+
+
+def test_compiled_solver_is_cached(cache_dir):
+    first = MPCController(mass=30, backend="function", cache_dir=cache_dir)
+    solve_ticks(first, ticks=1)
+    second = MPCController(mass=30, backend="function", cache_dir=cache_dir)
+    solve_ticks(second, ticks=1)
+    assert second.compiled.from_cache
+    assert second.compiled.key == first.compiled.key
+
+    other = MPCController(mass=30, N=6, backend="function",
+                          cache_dir=cache_dir)
+    solve_ticks(other, ticks=1)
+    assert other.compiled.key != first.compiled.key
+
+
+def test_timings_are_recorded():
+    mpc = MPCController(mass=30)
+    solve_ticks(mpc, ticks=4)
+    assert len(mpc.timings) == 4
+    assert all(build >= 0 and solve > 0 for build, solve in mpc.timings)
+    assert mpc.timings[-1] == (mpc.last_build_time, mpc.last_solve_time)
+
+    mpc.reset()
+    assert mpc.timings == [] and mpc.U_opt is None
+
+
+def test_shift_plan_repeats_last_used_control():
+    U = np.array([[0, 0], [1, 10], [2, 20], [3, 30]], dtype=float)
+    np.testing.assert_array_equal(
+        shift_plan(U), [[1, 10], [2, 20], [2, 20], [2, 20]])
@@ -0,0 +1,91 @@
+from math import radians
+
+import numpy as np
+import pytest
+
+from mpc_controller import MPCController
+from mpc_table import ControlTable, TableController, build_table, evaluate
+from simulation import Simulation
+from state_vector import State_Vector
+
+AXES = (
+    [-50, 50],
+    [-400, -200],
+    [-0.2, 0.2],
+    [-10, 10],
+    [0, 20],
+    [-0.5, 0.5],
+)
+TARGET = np.array([400, 937.5, 0, 0, 0, 0])
+
+
+@pytest.fixture(scope="module")
+def table():
+    return build_table(AXES, workers=1)
+
+
+def online(point):
+    controller = MPCController(mass=30)
+    U = controller.setup_mpc(current_state=State_Vector(*(TARGET + point)),
+                             target_state=State_Vector(*TARGET), dt=1 / 50)
+    return np.asarray(controller.solve(U)[0])[0]
+
+
+def test_lookup_is_exact_on_nodes_and_linear_between(table):
+    assert table.values.shape == (2,) * 6 + (2,)
+    assert not np.isnan(table.values).any()
+
+    low = np.array([axis[0] for axis in AXES], dtype=float)
+    controls, inside = table.lookup(TARGET + low)
+    assert inside.all()
+    np.testing.assert_allclose(controls[0], online(low), rtol=1e-5,
+                               atol=1e-6)
+
+    # halfway along y (a decreasing axis internally) with the rest on nodes
+    high = low.copy()
+    high[1] = AXES[1][1]
+    middle = (low + high) / 2
+    controls, _ = table.lookup(TARGET + np.array([low, middle, high]))
+    np.testing.assert_allclose(controls[1], controls[[0, 2]].mean(axis=0),
+                               rtol=1e-6)
+
+    _, inside = table.lookup(TARGET + low - 1)
+    assert not inside[0]
+
+
+def test_save_load_roundtrip(table, tmp_path):
+    path = str(tmp_path / "table.npz")
+    table.save(path)
+    loaded = ControlTable.load(path)
+    np.testing.assert_array_equal(loaded.values, table.values)
+    assert loaded.dt == table.dt and loaded.controller_kwargs == {"mass": 30}
+    states = TARGET + np.random.default_rng(0).uniform(-1, 1, (100, 6))
+    np.testing.assert_array_equal(loaded.lookup(states)[0],
+                                  table.lookup(states)[0])
+
+
+def test_table_controller_flies_and_falls_back(table):
+    fallback = MPCController(mass=30)
+    controller = TableController(table, fallback=fallback)
+    sim = Simulation(State_Vector(x=400, y=637.5, alpha=radians(5)),
+                     controller=controller)
+    trajectory = sim.run(t_final=0.5)
+    assert len(trajectory) == len(controller.timings) == 25
+    assert controller.misses == 0 and not fallback.timings
+
+    # off the table, the online MPC flies
+    controller.reset()
+    sim = Simulation(State_Vector(x=400, y=200), controller=controller)
+    sim.run(t_final=0.5)
+    assert controller.misses == len(fallback.timings) == 25
+
+    with pytest.raises(ValueError):
+        controller.setup_mpc(State_Vector(x=400, y=600),
+                             State_Vector(x=300, y=937.5), dt=1 / 50)
+
+
+def test_evaluate_reports_error_and_timing(table):
+    report = evaluate(table, samples=20)
+    assert report["valid"] > 0
+    assert report["lookup_us"] < report["solve_us"]
+    assert report["thrust_error_mean"] >= 0
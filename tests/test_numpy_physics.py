@@ -0,0 +1,117 @@
+from math import radians
+
+import numpy as np
+import pytest
+
+from numpy_physics import RigidBodies
+from simulation import Simulation
+from state_vector import State_Vector
+
+
+def open_loop(physics, controls, wind=(500, 0), dt=0.02, **kwargs):
+    sim = Simulation(State_Vector(x=400, y=300, alpha=radians(10), y_dot=20),
+                     physics=physics, dt=dt, **kwargs)
+    states = []
+    for thrust, nozzle_angle in controls:
+        sim.ps.rocket.apply_force(force=thrust, nozzle_angle=nozzle_angle)
+        sim.ps.apply_external_force(wind)
+        sim.ps.update_rocket_state(dt)
+        s = sim.state
+        states.append((s.x, s.y, s.alpha, s.x_dot, s.y_dot, s.alpha_dot))
+    return np.array(states)
+
+
+def test_matches_pymunk_in_flight():
+    rng = np.random.default_rng(0)
+    controls = np.column_stack((rng.uniform(-600, -200, 100),
+                                rng.uniform(-0.2, 0.2, 100)))
+    np.testing.assert_allclose(open_loop("numpy", controls),
+                               open_loop("pymunk", controls), atol=1e-8)
+
+
+def test_closed_loop_matches_pymunk():
+    trajectories = [
+        Simulation(State_Vector(x=350, y=200, alpha=radians(-20)),
+                   physics=physics).run(t_final=1.0)
+        for physics in ("pymunk", "numpy")]
+    np.testing.assert_allclose(trajectories[1].states,
+                               trajectories[0].states, atol=1e-6)
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        Simulation(State_Vector(), physics="box2d")
+
+
+def ten_hertz_controls(ticks=20):
+    rng = np.random.default_rng(2)
+    return np.column_stack((rng.uniform(-600, -200, ticks),
+                            rng.uniform(-0.2, 0.2, ticks)))
+
+
+def test_substeps_match_pymunk():
+    controls = ten_hertz_controls()
+    np.testing.assert_allclose(
+        open_loop("numpy", controls, dt=0.1, substeps=5),
+        open_loop("pymunk", controls, dt=0.1, substeps=5), atol=1e-8)
+
+
+def test_substeps_and_adaptive_steps_converge():
+    controls = ten_hertz_controls()
+    reference = open_loop("numpy", controls, dt=0.1, tolerance=0.01)[-1]
+
+    def error(**kwargs):
+        final = open_loop("numpy", controls, dt=0.1, **kwargs)[-1]
+        return np.abs(final[:2] - reference[:2]).max()
+
+    assert error(substeps=10) < error(substeps=2) / 4
+    assert error(tolerance=0.1) < error(substeps=10) / 10
+
+
+def test_adaptive_steps_follow_the_tolerance():
+    bodies = RigidBodies([[400, 300, 0.2, 0, 20, 0]], mass=30)
+    steps = []
+    for tolerance in (1.0, 0.1):
+        bodies.h = None
+        bodies.apply_thrust(-400, 0.1)
+        steps.append(bodies.step(0.1, tolerance=tolerance))
+    assert 1 <= steps[0] < steps[1]
+
+
+def test_adaptive_steps_need_numpy():
+    with pytest.raises(ValueError):
+        Simulation(State_Vector(), tolerance=1.0)
+
+
+def test_batch_is_the_same_as_one_at_a_time():
+    rng = np.random.default_rng(1)
+    B = 64
+    states = np.column_stack((rng.uniform(100, 700, B),
+                              rng.uniform(100, 500, B),
+                              rng.uniform(-0.5, 0.5, B),
+                              rng.normal(0, 20, (B, 3))))
+    thrust = rng.uniform(-600, 0, B)
+    nozzle_angle = rng.uniform(-1, 1, B)
+
+    batch = RigidBodies(states, mass=30)
+    batch.apply_thrust(thrust, nozzle_angle)
+    batch.step(0.02)
+    for i in range(B):
+        single = RigidBodies(states[i], mass=30)
+        single.apply_thrust(thrust[i], nozzle_angle[i])
+        single.step(0.02)
+        np.testing.assert_allclose(batch.states[i], single.states[0])
+
+
+def test_ground_contact_stops_the_fall():
+    bodies = RigidBodies([[400, 800, 0, 0, 0, 0],
+                          [200, 800, 0.3, 0, 0, 1.0]],
+                         mass=30, ground_level=1000)
+    for _ in range(150):
+        bodies.step(0.02)
+    height = bodies.size[1]
+    np.testing.assert_allclose(bodies.states[0],
+                               [400, 990 - height / 2, 0, 0, 0, 0])
+    # resting on the ground, tilted boxes reach further down
+    assert bodies.pos[1, 1] < bodies.pos[0, 1]
+    assert bodies.vel[1, 1] == 0 and bodies.omega[1] == 0
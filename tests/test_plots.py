@@ -0,0 +1,32 @@
+import os
+
+import numpy as np
+
+from plots import FIGURES, render_run
+from telemetry import TelemetryRecorder
+
+
+def record(path, n=50, thrust=-300.0):
+    with TelemetryRecorder(path=path) as recorder:
+        for i in range(n):
+            recorder.append(t=i * 0.02, state=np.sin(np.arange(6) + i),
+                            predicted=np.cos(np.arange(6) + i),
+                            control=(thrust, 0.01 * i))
+
+
+def test_render_run_skips_unchanged_figures(tmp_path):
+    run = str(tmp_path / "run")
+    record(run)
+
+    rendered = render_run(run, preview=True, workers=1)
+    assert sorted(rendered) == sorted(FIGURES)
+    for png in rendered.values():
+        assert png.endswith("-preview.png") and os.path.getsize(png) > 0
+    assert render_run(run, preview=True, workers=1) == {}
+
+    # only the thrust figure reads the thrust
+    record(run, thrust=-400.0)
+    assert list(render_run(run, preview=True, workers=1)) == ["thrust"]
+    # another time window is another input
+    assert len(render_run(run, preview=True, workers=1, t_start=0.5,
+                          figures=["x", "alpha"])) == 2
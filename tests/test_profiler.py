@@ -0,0 +1,112 @@
+import csv
+import json
+import threading
+
+import pytest
+
+import profiler as profiling
+from mpc_controller import MPCController
+from profiler import Profiler
+from scheduler import Scheduler
+from state_vector import State_Vector
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_disabled_profiler_records_nothing():
+    p = Profiler()
+    with p.span("physics.step"):
+        pass
+    p.count("ipopt.iterations", 3)
+    assert p.span("a") is p.span("b")
+    assert p.stats() == {} and p.events == []
+
+
+def test_span_percentiles_and_counters():
+    clock = FakeClock()
+    p = Profiler(enabled=True, clock=clock)
+    for ms in range(1, 101):
+        with p.span("mpc.solve"):
+            clock.now += ms * 1e-3
+        p.count("ipopt.iterations", ms % 10)
+    stats = p.stats()
+    solve = stats["mpc.solve"]
+    assert solve["kind"] == "span" and solve["count"] == 100
+    assert solve["p50"] == pytest.approx(50.5)
+    assert solve["p99"] == pytest.approx(99.01)
+    assert solve["max"] == pytest.approx(100)
+    assert stats["ipopt.iterations"]["kind"] == "counter"
+    assert stats["ipopt.iterations"]["max"] == 9
+    assert "mpc.solve" in p.summary()
+
+
+def test_csv_and_chrome_trace(tmp_path):
+    p = Profiler(enabled=True)
+    with p.span("render.flip"):
+        pass
+    worker = threading.Thread(target=lambda: p.add("mpc.solve", p.clock(),
+                                                   1e-3),
+                              name="mpc-worker")
+    worker.start()
+    worker.join()
+    p.count("ipopt.iterations", 7)
+
+    p.write_csv(tmp_path / "profile.csv")
+    with open(tmp_path / "profile.csv") as f:
+        rows = {row["name"]: row for row in csv.DictReader(f)}
+    assert rows["mpc.solve"]["kind"] == "span"
+    assert float(rows["mpc.solve"]["p95"]) == pytest.approx(1.0)
+    assert rows["ipopt.iterations"]["count"] == "1"
+
+    p.write_chrome_trace(tmp_path / "trace.json")
+    with open(tmp_path / "trace.json") as f:
+        events = json.load(f)["traceEvents"]
+    spans = [e for e in events if e["ph"] == "X"]
+    assert {e["name"] for e in spans} == {"render.flip", "mpc.solve"}
+    assert len({e["tid"] for e in spans}) == 2
+    assert all(e["ts"] >= 0 and e["dur"] >= 0 for e in spans)
+    assert [e["name"] for e in events if e["ph"] == "C"] == ["ipopt.iterations"]
+
+
+@pytest.fixture
+def enabled():
+    profiling.profiler.reset()
+    profiling.profiler.enabled = True
+    yield profiling.profiler
+    profiling.profiler.enabled = False
+    profiling.profiler.reset()
+
+
+def test_instrumented_stages(enabled):
+    controller = MPCController(mass=30)
+    U = controller.setup_mpc(current_state=State_Vector(x=350, y=200),
+                             target_state=State_Vector(x=400, y=937.5),
+                             dt=1 / 50)
+    controller.solve(U)
+
+    scheduler = Scheduler()
+    scheduler.add("physics", lambda t: None, 100)
+    scheduler.run(t_final=0.1)
+
+    stats = enabled.stats()
+    assert stats["mpc.setup"]["count"] == stats["mpc.solve"]["count"] == 1
+    assert stats["ipopt.iterations"]["max"] > 0
+    assert stats["task.physics"]["count"] == 10
+
+
+@pytest.mark.parametrize("kwargs", [{"mode": "rti"}, {"persistent": False},
+                                    {"backend": "function"}])
+def test_setup_is_recorded_on_every_path(enabled, kwargs, tmp_path):
+    if kwargs.get("backend"):
+        kwargs["cache_dir"] = str(tmp_path)
+    controller = MPCController(mass=30, **kwargs)
+    controller.setup_mpc(current_state=State_Vector(x=350, y=200),
+                         target_state=State_Vector(x=400, y=937.5), dt=1 / 50)
+    assert enabled.stats()["mpc.setup"]["count"] == 1
+    assert controller.last_build_time > 0
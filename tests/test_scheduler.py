@@ -0,0 +1,98 @@
+from math import radians
+
+import numpy as np
+
+from scheduler import Scheduler
+from simulation import Simulation
+from state_vector import State_Vector
+from telemetry import TelemetryRecorder
+
+
+class FakeClock:
+    # wall clock that only moves when something sleeps or works
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def test_tasks_run_at_their_rates_in_a_fixed_order():
+    scheduler = Scheduler()
+    runs = []
+    for name, rate in (("control", 20), ("render", 60), ("physics", 500)):
+        scheduler.add(name, lambda t, name=name: runs.append((name, t)), rate)
+    scheduler.run(t_final=0.1)
+
+    names = [name for name, _ in runs]
+    assert names.count("physics") == 50
+    assert names.count("control") == 2
+    assert names.count("render") == 6
+    # same instant => the order the tasks were added in
+    assert names[:3] == ["control", "render", "physics"]
+    times = [t for _, t in runs]
+    assert times == sorted(times)
+    assert scheduler.time == 0.1
+
+
+def test_disabled_task_and_stop():
+    scheduler = Scheduler()
+    assert scheduler.add("render", print, None) is None
+
+    runs = []
+
+    def physics(t):
+        runs.append(t)
+        if len(runs) == 10:
+            scheduler.stop()
+
+    scheduler.add("physics", physics, 100)
+    scheduler.run(t_final=1.0)
+    assert len(runs) == 10
+    # and it carries on from there
+    scheduler.run(t_final=0.2)
+    assert len(runs) == 20
+
+
+def test_realtime_reports_jitter_and_skips_frames():
+    clock = FakeClock()
+    scheduler = Scheduler(realtime=True, clock=clock, sleep=clock.sleep)
+
+    def slow_render(t):
+        # a frame takes three frame periods
+        clock.now += 3 / 10
+
+    scheduler.add("physics", lambda t: None, 100)
+    scheduler.add("render", slow_render, 10, skip_missed=True)
+    scheduler.run(t_final=1.0)
+
+    stats = scheduler.stats()
+    # frames at 0, 0.3, 0.6 and 0.9 s, the ones in between are dropped
+    assert stats["render"]["runs"] == 4
+    assert stats["render"]["skipped"] >= 6
+    # physics catches up instead of skipping
+    assert stats["physics"]["runs"] == 100
+    assert stats["physics"]["jitter_max"] > 0
+    assert "jitter" in scheduler.summary()
+
+
+def test_simulation_multirate_is_deterministic():
+    def run():
+        sim = Simulation(State_Vector(x=350, y=200, alpha=radians(-20)),
+                         dt=1 / 500)
+        recorder = TelemetryRecorder()
+        scheduler = sim.scheduler(control_rate=25, recorder=recorder,
+                                  telemetry_rate=50)
+        scheduler.run(t_final=1.0)
+        return sim, recorder.data()
+
+    sim, data = run()
+    assert sim.tick == 500
+    assert len(sim.controller.timings) == 25
+    np.testing.assert_allclose(data.t, np.arange(50) / 50)
+    _, again = run()
+    np.testing.assert_array_equal(data.state, again.state)
+    np.testing.assert_array_equal(data.control, again.control)
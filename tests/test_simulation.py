@@ -0,0 +1,48 @@
+from math import radians
+
+import numpy as np
+import pygame
+
+from simulation import Simulation, Trajectory
+from state_vector import State_Vector
+
+
+def simulation(**kwargs):
+    return Simulation(State_Vector(x=350, y=200, alpha=radians(-20)),
+                      **kwargs)
+
+
+def test_run_returns_arrays_per_tick():
+    sim = simulation()
+    trajectory = sim.run(t_final=1.0)
+
+    assert isinstance(trajectory, Trajectory)
+    n = len(trajectory)
+    assert n == sim.tick == 50
+    assert trajectory.t.shape == (n,)
+    assert trajectory.states.shape == (n, 6)
+    assert trajectory.predicted.shape == (n, 6)
+    assert trajectory.controls.shape == (n, 2)
+    np.testing.assert_allclose(np.diff(trajectory.t), sim.dt)
+    assert sim.controller.timings and len(sim.controller.timings) == n
+
+
+def test_run_is_headless_and_deterministic():
+    first = simulation().run(t_final=0.5)
+    second = simulation().run(t_final=0.5)
+    np.testing.assert_array_equal(first.states, second.states)
+    np.testing.assert_array_equal(first.controls, second.controls)
+    assert not pygame.display.get_init()
+
+
+def test_t_record_skips_the_start():
+    trajectory = simulation().run(t_final=1.0, t_record=0.5)
+    assert len(trajectory) == 26
+    assert trajectory.t[0] >= 0.5
+
+
+def test_run_stops_on_touchdown():
+    sim = Simulation(State_Vector(x=400, y=930, y_dot=60))
+    trajectory = sim.run(t_final=10)
+    assert sim.touched_down()
+    assert trajectory.t[-1] < 10
@@ -0,0 +1,70 @@
+import json
+import os
+from math import radians
+
+import numpy as np
+
+from simulation import Simulation
+from state_vector import State_Vector
+from telemetry import TelemetryRecorder, load_telemetry
+
+
+def rows(n):
+    for i in range(n):
+        yield dict(t=i * 0.02, state=np.full(6, i), control=(-i, 0.1 * i),
+                   status=i % 2, solve_time=1e-3 * i)
+
+
+def test_in_memory_columns_grow():
+    recorder = TelemetryRecorder(capacity=4)
+    for row in rows(10):
+        recorder.append(**row)
+    data = recorder.data()
+
+    assert len(recorder) == len(data) == 10
+    assert data.state.shape == (10, 6) and data.control.shape == (10, 2)
+    np.testing.assert_array_equal(data.state[:, 3], np.arange(10))
+    np.testing.assert_array_equal(data.status, np.arange(10) % 2)
+    # columns that were never written stay zero
+    assert not data.build_time.any()
+
+
+def test_streamed_run_reads_back_memory_mapped(tmp_path):
+    path = str(tmp_path / "run")
+    with TelemetryRecorder(path=path, capacity=4) as recorder:
+        for row in rows(10):
+            recorder.append(**row)
+        # only the full chunks are on disk while recording
+        assert len(recorder.buffers["t"]) == 4
+        assert len(load_telemetry(path)) == 8
+    data = load_telemetry(path)
+
+    assert len(data) == 10
+    assert isinstance(data.state, np.memmap)
+    np.testing.assert_array_equal(data.control[:, 0], -np.arange(10))
+    np.testing.assert_allclose(data.between(0.05, 0.1).t, [0.06, 0.08, 0.1])
+    np.testing.assert_array_equal(load_telemetry(path, mmap=False).state,
+                                  data.state)
+    with open(os.path.join(path, "meta.json")) as f:
+        assert json.load(f)["rows"] == 10
+
+
+def test_empty_recording(tmp_path):
+    path = str(tmp_path / "empty")
+    TelemetryRecorder(path=path).close()
+    data = load_telemetry(path)
+    assert len(data) == 0 and data.state.shape == (0, 6)
+
+
+def test_simulation_run_records_every_tick(tmp_path):
+    sim = Simulation(State_Vector(x=350, y=200, alpha=radians(-20)))
+    with TelemetryRecorder(path=str(tmp_path / "sim")) as recorder:
+        trajectory = sim.run(t_final=0.5, recorder=recorder)
+    data = load_telemetry(str(tmp_path / "sim"))
+
+    assert len(data) == len(trajectory) == 25
+    np.testing.assert_array_equal(data.state, trajectory.states)
+    np.testing.assert_array_equal(data.predicted, trajectory.predicted)
+    np.testing.assert_array_equal(data.control, trajectory.controls)
+    assert (data.solve_time > 0).all()
+    assert (data.status == 0).all()
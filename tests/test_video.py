@@ -0,0 +1,120 @@
+import os
+import stat
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import numpy as np  # noqa: E402
+import pygame  # noqa: E402
+
+from campaign import run_campaign, sample_cases  # noqa: E402
+from simulation import Simulation  # noqa: E402
+from state_vector import State_Vector  # noqa: E402
+from video import VideoRecorder  # noqa: E402
+
+
+def screen(size=(64, 48)):
+    pygame.display.init()
+    return pygame.display.set_mode(size)
+
+
+def test_frames_are_written_at_the_video_rate(tmp_path):
+    surface = screen()
+    video = VideoRecorder(str(tmp_path / "frames"), fps=10)
+    for tick in range(50):
+        surface.fill((5 * tick, 100, 200))
+        video.capture(surface, t=tick * 0.02)
+    video.close()
+
+    # t = 0, 0.1, ..., 0.9
+    assert video.stats() == {"captured": 10, "written": 10, "dropped": 0,
+                             "blocked_s": 0.0, "queue_max": video.queue_max,
+                             "error": ""}
+    assert sorted(os.listdir(tmp_path / "frames"))[-1] == "frame-000009.png"
+    frame = pygame.image.load(str(tmp_path / "frames" / "frame-000003.png"))
+    assert frame.get_size() == (64, 48)
+    assert tuple(frame.get_at((10, 10)))[:3] == (75, 100, 200)
+
+
+class SlowRecorder(VideoRecorder):
+    def _encode(self, index, buffer):
+        time.sleep(0.02)
+
+
+def test_a_slow_writer_drops_frames_or_blocks(tmp_path):
+    surface = screen()
+    video = SlowRecorder(str(tmp_path / "drop"), queue_size=2)
+    start = time.perf_counter()
+    for _ in range(20):
+        video.capture(surface)
+    elapsed = time.perf_counter() - start
+    video.close()
+    assert video.dropped > 0 and video.captured + video.dropped == 20
+    assert video.written == video.captured and video.blocked == 0
+    # capture never waited for the writer
+    assert elapsed < 0.1
+
+    video = SlowRecorder(str(tmp_path / "block"), queue_size=2, block=True)
+    for _ in range(10):
+        video.capture(surface)
+    video.close()
+    assert video.dropped == 0 and video.written == 10
+    assert video.blocked > 0.1
+
+
+def test_video_paths_pipe_raw_frames_to_ffmpeg(tmp_path):
+    # stands in for ffmpeg: copies stdin to the output file and keeps the
+    # arguments next to it
+    fake = tmp_path / "ffmpeg"
+    fake.write_text(
+        f"#!{sys.executable}\n"
+        "import sys\n"
+        "data = sys.stdin.buffer.read()\n"
+        "open(sys.argv[-1], 'wb').write(data)\n"
+        "open(sys.argv[-1] + '.args', 'w').write(' '.join(sys.argv[1:]))\n")
+    fake.chmod(fake.stat().st_mode | stat.S_IEXEC)
+
+    surface = screen()
+    path = str(tmp_path / "landing.mp4")
+    video = VideoRecorder(path, fps=25, ffmpeg=str(fake))
+    for color in range(3):
+        surface.fill((color, 0, 0))
+        video.capture(surface)
+    video.close()
+
+    assert video.encoder == "ffmpeg" and video.error is None
+    args = open(path + ".args").read()
+    assert "-s 64x48" in args and "-r 25" in args
+    raw = np.fromfile(path, dtype=np.uint8)
+    assert len(raw) == 3 * 64 * 48 * surface.get_bytesize()
+
+
+def test_missing_ffmpeg_falls_back_to_frames(tmp_path, monkeypatch):
+    monkeypatch.setattr("shutil.which", lambda name: None)
+    video = VideoRecorder(str(tmp_path / "landing.mp4"))
+    assert video.encoder == "png"
+    assert video.path == str(tmp_path / "landing.mp4.frames")
+    video.close()
+
+
+def test_simulation_records_offscreen(tmp_path):
+    sim = Simulation(State_Vector(x=400, y=300), physics="numpy")
+    video = sim.attach_video(VideoRecorder(str(tmp_path / "run"), fps=10))
+    for _ in range(25):
+        sim.step()
+    video.close()
+    # t = 0.02, then 0.1, 0.2, ..., 0.5
+    assert video.written == 6 and video.dropped == 0
+    assert sim.visualizer.screen.get_size() == (800, 1000)
+
+
+def test_campaign_records_the_failed_landings(tmp_path):
+    # 0.2 s is too short to land, every case fails and is flown again
+    result, = run_campaign(sample_cases(1, seed=2), workers=1, t_final=0.2,
+                           video_dir=str(tmp_path), video_format="png",
+                           video_fps=10)
+    assert result["video"] == str(tmp_path / "case-0000")
+    # t = 0.02, 0.1, 0.2
+    assert sorted(os.listdir(result["video"])) == [
+        "frame-000000.png", "frame-000001.png", "frame-000002.png"]
@@ -0,0 +1,62 @@
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import numpy as np  # noqa: E402
+import pygame  # noqa: E402
+
+from elements import Elements  # noqa: E402
+from exhaust_flame import ExhaustFlame  # noqa: E402
+from visualize import Visualize  # noqa: E402
+
+
+class Box(Elements):
+    # a square crossing the screen, one step per frame
+    def __init__(self, dirty=True):
+        self.x = 20
+        self.dirty = dirty
+
+    def draw(self, screen):
+        self.x += 15
+        rect = pygame.draw.rect(screen, (0, 200, 0), (self.x, 300, 40, 40))
+        return [rect] if self.dirty else None
+
+
+class Flame(Elements):
+    def __init__(self):
+        self.flame = ExhaustFlame(ground=990, position=(400, 850), angle=0.0,
+                                  thrust_force=600, number_of_particles=50,
+                                  seed=0)
+
+    def draw(self, screen):
+        self.flame.emit()
+        self.flame.update()
+        return self.flame.draw(screen)
+
+
+def frames(dirty_rects, objects, n=20):
+    vis = Visualize(width=800, height=1000, dirty_rects=dirty_rects)
+    for obj in objects:
+        vis.add_object(obj)
+    screens = []
+    for _ in range(n):
+        vis.update(wait=False)
+        screens.append(pygame.surfarray.array3d(vis.screen))
+    return vis, screens
+
+
+def test_dirty_rects_draw_the_same_frames_as_full_redraws():
+    _, full = frames(False, [Box(), Flame()])
+    vis, dirty = frames(True, [Box(), Flame()])
+    for expected, frame in zip(full, dirty):
+        np.testing.assert_array_equal(frame, expected)
+    # the last frame only touched the box and the flame
+    area = sum(rect.w * rect.h for rect in vis._drawn)
+    assert 0 < area < 800 * 1000 / 4
+
+
+def test_objects_without_rects_fall_back_to_full_redraws():
+    vis, screens = frames(True, [Box(dirty=False)], n=3)
+    assert vis._drawn is None
+    _, expected = frames(False, [Box(dirty=False)], n=3)
+    np.testing.assert_array_equal(screens[-1], expected[-1])